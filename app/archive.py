@@ -0,0 +1,181 @@
+import calendar
+import logging
+import os
+import time
+from datetime import datetime
+from sqlalchemy import delete, exists, func, insert, literal, or_, select, text
+from sqlalchemy.orm import Session, selectinload
+from . import crud, models
+from .database import SessionLocal
+
+# Launched and Cancelled epics untouched for this many months move to the archive tables; 0 disables archiving
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "12"))
+# Hour (server time) of the nightly archiving run
+ARCHIVE_HOUR = int(os.getenv("ARCHIVE_HOUR", "3"))
+# Epics moved per transaction, so each one holds the write lock only briefly
+ARCHIVE_BATCH_EPICS = int(os.getenv("ARCHIVE_BATCH_EPICS", "200"))
+
+logger = logging.getLogger(__name__)
+
+# Live table -> archive table, parents first
+TIERS = (
+    (models.Epic.__table__, models.ArchivedEpic.__table__),
+    (models.Risk.__table__, models.ArchivedRisk.__table__),
+    (models.RiskUpdate.__table__, models.ArchivedRiskUpdate.__table__),
+)
+# Rebuilt by the counter triggers when rows come back, see app/counters.py
+DERIVED_COLUMNS = {"risk_count", "open_risk_count", "last_update_at"}
+
+class ArchiveError(Exception):
+    """Raised when archived rows cannot be restored, e.g. because their ids are taken again."""
+
+def _months_before(moment: datetime, months: int):
+    month_index = moment.year * 12 + moment.month - 1 - months
+    year, month = divmod(month_index, 12)
+    return moment.replace(year=year, month=month + 1, day=min(moment.day, calendar.monthrange(year, month + 1)[1]))
+
+def _check_ids_not_reused(db: Session):
+    """
+    Archived rows keep their ids, so the live tables must never hand those ids out again.
+    Without AUTOINCREMENT SQLite reuses max(id) + 1, e.g. after the highest row is archived
+    or deleted; migration 5 (python database_migration.py up) switches the tables over.
+    """
+    tables = ", ".join(f"'{live.name}'" for live, _ in TIERS)
+    rows = db.execute(text(f"SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN ({tables})"))
+    missing = [name for name, sql in rows if "AUTOINCREMENT" not in sql.upper()]
+    if missing:
+        raise ArchiveError(f"{', '.join(missing)} may reuse ids of archived rows; run python database_migration.py up first")
+
+def find_archivable(db: Session, cutoff: datetime, limit: int):
+    """Ids of closed epics with no edit, and no launch, since cutoff."""
+    Epic = models.Epic
+    query = db.query(Epic.id).filter(
+        Epic.status.in_(crud.CLOSED_EPIC_STATUSES),
+        Epic.updated_at < cutoff,
+        or_(Epic.actual_launch_date.is_(None), Epic.actual_launch_date < cutoff.date()),
+        ~exists().where(models.ArchivedEpic.id == Epic.id),
+    )
+    return [row[0] for row in query.order_by(Epic.id).limit(limit)]
+
+def _selections(epic_ids: list, source: int):
+    """WHERE clauses picking the epics' rows in each tier of TIERS; source 0 is live, 1 is the archive."""
+    epics, risks, _ = (tier[source] for tier in TIERS)
+    risk_ids = select(risks.c.id).where(risks.c.epic_id.in_(epic_ids))
+    return (epics.c.id.in_(epic_ids), risks.c.epic_id.in_(epic_ids), TIERS[2][source].c.risk_id.in_(risk_ids))
+
+def move_to_archive(db: Session, epic_ids: list):
+    """
+    Copies the epics, their risks and the risks' updates into the archive tables and
+    deletes them from the live ones, in the current transaction. The deletes go through
+    the change log, so feed clients drop the rows. Returns {table: rows moved}.
+    """
+    moved = {}
+    where = _selections(epic_ids, 0)
+    for (live, archived), condition in zip(TIERS, where):
+        columns = [column.name for column in live.columns]
+        db.execute(insert(archived).from_select(columns, select(*live.c).where(condition)))
+    # Children first, while the risks that select the updates still exist
+    for (live, _), condition in reversed(list(zip(TIERS, where))):
+        moved[live.name] = db.execute(delete(live).where(condition)).rowcount
+    db.execute(delete(models.EpicExposure).where(models.EpicExposure.epic_id.in_(epic_ids)))
+    return moved
+
+def archive_closed_epics(db: Session, now: datetime = None, months: int = ARCHIVE_AFTER_MONTHS,
+                         batch_epics: int = ARCHIVE_BATCH_EPICS):
+    """Moves every archivable epic to the archive, one transaction per batch. Returns {table: rows moved}."""
+    _check_ids_not_reused(db)
+    now = now or datetime.utcnow()
+    cutoff = _months_before(now, months)
+    totals = {live.name: 0 for live, _ in TIERS}
+    while True:
+        epic_ids = find_archivable(db, cutoff, batch_epics)
+        if not epic_ids:
+            break
+        try:
+            moved = move_to_archive(db, epic_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        for table, rows in moved.items():
+            totals[table] += rows
+    return totals
+
+def restore_epic(db: Session, epic_id: int, now: datetime = None):
+    """
+    Moves an archived epic, its risks and their updates back to the live tables with their
+    ids. The restored epic counts as edited now, so it is not archived again straight away;
+    a deleted project is dropped from it. Returns the live epic, or None if it is not archived.
+    """
+    if db.get(models.ArchivedEpic, epic_id) is None:
+        return None
+    now = now or datetime.utcnow()
+    where = _selections([epic_id], 1)
+    for (live, archived), condition in zip(TIERS, where):
+        taken = db.execute(select(func.count()).select_from(live).where(
+            live.c.id.in_(select(archived.c.id).where(condition))
+        )).scalar()
+        if taken:
+            raise ArchiveError(f"{taken} archived {live.name} row(s) of epic {epic_id} have ids in use again")
+
+    project_ids = select(models.Project.id).where(models.Project.id == models.ArchivedEpic.project_id).scalar_subquery()
+    overrides = {"project_id": project_ids, "updated_at": literal(now)}
+    try:
+        for (live, archived), condition in zip(TIERS, where):
+            columns = [column.name for column in live.columns if column.name not in DERIVED_COLUMNS]
+            if live.name != "epics":
+                values = [archived.c[name] for name in columns]
+            else:
+                values = [overrides.get(name, archived.c[name]) for name in columns]
+            db.execute(insert(live).from_select(columns, select(*values).where(condition)))
+        for (_, archived), condition in reversed(list(zip(TIERS, where))):
+            db.execute(delete(archived).where(condition))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return crud.get_epic_detail(db, epic_id)
+
+# --- Reads, for the API's ?archived=true ---
+
+def _archived_epics(db: Session):
+    return db.query(models.ArchivedEpic).options(
+        selectinload(models.ArchivedEpic.project),
+        selectinload(models.ArchivedEpic.risks).selectinload(models.ArchivedRisk.updates),
+    )
+
+def get_archived_epics(db: Session, project_id: int = None, min_open_risks: int = None, limit: int = 1000):
+    query = _archived_epics(db)
+    if project_id:
+        query = query.filter(models.ArchivedEpic.project_id == project_id)
+    if min_open_risks is not None:
+        query = query.filter(models.ArchivedEpic.open_risk_count >= min_open_risks)
+    return query.order_by(models.ArchivedEpic.target_launch_date.desc(), models.ArchivedEpic.id).limit(limit).all()
+
+def get_archived_epic(db: Session, epic_id: int):
+    return _archived_epics(db).filter(models.ArchivedEpic.id == epic_id).first()
+
+def get_archived_risks(db: Session, epic_id: int = None, status: str = None, limit: int = 1000):
+    query = db.query(models.ArchivedRisk)
+    if epic_id is not None:
+        query = query.filter(models.ArchivedRisk.epic_id == epic_id)
+    if status:
+        query = query.filter(models.ArchivedRisk.status == status)
+    return query.order_by(models.ArchivedRisk.id).limit(limit).all()
+
+def get_archived_risk(db: Session, risk_id: int):
+    return db.query(models.ArchivedRisk).options(selectinload(models.ArchivedRisk.updates)) \
+        .filter(models.ArchivedRisk.id == risk_id).first()
+
+def run_scheduled_archive():
+    """Scheduler entry point."""
+    db = SessionLocal()
+    try:
+        started = time.monotonic()
+        moved = archive_closed_epics(db)
+        if moved["epics"]:
+            logger.info(f"Archived {moved} in {time.monotonic() - started:.1f}s")
+    except Exception as e:
+        logger.error(f"Archiving failed: {e}", exc_info=True)
+    finally:
+        db.close()
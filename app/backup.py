@@ -0,0 +1,218 @@
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from .database import SQLALCHEMY_DATABASE_URL
+
+# Where backups are written and pruned
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+# Hours between scheduled backups; 0 disables them
+BACKUP_INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "24"))
+# Database pages copied per step (WAL mode); smaller steps keep the backup from hogging I/O
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+# Pause between steps, to leave room for writers on a busy database
+BACKUP_STEP_PAUSE_SECONDS = float(os.getenv("BACKUP_STEP_PAUSE_SECONDS", "0"))
+# Retention: scheduled backups beyond the newest BACKUP_KEEP that are also older than BACKUP_MAX_AGE_DAYS are deleted
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_MAX_AGE_DAYS = float(os.getenv("BACKUP_MAX_AGE_DAYS", "30"))
+
+BACKUP_PREFIX = "risk_tracker_backup"
+BACKUP_SUFFIXES = (".db.gz", ".db")
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+class BackupError(Exception):
+    """Raised when a backup cannot be taken, fails verification or cannot be restored."""
+
+def sqlite_path_from_url(url: str = SQLALCHEMY_DATABASE_URL):
+    """Returns the database file behind a sqlite:/// URL."""
+    if not url.startswith("sqlite:///"):
+        raise BackupError(f"Backups are only supported for SQLite file databases, not {url.split(':', 1)[0]}")
+    path = url[len("sqlite:///"):]
+    if not path or path == ":memory:":
+        raise BackupError("Cannot back up an in-memory database")
+    return path
+
+def backup_filename(prefix: str = BACKUP_PREFIX, compress: bool = True, now: datetime = None):
+    # Microseconds, so backups taken within the same second don't share a name
+    timestamp = (now or datetime.now()).strftime("%Y%m%d_%H%M%S_%f")
+    return f"{prefix}_{timestamp}{'.db.gz' if compress else '.db'}"
+
+def check_integrity(db_path: str):
+    """Runs PRAGMA integrity_check on a database file, raising BackupError unless it reports ok."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"{db_path} is not a valid SQLite database: {e}")
+    finally:
+        conn.close()
+    if result != ["ok"]:
+        raise BackupError(f"Integrity check failed for {db_path}: {'; '.join(result[:5])}")
+
+def _copy_database(source_path: str, target_path: str, pages: int, pause: float, standalone: bool = True):
+    """
+    Copies a live database with the online backup API.
+
+    In WAL mode the copy reads from one snapshot held open for the whole backup, a few
+    pages per step, while writers keep committing to the WAL. In rollback-journal mode
+    a write from another connection would restart a stepped copy, so the database is
+    copied in a single step instead (writers wait for it, up to their busy timeout).
+    A standalone copy is switched to a rollback journal so it is a single self-contained file.
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    copied = {"pages": 0}
+
+    def progress(status, remaining, total):
+        copied["pages"] = total
+        if pause and remaining:
+            time.sleep(pause)
+
+    try:
+        if source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+            # Pin a read snapshot so every step sees the same version of the database
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        else:
+            pages = -1
+        source.backup(target, pages=pages, progress=progress)
+        if standalone:
+            target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        if source.in_transaction:
+            source.rollback()
+        target.close()
+        source.close()
+    return copied["pages"]
+
+def _compress(source_path: str, target_path: str):
+    with open(source_path, "rb") as source, gzip.open(target_path, "wb", compresslevel=6) as target:
+        shutil.copyfileobj(source, target, _COPY_CHUNK_BYTES)
+
+def _decompress(source_path: str, target_path: str):
+    with gzip.open(source_path, "rb") as source, open(target_path, "wb") as target:
+        shutil.copyfileobj(source, target, _COPY_CHUNK_BYTES)
+
+def create_backup(db_path: str = None, backup_dir: str = BACKUP_DIR, prefix: str = BACKUP_PREFIX,
+                  compress: bool = True, pages: int = BACKUP_PAGES_PER_STEP, pause: float = BACKUP_STEP_PAUSE_SECONDS):
+    """
+    Takes a consistent backup of a database that may be in use.
+
+    The live file is copied with the SQLite online backup API (WAL contents included),
+    checked with PRAGMA integrity_check, then gzip-compressed in chunks. The final file
+    only appears once it is complete. Returns a dict describing the backup.
+    """
+    db_path = db_path or sqlite_path_from_url()
+    if not os.path.exists(db_path):
+        raise BackupError(f"Database file not found: {db_path}")
+    os.makedirs(backup_dir, exist_ok=True)
+
+    started = time.monotonic()
+    backup_path = os.path.join(backup_dir, backup_filename(prefix, compress))
+    if os.path.exists(backup_path):
+        # Only possible if the clock went back; never replace an existing backup
+        raise BackupError(f"Backup file already exists: {backup_path}")
+    snapshot_path = os.path.join(backup_dir, f".{os.path.basename(backup_path)}.snapshot")
+    partial_path = f"{backup_path}.partial"
+    try:
+        page_count = _copy_database(db_path, snapshot_path, pages, pause)
+        check_integrity(snapshot_path)
+        database_bytes = os.path.getsize(snapshot_path)
+        if compress:
+            _compress(snapshot_path, partial_path)
+            os.replace(partial_path, backup_path)
+        else:
+            os.replace(snapshot_path, backup_path)
+    except sqlite3.Error as e:
+        raise BackupError(f"Backup of {db_path} failed: {e}")
+    finally:
+        for path in (snapshot_path, partial_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    return {
+        "path": backup_path,
+        "pages": page_count,
+        "database_bytes": database_bytes,
+        "backup_bytes": os.path.getsize(backup_path),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+def verify_backup(backup_path: str):
+    """Checks a backup file (compressed or not) by restoring it to a temporary file and running integrity_check."""
+    if not backup_path.endswith(".gz"):
+        check_integrity(backup_path)
+        return
+    scratch_path = f"{backup_path}.verify"
+    try:
+        _decompress(backup_path, scratch_path)
+        check_integrity(scratch_path)
+    except (OSError, EOFError, gzip.BadGzipFile) as e:
+        raise BackupError(f"Could not read {backup_path}: {e}")
+    finally:
+        if os.path.exists(scratch_path):
+            os.remove(scratch_path)
+
+def restore_backup(backup_path: str, db_path: str = None):
+    """
+    Verifies a backup and copies it over the database with the backup API, so open
+    connections see the restored data instead of a file swapped underneath them.
+    """
+    db_path = db_path or sqlite_path_from_url()
+    scratch_path = f"{backup_path}.restore" if backup_path.endswith(".gz") else None
+    try:
+        if scratch_path:
+            _decompress(backup_path, scratch_path)
+        source_path = scratch_path or backup_path
+        check_integrity(source_path)
+        _copy_database(source_path, db_path, pages=-1, pause=0, standalone=False)
+    except (OSError, EOFError, gzip.BadGzipFile, sqlite3.Error) as e:
+        raise BackupError(f"Restore from {backup_path} failed: {e}")
+    finally:
+        if scratch_path and os.path.exists(scratch_path):
+            os.remove(scratch_path)
+
+def list_backups(backup_dir: str = BACKUP_DIR, prefix: str = None):
+    """Returns backup file paths, newest first. Without a prefix every backup in the directory is listed."""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = [
+        name for name in os.listdir(backup_dir)
+        if name.endswith(BACKUP_SUFFIXES) and not name.startswith(".") and (prefix is None or name.startswith(prefix))
+    ]
+    paths = [os.path.join(backup_dir, name) for name in names]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+def prune_backups(backup_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP, max_age_days: float = BACKUP_MAX_AGE_DAYS,
+                  prefix: str = BACKUP_PREFIX, now: datetime = None):
+    """
+    Deletes scheduled backups that are both outside the newest `keep` and older than
+    `max_age_days`. Pre-migration and pre-restore copies use other prefixes and are never pruned.
+    Returns the deleted paths.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=max_age_days)
+    deleted = []
+    for path in list_backups(backup_dir, prefix)[max(keep, 1):]:
+        if datetime.fromtimestamp(os.path.getmtime(path)) < cutoff:
+            os.remove(path)
+            deleted.append(path)
+    return deleted
+
+def run_scheduled_backup():
+    """A background job that takes a backup and applies the retention policy."""
+    try:
+        result = create_backup()
+    except BackupError as e:
+        logger.error(f"Scheduled backup failed: {e}")
+        return None
+    deleted = prune_backups()
+    logger.info(
+        f"Backup written to {result['path']} ({result['backup_bytes']} bytes from {result['database_bytes']}, "
+        f"{result['seconds']}s); pruned {len(deleted)} old backup(s)."
+    )
+    return result
@@ -0,0 +1,236 @@
+import csv
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from . import models, schemas
+
+# Rows parsed, validated and written per transaction
+BULK_IMPORT_CHUNK_ROWS = int(os.getenv("BULK_IMPORT_CHUNK_ROWS", "5000"))
+# Worker processes for validation; 0 validates in the importing process
+BULK_IMPORT_WORKERS = int(os.getenv("BULK_IMPORT_WORKERS", "0"))
+
+logger = logging.getLogger(__name__)
+
+def _blank_to_none(row: dict):
+    return {key: (value.strip() or None) if isinstance(value, str) else value for key, value in row.items() if key}
+
+def _error_message(error: Exception):
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+def validate_epic_rows(rows: list):
+    """
+    Validates (line, row) pairs from an epics CSV. Runs in worker processes, so it only
+    uses its arguments. Returns (valid, rejected): column dicts ready to insert, and
+    (line, row, error) triples.
+    """
+    valid, rejected = [], []
+    for line, row in rows:
+        data = _blank_to_none(row)
+        data["status"] = data.get("status") or "Planned"
+        try:
+            epic = schemas.EpicCreate(**{key: data.get(key) for key in schemas.EpicCreate.model_fields if key in data})
+        except ValidationError as e:
+            rejected.append((line, row, _error_message(e)))
+            continue
+        valid.append((line, row, epic.model_dump()))
+    return valid, rejected
+
+def validate_risk_rows(rows: list):
+    """Validates (line, row) pairs from a risks CSV; each row names its epic by epic_jira_key or epic_title."""
+    valid, rejected = [], []
+    for line, row in rows:
+        data = _blank_to_none(row)
+        data["status"] = data.get("status") or "Open"
+        if not data.get("epic_title") and not data.get("epic_jira_key"):
+            rejected.append((line, row, "epic_title or epic_jira_key is required"))
+            continue
+        try:
+            risk = schemas.RiskCreate(**{key: data.get(key) for key in schemas.RiskCreate.model_fields if key in data})
+        except ValidationError as e:
+            rejected.append((line, row, _error_message(e)))
+            continue
+        valid.append((line, row, {**risk.model_dump(), "epic_title": data.get("epic_title"),
+                                  "epic_jira_key": data.get("epic_jira_key")}))
+    return valid, rejected
+
+class EpicIndex:
+    """title -> id and jira_epic_key -> id lookups, loaded with one query and kept current during an import."""
+
+    def __init__(self, db: Session):
+        self.by_title = {}
+        self.by_jira_key = {}
+        for epic_id, title, jira_epic_key in db.query(models.Epic.id, models.Epic.title, models.Epic.jira_epic_key):
+            self.add(epic_id, title, jira_epic_key)
+
+    def add(self, epic_id: int, title: str, jira_epic_key: str = None):
+        # Titles are not unique; like the HTTP importer, the first match wins
+        self.by_title.setdefault(title, epic_id)
+        if jira_epic_key:
+            self.by_jira_key[jira_epic_key] = epic_id
+
+    def resolve(self, title: str = None, jira_epic_key: str = None):
+        if jira_epic_key:
+            return self.by_jira_key.get(jira_epic_key)
+        return self.by_title.get(title)
+
+class RejectWriter:
+    """Writes rejected rows, with their CSV line number and the reason, to a CSV opened on first use."""
+
+    def __init__(self, path: str, fieldnames: list):
+        # Rejects from an earlier run would be misleading
+        if os.path.exists(path):
+            os.remove(path)
+        self.path = path
+        self.fieldnames = ["line"] + list(fieldnames) + ["error"]
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, line: int, row: dict, error: str):
+        if self._writer is None:
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow({**row, "line": line, "error": error})
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+def read_csv_chunks(path: str, chunk_rows: int = BULK_IMPORT_CHUNK_ROWS):
+    """Yields (fieldnames, [(line, row), ...]) chunks without loading the whole file."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        chunk = []
+        for row in reader:
+            chunk.append((reader.line_num, row))
+            if len(chunk) >= chunk_rows:
+                yield reader.fieldnames, chunk
+                chunk = []
+        if chunk:
+            yield reader.fieldnames, chunk
+
+def _validated_chunks(path: str, validate, chunk_rows: int, workers: int):
+    """Yields (fieldnames, valid, rejected) per chunk, in file order, validating on up to `workers` processes."""
+    chunks = read_csv_chunks(path, chunk_rows)
+    if workers <= 1:
+        for fieldnames, chunk in chunks:
+            yield (fieldnames, *validate(chunk))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # A bounded window keeps memory flat on large files while every worker stays busy
+        pending = deque()
+        for fieldnames, chunk in chunks:
+            pending.append((fieldnames, executor.submit(validate, chunk)))
+            if len(pending) >= workers * 2:
+                fieldnames, future = pending.popleft()
+                yield (fieldnames, *future.result())
+        while pending:
+            fieldnames, future = pending.popleft()
+            yield (fieldnames, *future.result())
+
+def _reject_path(path: str):
+    root, _ = os.path.splitext(path)
+    return f"{root}_rejects.csv"
+
+def import_epics_csv(db: Session, path: str, reject_path: str = None, chunk_rows: int = BULK_IMPORT_CHUNK_ROWS,
+                     workers: int = BULK_IMPORT_WORKERS, index: EpicIndex = None):
+    """
+    Inserts the epics in a CSV straight into the database, one transaction per chunk.
+    Rows that fail validation, or whose jira_epic_key already exists, go to the reject file.
+    Returns a summary dict.
+    """
+    started = time.monotonic()
+    index = index or EpicIndex(db)
+    rejects = None
+    imported = rows = 0
+    try:
+        for fieldnames, valid, rejected in _validated_chunks(path, validate_epic_rows, chunk_rows, workers):
+            rejects = rejects or RejectWriter(reject_path or _reject_path(path), fieldnames)
+            rows += len(valid) + len(rejected)
+            for line, row, error in rejected:
+                rejects.write(line, row, error)
+
+            batch = []
+            keys_in_batch = set()
+            for line, row, epic in valid:
+                key = epic.get("jira_epic_key")
+                if key and (key in index.by_jira_key or key in keys_in_batch):
+                    rejects.write(line, row, f"jira_epic_key {key} already exists")
+                    continue
+                if key:
+                    keys_in_batch.add(key)
+                batch.append(epic)
+            if not batch:
+                continue
+            try:
+                # Multi-row INSERT ... RETURNING; only the new ids are needed, not their order
+                inserted = db.execute(
+                    insert(models.Epic).returning(models.Epic.id, models.Epic.title, models.Epic.jira_epic_key),
+                    batch,
+                ).all()
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            for epic_id, title, jira_epic_key in inserted:
+                index.add(epic_id, title, jira_epic_key)
+            imported += len(inserted)
+    finally:
+        if rejects:
+            rejects.close()
+    rejected_count = rejects.count if rejects else 0
+    return {"rows": rows, "imported": imported, "rejected": rejected_count,
+            "reject_file": rejects.path if rejected_count else None,
+            "seconds": round(time.monotonic() - started, 3)}
+
+def import_risks_csv(db: Session, path: str, reject_path: str = None, chunk_rows: int = BULK_IMPORT_CHUNK_ROWS,
+                     workers: int = BULK_IMPORT_WORKERS, index: EpicIndex = None):
+    """
+    Inserts the risks in a CSV straight into the database, one transaction per chunk.
+    Each row's epic is looked up by epic_jira_key or epic_title in an index built once.
+    Returns a summary dict.
+    """
+    started = time.monotonic()
+    index = index or EpicIndex(db)
+    rejects = None
+    imported = rows = 0
+    try:
+        for fieldnames, valid, rejected in _validated_chunks(path, validate_risk_rows, chunk_rows, workers):
+            rejects = rejects or RejectWriter(reject_path or _reject_path(path), fieldnames)
+            rows += len(valid) + len(rejected)
+            for line, row, error in rejected:
+                rejects.write(line, row, error)
+
+            batch = []
+            for line, row, risk in valid:
+                epic_title, epic_jira_key = risk.pop("epic_title"), risk.pop("epic_jira_key")
+                epic_id = index.resolve(epic_title, epic_jira_key)
+                if epic_id is None:
+                    rejects.write(line, row, f"Epic not found: {epic_jira_key or epic_title}")
+                    continue
+                batch.append({**risk, "epic_id": epic_id})
+            if not batch:
+                continue
+            try:
+                db.execute(insert(models.Risk), batch)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            imported += len(batch)
+    finally:
+        if rejects:
+            rejects.close()
+    rejected_count = rejects.count if rejects else 0
+    return {"rows": rows, "imported": imported, "rejected": rejected_count,
+            "reject_file": rejects.path if rejected_count else None,
+            "seconds": round(time.monotonic() - started, 3)}
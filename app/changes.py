@@ -0,0 +1,163 @@
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, exists, func, select
+from sqlalchemy.orm import Session, aliased
+from . import models
+from .database import Base, SessionLocal
+
+# Entries older than this are collapsed to the latest one per row; the feed serves current state anyway
+CHANGE_LOG_COLLAPSE_HOURS = float(os.getenv("CHANGE_LOG_COLLAPSE_HOURS", "24"))
+# Delete entries are kept this long; clients that fall further behind must resync from cursor 0
+CHANGE_LOG_TOMBSTONE_DAYS = float(os.getenv("CHANGE_LOG_TOMBSTONE_DAYS", "30"))
+# How often the scheduler compacts the log; 0 disables compaction
+CHANGE_LOG_COMPACT_INTERVAL_HOURS = float(os.getenv("CHANGE_LOG_COMPACT_INTERVAL_HOURS", "24"))
+
+logger = logging.getLogger(__name__)
+
+# Tracked tables, and SQL for the (project_id, epic_id) scope of a row; {row} is NEW or OLD
+TRACKED = {
+    "projects": ("{row}.id", "NULL"),
+    "epics": ("{row}.project_id", "{row}.id"),
+    "risks": ("(SELECT project_id FROM epics WHERE id = {row}.epic_id)", "{row}.epic_id"),
+    "risk_updates": (
+        "(SELECT e.project_id FROM risks r JOIN epics e ON e.id = r.epic_id WHERE r.id = {row}.risk_id)",
+        "(SELECT epic_id FROM risks WHERE id = {row}.risk_id)",
+    ),
+}
+
+TABLES = {
+    "projects": models.Project.__table__,
+    "epics": models.Epic.__table__,
+    "risks": models.Risk.__table__,
+    "risk_updates": models.RiskUpdate.__table__,
+}
+
+# Columns whose changes alone are not recorded: the timestamp, and the counters app/counters.py
+# derives from rows the log already records
+UNTRACKED_COLUMNS = {"updated_at", "risk_count", "open_risk_count", "epic_count", "last_update_at"}
+
+class CursorExpiredError(Exception):
+    """Raised when a cursor is older than the compaction horizon, so deletes may have been missed."""
+
+def trigger_statements(columns: dict = None):
+    """
+    SQL for the AFTER INSERT/UPDATE/DELETE triggers that write the change log. Triggers
+    see every write, including the Core bulk inserts of the CSV and Parquet importers.
+    Updates that only touch UNTRACKED_COLUMNS are not recorded. `columns` ({table: [column names]})
+    limits the triggers to those tables and overrides the model columns, for migrations
+    that run against a schema older or newer than the models.
+    """
+    if columns is None:
+        columns = {name: [column.name for column in TABLES[name].columns] for name in TRACKED}
+    statements = []
+    for table_name, (project_sql, epic_sql) in TRACKED.items():
+        if table_name not in columns:
+            continue
+        changed = " OR ".join(
+            f"OLD.{name} IS NOT NEW.{name}" for name in columns[table_name] if name not in UNTRACKED_COLUMNS
+        )
+        for op, row in (("insert", "NEW"), ("update", "NEW"), ("delete", "OLD")):
+            name = f"change_log_{table_name}_{op}"
+            when = f" WHEN {changed}" if op == "update" else ""
+            statements.append(f"DROP TRIGGER IF EXISTS {name}")
+            statements.append(
+                f"CREATE TRIGGER {name} AFTER {op.upper()} ON {table_name}{when} BEGIN "
+                f"INSERT INTO change_log (entity, entity_id, op, project_id, epic_id) VALUES "
+                f"('{table_name}', {row}.id, '{op}', {project_sql.format(row=row)}, {epic_sql.format(row=row)}); "
+                f"END"
+            )
+    return statements
+
+@event.listens_for(Base.metadata, "after_create")
+def create_change_triggers(target, connection, **kw):
+    # Triggers are SQLite DDL; (re)created on every create_all so they follow column changes
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in trigger_statements():
+        connection.exec_driver_sql(statement)
+
+def get_horizon(db: Session):
+    return db.query(func.max(models.ChangeLogCompaction.horizon)).scalar() or 0
+
+def get_changes(db: Session, since: int = 0, limit: int = 500, project_id: int = None, epic_id: int = None):
+    """
+    Returns change entries after the `since` cursor, oldest first, with the current state of
+    each changed row (None once deleted). Cost follows the number of changes, not the table
+    sizes: one indexed range scan plus one primary-key lookup per table.
+    """
+    if 0 < since < get_horizon(db):
+        raise CursorExpiredError(f"Cursor {since} has expired; resync from cursor 0")
+    query = db.query(models.ChangeLog).filter(models.ChangeLog.id > since)
+    if project_id is not None:
+        query = query.filter(models.ChangeLog.project_id == project_id)
+    if epic_id is not None:
+        query = query.filter(models.ChangeLog.epic_id == epic_id)
+    entries = query.order_by(models.ChangeLog.id).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    ids_by_entity = defaultdict(set)
+    for entry in entries:
+        if entry.op != "delete":
+            ids_by_entity[entry.entity].add(entry.entity_id)
+    current = {}
+    for entity, ids in ids_by_entity.items():
+        table = TABLES[entity]
+        for row in db.execute(select(table).where(table.c.id.in_(ids))).mappings():
+            current[(entity, row["id"])] = dict(row)
+
+    changes = [{
+        "cursor": entry.id,
+        "entity": entry.entity,
+        "entity_id": entry.entity_id,
+        "op": entry.op,
+        "project_id": entry.project_id,
+        "epic_id": entry.epic_id,
+        "changed_at": entry.created_at,
+        "data": current.get((entry.entity, entry.entity_id)),
+    } for entry in entries]
+    return {"changes": changes, "next_cursor": entries[-1].id if entries else since, "has_more": has_more}
+
+def compact_change_log(db: Session, now: datetime = None, collapse_hours: float = CHANGE_LOG_COLLAPSE_HOURS,
+                       tombstone_days: float = CHANGE_LOG_TOMBSTONE_DAYS):
+    """
+    Compacts the log in two steps:
+    - entries older than collapse_hours are dropped when a later entry exists for the same
+      row. Every cursor still sees that row change, since the feed serves current state.
+    - delete entries older than tombstone_days are dropped. This is the only step that loses
+      information, so the highest dropped cursor becomes the horizon for CursorExpiredError.
+    The log keeps one entry per live row, so a client starting from cursor 0 gets everything.
+    """
+    now = now or datetime.utcnow()
+    later = aliased(models.ChangeLog)
+    ChangeLog = models.ChangeLog
+    try:
+        collapsed = db.execute(
+            delete(ChangeLog)
+            .where(ChangeLog.created_at < now - timedelta(hours=collapse_hours))
+            .where(exists().where(later.entity == ChangeLog.entity, later.entity_id == ChangeLog.entity_id,
+                                  later.id > ChangeLog.id))
+        ).rowcount
+        tombstone_filter = (ChangeLog.op == "delete", ChangeLog.created_at < now - timedelta(days=tombstone_days))
+        horizon = db.query(func.max(ChangeLog.id)).filter(*tombstone_filter).scalar()
+        tombstones = db.execute(delete(ChangeLog).where(*tombstone_filter)).rowcount
+        db.add(models.ChangeLogCompaction(collapsed=collapsed, tombstones_removed=tombstones,
+                                          horizon=max(horizon or 0, get_horizon(db))))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"collapsed": collapsed, "tombstones_removed": tombstones, "horizon": get_horizon(db)}
+
+def run_scheduled_compaction():
+    """Scheduler entry point."""
+    db = SessionLocal()
+    try:
+        result = compact_change_log(db)
+        logger.info(f"Change log compacted: {result}")
+    except Exception as e:
+        logger.error(f"Change log compaction failed: {e}", exc_info=True)
+    finally:
+        db.close()
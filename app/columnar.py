@@ -0,0 +1,215 @@
+import os
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from . import models
+
+# Rows per Arrow record batch; bounds memory on export and import
+COLUMNAR_BATCH_ROWS = int(os.getenv("COLUMNAR_BATCH_ROWS", "50000"))
+
+_TIMESTAMP = pa.timestamp("us", tz="UTC")
+# Low-cardinality text stored as integer codes plus a small dictionary
+_CATEGORY = pa.dictionary(pa.int16(), pa.string())
+
+# Arrow schema per table, in load order (parents before children)
+SCHEMAS = {
+    "projects": pa.schema([
+        ("id", pa.int64()),
+        ("jira_project_key", pa.string()),
+        ("name", pa.string()),
+        ("description", pa.string()),
+        ("created_at", _TIMESTAMP),
+        ("updated_at", _TIMESTAMP),
+    ]),
+    "epics": pa.schema([
+        ("id", pa.int64()),
+        ("project_id", pa.int64()),
+        ("jira_epic_key", pa.string()),
+        ("title", pa.string()),
+        ("description", pa.string()),
+        ("target_launch_date", pa.date32()),
+        ("actual_launch_date", pa.date32()),
+        ("status", _CATEGORY),
+        ("child_issues_done", pa.int32()),
+        ("child_issues_total", pa.int32()),
+        ("created_at", _TIMESTAMP),
+        ("updated_at", _TIMESTAMP),
+    ]),
+    "risks": pa.schema([
+        ("id", pa.int64()),
+        ("epic_id", pa.int64()),
+        ("description", pa.string()),
+        ("mitigation_plan", pa.string()),
+        ("date_added", pa.date32()),
+        ("status", _CATEGORY),
+        ("created_at", _TIMESTAMP),
+        ("updated_at", _TIMESTAMP),
+    ]),
+    "risk_updates": pa.schema([
+        ("id", pa.int64()),
+        ("risk_id", pa.int64()),
+        ("update_text", pa.string()),
+        ("date_added", pa.date32()),
+        ("created_at", _TIMESTAMP),
+    ]),
+}
+
+TABLES = {
+    "projects": models.Project.__table__,
+    "epics": models.Epic.__table__,
+    "risks": models.Risk.__table__,
+    "risk_updates": models.RiskUpdate.__table__,
+}
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+class ColumnarImportError(Exception):
+    """Raised when an import would mix exported rows with existing data, or a file does not match its table."""
+
+def export_path(directory: str, table: str, file_format: str = "parquet"):
+    return os.path.join(directory, f"{table}{FORMATS[file_format]}")
+
+class _Categories:
+    """
+    Dictionary encoding that only ever appends, so each batch's dictionary extends the
+    previous one. Arrow IPC files accept that as a delta; re-encoding per batch is rejected.
+    """
+
+    def __init__(self, dictionary_type: pa.DictionaryType):
+        self.type = dictionary_type
+        self.codes = {}
+        self.values = []
+
+    def encode(self, values: list):
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            indices.append(code)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=self.type.index_type), pa.array(self.values, type=self.type.value_type)
+        )
+
+def _record_batches(db: Session, table: str, batch_rows: int):
+    """Streams a table as Arrow record batches, never holding more than batch_rows rows."""
+    schema = SCHEMAS[table]
+    columns = [TABLES[table].c[name] for name in schema.names]
+    categories = {field.name: _Categories(field.type) for field in schema if pa.types.is_dictionary(field.type)}
+    result = db.execute(select(*columns).order_by(TABLES[table].c.id).execution_options(yield_per=batch_rows))
+    for rows in result.partitions():
+        arrays = []
+        for i, field in enumerate(schema):
+            values = [row[i] for row in rows]
+            if field.name in categories:
+                arrays.append(categories[field.name].encode(values))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def export_tables(db: Session, directory: str, file_format: str = "parquet", batch_rows: int = COLUMNAR_BATCH_ROWS):
+    """
+    Writes projects, epics, risks and risk updates to one Parquet (zstd) or Arrow IPC
+    file each, batch by batch. Returns {table: {"path", "rows", "bytes"}}.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format {file_format}; use one of {', '.join(FORMATS)}")
+    os.makedirs(directory, exist_ok=True)
+    summary = {}
+    for table, schema in SCHEMAS.items():
+        path = export_path(directory, table, file_format)
+        partial_path = f"{path}.partial"
+        rows = 0
+        if file_format == "parquet":
+            writer = pq.ParquetWriter(partial_path, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_file(partial_path, schema, options=pa.ipc.IpcWriteOptions(compression="zstd", emit_dictionary_deltas=True))
+        try:
+            for batch in _record_batches(db, table, batch_rows):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        finally:
+            writer.close()
+        os.replace(partial_path, path)
+        summary[table] = {"path": path, "rows": rows, "bytes": os.path.getsize(path)}
+    return summary
+
+def _read_batches(path: str, batch_rows: int):
+    if path.endswith(FORMATS["parquet"]):
+        parquet_file = pq.ParquetFile(path)
+        yield parquet_file.schema_arrow
+        yield from parquet_file.iter_batches(batch_size=batch_rows)
+    else:
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            yield reader.schema
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+def _to_rows(batch: pa.RecordBatch):
+    # The models store naive UTC timestamps; dropping the zone in Arrow avoids a per-value conversion
+    columns = [
+        column.cast(pa.timestamp(column.type.unit)) if pa.types.is_timestamp(column.type) and column.type.tz else column
+        for column in batch.columns
+    ]
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names).to_pylist()
+
+def import_tables(db: Session, directory: str, file_format: str = "parquet", replace: bool = False,
+                  batch_rows: int = COLUMNAR_BATCH_ROWS):
+    """
+    Loads an export back into the database, keeping its ids so references stay intact.
+    The tables must be empty unless `replace` is set, which deletes their rows first.
+    Everything happens in one transaction. Returns {table: rows loaded}.
+    """
+    present = {table: export_path(directory, table, file_format) for table in SCHEMAS}
+    missing = [path for path in present.values() if not os.path.exists(path)]
+    if missing:
+        raise ColumnarImportError(f"Missing export files: {', '.join(missing)}")
+
+    summary = {}
+    try:
+        if replace:
+            for table in reversed(list(TABLES)):
+                db.execute(TABLES[table].delete())
+        else:
+            occupied = [table for table in TABLES if db.execute(select(func.count()).select_from(TABLES[table])).scalar()]
+            if occupied:
+                raise ColumnarImportError(
+                    f"Tables already contain data: {', '.join(occupied)}. Import into an empty database or replace."
+                )
+        for table, path in present.items():
+            batches = _read_batches(path, batch_rows)
+            schema = next(batches)
+            unknown = set(schema.names) - set(TABLES[table].c.keys())
+            if unknown:
+                raise ColumnarImportError(f"{path} has columns that {table} does not: {', '.join(sorted(unknown))}")
+            loaded = 0
+            for batch in batches:
+                if batch.num_rows:
+                    db.execute(TABLES[table].insert(), _to_rows(batch))
+                    loaded += batch.num_rows
+            summary[table] = loaded
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return summary
+
+def time_load(path: str):
+    """Seconds to read a whole export file into an Arrow table, for format comparisons."""
+    started = time.perf_counter()
+    if path.endswith(FORMATS["parquet"]):
+        pq.read_table(path)
+    elif path.endswith(FORMATS["arrow"]):
+        with pa.memory_map(path) as source:
+            pa.ipc.open_file(source).read_all()
+    else:
+        import pyarrow.csv as pa_csv
+        pa_csv.read_csv(path)
+    return time.perf_counter() - started
@@ -0,0 +1,136 @@
+import logging
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+def _active_statuses():
+    # crud imports this module to register the triggers, so its constants are read on use
+    from .crud import ACTIVE_RISK_STATUSES
+    return "(" + ", ".join(f"'{status}'" for status in ACTIVE_RISK_STATUSES) + ")"
+
+def counters():
+    """
+    {table: (SQL for the true values grouped by row id, {column: value for a row without children})}
+    for the denormalized columns, which let lists sort and filter without loading children.
+    """
+    return {
+        "epics": (
+            f"SELECT epic_id AS id, COUNT(*) AS risk_count, SUM(status IN {_active_statuses()}) AS open_risk_count "
+            f"FROM risks GROUP BY epic_id",
+            {"risk_count": "0", "open_risk_count": "0"},
+        ),
+        "projects": (
+            "SELECT project_id AS id, COUNT(*) AS epic_count FROM epics WHERE project_id IS NOT NULL GROUP BY project_id",
+            {"epic_count": "0"},
+        ),
+        "risks": (
+            "SELECT risk_id AS id, MAX(created_at) AS last_update_at FROM risk_updates GROUP BY risk_id",
+            {"last_update_at": "NULL"},
+        ),
+    }
+
+def _risk_delta(row: str, sign: str):
+    return (f"UPDATE epics SET risk_count = risk_count {sign} 1, open_risk_count = open_risk_count {sign} "
+            f"({row}.status IN {_active_statuses()}) WHERE id = {row}.epic_id;")
+
+def _epic_delta(row: str, sign: str):
+    return f"UPDATE projects SET epic_count = epic_count {sign} 1 WHERE id = {row}.project_id;"
+
+def _recompute_last_update(row: str):
+    return (f"UPDATE risks SET last_update_at = (SELECT MAX(created_at) FROM risk_updates WHERE risk_id = {row}.risk_id) "
+            f"WHERE id = {row}.risk_id;")
+
+def triggers():
+    """{name: (event, body)}. Update triggers only fire when a column a counter depends on changed."""
+    return {
+        "counters_risks_insert": ("AFTER INSERT ON risks", _risk_delta("NEW", "+")),
+        "counters_risks_delete": ("AFTER DELETE ON risks", _risk_delta("OLD", "-")),
+        "counters_risks_update": (
+            "AFTER UPDATE OF status, epic_id ON risks WHEN OLD.status IS NOT NEW.status OR OLD.epic_id IS NOT NEW.epic_id",
+            _risk_delta("OLD", "-") + " " + _risk_delta("NEW", "+"),
+        ),
+        "counters_epics_insert": ("AFTER INSERT ON epics", _epic_delta("NEW", "+")),
+        "counters_epics_delete": ("AFTER DELETE ON epics", _epic_delta("OLD", "-")),
+        "counters_epics_update": (
+            "AFTER UPDATE OF project_id ON epics WHEN OLD.project_id IS NOT NEW.project_id",
+            _epic_delta("OLD", "-") + " " + _epic_delta("NEW", "+"),
+        ),
+        # Updates arrive in order, so an insert only compares with the current value
+        "counters_risk_updates_insert": (
+            "AFTER INSERT ON risk_updates",
+            "UPDATE risks SET last_update_at = NEW.created_at WHERE id = NEW.risk_id "
+            "AND (last_update_at IS NULL OR last_update_at < NEW.created_at);",
+        ),
+        "counters_risk_updates_delete": ("AFTER DELETE ON risk_updates", _recompute_last_update("OLD")),
+        "counters_risk_updates_update": (
+            "AFTER UPDATE OF created_at, risk_id ON risk_updates",
+            _recompute_last_update("OLD") + " " + _recompute_last_update("NEW"),
+        ),
+    }
+
+def trigger_statements():
+    """
+    SQL (re)creating the triggers that keep the counters current. Like the change log's,
+    they see every write, including the importers' Core bulk inserts and cascaded deletes.
+    """
+    statements = []
+    for name, (when, body) in triggers().items():
+        statements.append(f"DROP TRIGGER IF EXISTS {name}")
+        statements.append(f"CREATE TRIGGER {name} {when} BEGIN {body} END")
+    return statements
+
+def drop_statements():
+    return [f"DROP TRIGGER IF EXISTS {name}" for name in triggers()]
+
+def _has_counter_columns(connection):
+    for table, (_, empty) in counters().items():
+        present = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if not set(empty) <= present:
+            return False
+    return True
+
+@event.listens_for(Base.metadata, "after_create")
+def create_counter_triggers(target, connection, **kw):
+    # On a database that create_all could not add the columns to, migration 4 adds them and the triggers
+    if connection.dialect.name != "sqlite" or not _has_counter_columns(connection):
+        return
+    for statement in trigger_statements():
+        connection.exec_driver_sql(statement)
+
+def _mismatch_sql(table: str):
+    expected_sql, empty = counters()[table]
+    actual = {column: f"COALESCE(expected.{column}, {value})" for column, value in empty.items()}
+    sql = (
+        f"SELECT {table}.id AS id, "
+        + ", ".join(f"{table}.{column} AS stored_{column}, {value} AS {column}" for column, value in actual.items())
+        + f" FROM {table} LEFT JOIN ({expected_sql}) AS expected ON expected.id = {table}.id WHERE "
+        + " OR ".join(f"{table}.{column} IS NOT {value}" for column, value in actual.items())
+    )
+    return sql, list(actual)
+
+def verify_counters(db: Session, repair: bool = False, sample: int = 10):
+    """
+    Recounts every denormalized column from the child tables, one grouped pass per table.
+    Returns {table: {"mismatched", "sample"}}, the sample holding the first rows' stored
+    and actual values. With `repair`, mismatched rows get the actual values, in one transaction.
+    """
+    report = {}
+    try:
+        for table in counters():
+            sql, columns = _mismatch_sql(table)
+            rows = db.execute(text(sql)).mappings().all()
+            report[table] = {"mismatched": len(rows), "sample": [dict(row) for row in rows[:sample]]}
+            if repair and rows:
+                db.execute(text(
+                    f"UPDATE {table} SET " + ", ".join(f"{column} = fix.{column}" for column in columns)
+                    + f" FROM ({sql}) AS fix WHERE {table}.id = fix.id"
+                ))
+                logger.warning(f"Repaired {len(rows)} {table} counter row(s)")
+        if repair:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return report
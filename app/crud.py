@@ -1,11 +1,17 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 from . import models, schemas
-from datetime import date
+# Registers the triggers behind the denormalized counter columns
+from . import counters
+from datetime import date, datetime, timezone
 import calendar
 
 # Project CRUD operations
-def get_projects(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Project).offset(skip).limit(limit).all()
+def get_projects(db: Session, skip: int = 0, limit: int = 100, sort: str = None):
+    query = db.query(models.Project)
+    if sort == "epic_count":
+        query = query.order_by(models.Project.epic_count.desc(), models.Project.id)
+    return query.offset(skip).limit(limit).all()
 
 def get_project(db: Session, project_id: int):
     return db.query(models.Project).filter(models.Project.id == project_id).first()
@@ -39,12 +45,22 @@ def delete_project(db: Session, project_id: int):
     return False
 
 # Epic CRUD operations
-def get_epics(db: Session, project_id: int = None, status: str = None, quarter: str = None, skip: int = 0, limit: int = 1000):
-    query = db.query(models.Epic)
+# Epic list orderings on the denormalized counters, highest first
+EPIC_COUNTER_SORTS = {
+    "risk_count": models.Epic.risk_count,
+    "open_risk_count": models.Epic.open_risk_count,
+}
+
+def get_epics(db: Session, project_id: int = None, status: str = None, quarter: str = None, skip: int = 0, limit: int = 1000,
+              min_open_risks: int = None, sort: str = None):
+    # Lists show each epic's project name; joining it avoids a query per project
+    query = db.query(models.Epic).options(joinedload(models.Epic.project))
     if project_id:
         query = query.filter(models.Epic.project_id == project_id)
     if status:
         query = query.filter(models.Epic.status == status)
+    if min_open_risks is not None:
+        query = query.filter(models.Epic.open_risk_count >= min_open_risks)
     if quarter and quarter != "":
         try:
             year, q_num = quarter.split('-Q')
@@ -65,7 +81,28 @@ def get_epics(db: Session, project_id: int = None, status: str = None, quarter:
             # Pass silently if the quarter format is invalid
             pass
 
-    return query.order_by(models.Epic.target_launch_date.desc()).offset(skip).limit(limit).all()
+    if sort in EPIC_COUNTER_SORTS:
+        query = query.order_by(EPIC_COUNTER_SORTS[sort].desc(), models.Epic.id)
+    else:
+        query = query.order_by(models.Epic.target_launch_date.desc())
+    return query.offset(skip).limit(limit).all()
+
+def get_epics_by_exposure(db: Session, project_id: int = None, limit: int = 1000, min_open_risks: int = None):
+    """Epics by stored exposure score, highest first, each with `exposure_score` set. See app/exposure.py."""
+    query = (
+        db.query(models.Epic, models.EpicExposure.score)
+        .outerjoin(models.EpicExposure, models.EpicExposure.epic_id == models.Epic.id)
+        .order_by(models.EpicExposure.score.desc().nulls_last(), models.Epic.id)
+    )
+    if project_id:
+        query = query.filter(models.Epic.project_id == project_id)
+    if min_open_risks is not None:
+        query = query.filter(models.Epic.open_risk_count >= min_open_risks)
+    epics = []
+    for epic, score in query.limit(limit).all():
+        epic.exposure_score = score
+        epics.append(epic)
+    return epics
 
 def get_epics_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100):
     return db.query(models.Epic).filter(models.Epic.project_id == project_id).offset(skip).limit(limit).all()
@@ -73,9 +110,78 @@ def get_epics_by_project(db: Session, project_id: int, skip: int = 0, limit: int
 def get_epic(db: Session, epic_id: int):
     return db.query(models.Epic).filter(models.Epic.id == epic_id).first()
 
+def get_epic_detail(db: Session, epic_id: int):
+    """
+    An epic with its project, risks and every risk's updates, loaded in three queries
+    whatever the number of risks: the epic joined to its project, then one IN query each
+    for the risks and their updates. The epic page reads nothing else lazily.
+    """
+    return (
+        db.query(models.Epic)
+        .options(
+            joinedload(models.Epic.project),
+            selectinload(models.Epic.risks).selectinload(models.Risk.updates),
+        )
+        .filter(models.Epic.id == epic_id)
+        .first()
+    )
+
 def get_epic_by_jira_key(db: Session, jira_epic_key: str):
     return db.query(models.Epic).filter(models.Epic.jira_epic_key == jira_epic_key).first()
 
+def get_epics_by_jira_keys(db: Session, jira_epic_keys: list):
+    """Returns a {jira_epic_key: Epic} dict for all the given keys using a single IN query."""
+    if not jira_epic_keys:
+        return {}
+    epics = db.query(models.Epic).filter(models.Epic.jira_epic_key.in_(jira_epic_keys)).all()
+    return {epic.jira_epic_key: epic for epic in epics}
+
+def bulk_upsert_epics(db: Session, epics: list):
+    """
+    Inserts or updates many epics, matched on jira_epic_key, in a single transaction.
+    Each item is a dict of JiraEpicUpsert fields, so it must include jira_epic_key.
+    Existing epics whose stored values already match are not written at all,
+    so their updated_at is left untouched. Keys of archived epics count as unchanged:
+    the epic comes back through archive.restore_epic, not as a new live copy.
+    Returns an (imported, updated, unchanged) tuple of counts.
+    """
+    # Validate and normalize (e.g. date strings) once, keeping the last entry per key
+    epics_by_key = {}
+    for epic in epics:
+        epic_data = schemas.JiraEpicUpsert(**epic).model_dump(exclude_unset=True)
+        epics_by_key[epic_data['jira_epic_key']] = epic_data
+
+    existing = get_epics_by_jira_keys(db, list(epics_by_key))
+    archived_keys = {key for (key,) in db.query(models.ArchivedEpic.jira_epic_key)
+                     .filter(models.ArchivedEpic.jira_epic_key.in_(list(epics_by_key)))}
+    inserts = []
+    updates = []
+    unchanged = 0
+    for jira_epic_key, epic_data in epics_by_key.items():
+        db_epic = existing.get(jira_epic_key)
+        if db_epic is None and jira_epic_key in archived_keys:
+            unchanged += 1
+        elif db_epic is None:
+            inserts.append(epic_data)
+        elif any(getattr(db_epic, key) != value for key, value in epic_data.items()):
+            updates.append({'id': db_epic.id, **epic_data})
+        else:
+            unchanged += 1
+
+    if not inserts and not updates:
+        return 0, 0, unchanged
+
+    try:
+        if inserts:
+            db.execute(insert(models.Epic), inserts)
+        if updates:
+            db.execute(update(models.Epic), updates)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(inserts), len(updates), unchanged
+
 def create_epic(db: Session, epic: schemas.EpicCreate):
     db_epic = models.Epic(**epic.model_dump())
     db.add(db_epic)
@@ -93,18 +199,58 @@ def update_epic(db: Session, epic_id: int, epic: schemas.EpicUpdate):
         db.refresh(db_epic)
     return db_epic
 
+def _detach_outbox_messages(db: Session, epic_ids: list):
+    """Does what ondelete="SET NULL" would, since SQLite runs without PRAGMA foreign_keys."""
+    db.execute(update(models.EmailOutbox).where(models.EmailOutbox.epic_id.in_(epic_ids)).values(epic_id=None))
+
 def delete_epic(db: Session, epic_id: int):
     db_epic = db.query(models.Epic).filter(models.Epic.id == epic_id).first()
     if db_epic:
         db.delete(db_epic)
+        _detach_outbox_messages(db, [epic_id])
         db.commit()
         return True
     return False
 
+def delete_epics_by_jira_keys(db: Session, jira_epic_keys: list):
+    """Deletes the epics (and their risks) with the given Jira keys in one transaction. Returns the count."""
+    db_epics = list(get_epics_by_jira_keys(db, jira_epic_keys).values())
+    if not db_epics:
+        return 0
+    for db_epic in db_epics:
+        db.delete(db_epic)
+    _detach_outbox_messages(db, [db_epic.id for db_epic in db_epics])
+    db.commit()
+    return len(db_epics)
+
 # Risk CRUD operations
 def get_risks_by_epic(db: Session, epic_id: int):
     return db.query(models.Risk).filter(models.Risk.epic_id == epic_id).all()
 
+def get_risks(db: Session, epic_id: int = None, status: str = None, updated_before: datetime = None,
+              updated_since: datetime = None, sort: str = None, skip: int = 0, limit: int = 1000):
+    """
+    Risks filtered on their last update. Risks without updates count as updated before
+    any time, so `updated_before` finds them too. sort="last_update_at" puts the most
+    recently updated first, "-last_update_at" the longest idle first.
+    """
+    query = db.query(models.Risk)
+    if epic_id is not None:
+        query = query.filter(models.Risk.epic_id == epic_id)
+    if status:
+        query = query.filter(models.Risk.status == status)
+    if updated_before is not None:
+        query = query.filter(or_(models.Risk.last_update_at.is_(None), models.Risk.last_update_at < updated_before))
+    if updated_since is not None:
+        query = query.filter(models.Risk.last_update_at >= updated_since)
+    if sort == "last_update_at":
+        query = query.order_by(models.Risk.last_update_at.desc().nulls_last(), models.Risk.id)
+    elif sort == "-last_update_at":
+        query = query.order_by(models.Risk.last_update_at.asc().nulls_first(), models.Risk.id)
+    else:
+        query = query.order_by(models.Risk.id)
+    return query.offset(skip).limit(limit).all()
+
 def get_risk(db: Session, risk_id: int):
     return db.query(models.Risk).filter(models.Risk.id == risk_id).first()
 
@@ -142,4 +288,134 @@ def create_risk_update(db: Session, update: schemas.RiskUpdateCreate, risk_id: i
     db.add(db_update)
     db.commit()
     db.refresh(db_update)
-    return db_update 
\ No newline at end of file
+    return db_update
+
+# Email outbox operations
+def create_outbox_message(db: Session, kind: str, message, epic_id: int = None):
+    """Queues a fully built email message; it is sent later by the outbox drainer."""
+    db_message = models.EmailOutbox(
+        kind=kind,
+        epic_id=epic_id,
+        recipient=message["To"],
+        subject=message["Subject"],
+        body=message.as_string(),
+        status="pending",
+        next_attempt_at=datetime.now(timezone.utc),
+    )
+    db.add(db_message)
+    db.commit()
+    db.refresh(db_message)
+    return db_message
+
+def get_outbox_message(db: Session, message_id: int):
+    return db.query(models.EmailOutbox).filter(models.EmailOutbox.id == message_id).first()
+
+def get_outbox_messages_by_epic(db: Session, epic_id: int, kind: str = None):
+    query = db.query(models.EmailOutbox).filter(models.EmailOutbox.epic_id == epic_id)
+    if kind:
+        query = query.filter(models.EmailOutbox.kind == kind)
+    return query.order_by(models.EmailOutbox.id.desc()).all()
+
+def claim_outbox_batch(db: Session, limit: int):
+    """
+    Marks up to `limit` due pending messages as sending and counts the attempt, in one transaction.
+    Returns (id, body, attempts) tuples so callers do not hold ORM objects across threads.
+    """
+    now = datetime.now(timezone.utc)
+    db_messages = (
+        db.query(models.EmailOutbox)
+        .filter(models.EmailOutbox.status == "pending", models.EmailOutbox.next_attempt_at <= now)
+        .order_by(models.EmailOutbox.next_attempt_at, models.EmailOutbox.id)
+        .limit(limit)
+        .all()
+    )
+    for db_message in db_messages:
+        db_message.status = "sending"
+        db_message.attempts += 1
+    db.commit()
+    return [(m.id, m.body, m.attempts) for m in db_messages]
+
+def record_outbox_results(db: Session, sent_ids: list, retries: dict, dead: dict):
+    """
+    Stores the outcome of a drained batch in one transaction.
+    `retries` maps message id to (error, next_attempt_at); `dead` maps message id to error.
+    """
+    now = datetime.now(timezone.utc)
+    if sent_ids:
+        db.execute(update(models.EmailOutbox), [
+            {"id": message_id, "status": "sent", "sent_at": now, "last_error": None} for message_id in sent_ids
+        ])
+    if retries:
+        db.execute(update(models.EmailOutbox), [
+            {"id": message_id, "status": "pending", "last_error": error, "next_attempt_at": next_attempt_at}
+            for message_id, (error, next_attempt_at) in retries.items()
+        ])
+    if dead:
+        db.execute(update(models.EmailOutbox), [
+            {"id": message_id, "status": "dead", "last_error": error} for message_id, error in dead.items()
+        ])
+    db.commit()
+
+def requeue_stuck_outbox_messages(db: Session):
+    """Puts messages left in 'sending' by a crash back in the queue. Returns how many were requeued."""
+    count = (
+        db.query(models.EmailOutbox)
+        .filter(models.EmailOutbox.status == "sending")
+        .update({"status": "pending"}, synchronize_session=False)
+    )
+    db.commit()
+    return count
+
+# Digest queries
+# Risks that still need attention, and epic statuses that no longer have a deadline
+ACTIVE_RISK_STATUSES = ("Open", "Mitigating")
+CLOSED_EPIC_STATUSES = ("Launched", "Cancelled")
+
+def get_upcoming_deadlines(db: Session, start: date, end: date, limit: int = None):
+    """
+    Unfinished epics whose target launch date falls between start and end, soonest first,
+    with their project and active risk count. Returns rows, not Epic objects.
+    """
+    query = (
+        db.query(
+            models.Epic.id, models.Epic.title, models.Epic.target_launch_date, models.Epic.status,
+            models.Epic.project_id, models.Project.name.label("project_name"), models.Project.jira_project_key,
+            models.Epic.open_risk_count.label("open_risks"),
+        )
+        .outerjoin(models.Project, models.Epic.project_id == models.Project.id)
+        .filter(
+            models.Epic.target_launch_date.between(start, end),
+            models.Epic.actual_launch_date.is_(None),
+            models.Epic.status.notin_(CLOSED_EPIC_STATUSES),
+        )
+        .order_by(models.Epic.target_launch_date, models.Epic.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+def get_stale_risks(db: Session, cutoff: datetime, limit: int = None):
+    """
+    Active risks on unfinished epics with no update (or, without updates, no creation) since cutoff,
+    oldest activity first. Returns rows, not Risk objects.
+    """
+    last_activity = func.coalesce(models.Risk.last_update_at, models.Risk.created_at)
+    query = (
+        db.query(
+            models.Risk.id, models.Risk.description, models.Risk.status, models.Risk.epic_id,
+            models.Epic.title.label("epic_title"), models.Epic.project_id,
+            models.Project.name.label("project_name"), models.Project.jira_project_key,
+            last_activity.label("last_activity"),
+        )
+        .join(models.Epic, models.Risk.epic_id == models.Epic.id)
+        .outerjoin(models.Project, models.Epic.project_id == models.Project.id)
+        .filter(
+            models.Risk.status.in_(ACTIVE_RISK_STATUSES),
+            models.Epic.status.notin_(CLOSED_EPIC_STATUSES),
+            last_activity < cutoff,
+        )
+        .order_by(last_activity, models.Risk.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return query.all()
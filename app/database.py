@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -12,6 +12,21 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
 )
 
+# WAL lets readers (including online backups) run alongside a writer; set to DELETE for the old behaviour
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+# Applies to new database files only (existing ones: python database_migration.py vacuum); INCREMENTAL
+# lets the maintenance job in app/maintenance.py give pages freed by deletes back in small steps
+SQLITE_AUTO_VACUUM = os.getenv("SQLITE_AUTO_VACUUM", "INCREMENTAL")
+
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite:///") and ":memory:" not in SQLALCHEMY_DATABASE_URL:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_journal_mode(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # Must come before the first table is created; a no-op on an existing file
+        cursor.execute(f"PRAGMA auto_vacuum={SQLITE_AUTO_VACUUM}")
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.close()
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -1,26 +1,227 @@
+import asyncio
+import logging
 import os
+import random
+import time
 import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from . import models
 
-async def send_date_change_request(epic: models.Epic, reason: str, proposed_date: str = None):
-    """Send email request for epic date change to manager."""
-    
-    # Email configuration from environment variables
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_username = os.getenv("SMTP_USERNAME")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    manager_email = os.getenv("MANAGER_EMAIL")
-    sender_email = os.getenv("SENDER_EMAIL", "noreply@risktracker.com")
-    
-    if not all([smtp_username, smtp_password, manager_email]):
-        raise Exception("Email configuration incomplete. Please set SMTP_USERNAME, SMTP_PASSWORD, and MANAGER_EMAIL environment variables.")
-    
+logger = logging.getLogger(__name__)
+
+class EmailConfigurationError(Exception):
+    """Raised when the SMTP settings needed to send mail are missing."""
+
+class EmailSettings:
+    """Outbound mail configuration. Parsed from the environment once, see `get_email_settings()`."""
+
+    def __init__(self, smtp_server: str = "smtp.gmail.com", smtp_port: int = 587, smtp_username: str = None,
+                 smtp_password: str = None, manager_email: str = None, sender_email: str = "noreply@risktracker.com",
+                 start_tls: bool = True, timeout: float = 30.0, max_connections: int = 2, max_retries: int = 3,
+                 backoff_base: float = 1.0, backoff_max: float = 30.0, healthcheck_idle_seconds: float = 60.0):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.smtp_username = smtp_username
+        self.smtp_password = smtp_password
+        self.manager_email = manager_email
+        self.sender_email = sender_email
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.healthcheck_idle_seconds = healthcheck_idle_seconds
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            smtp_server=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+            smtp_port=int(os.getenv("SMTP_PORT", "587")),
+            smtp_username=os.getenv("SMTP_USERNAME"),
+            smtp_password=os.getenv("SMTP_PASSWORD"),
+            manager_email=os.getenv("MANAGER_EMAIL"),
+            sender_email=os.getenv("SENDER_EMAIL", "noreply@risktracker.com"),
+            start_tls=os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes"),
+            timeout=float(os.getenv("SMTP_TIMEOUT", "30")),
+            # Upper bound on parallel SMTP sessions, and so on messages in flight
+            max_connections=int(os.getenv("SMTP_MAX_CONNECTIONS", "2")),
+            max_retries=int(os.getenv("SMTP_MAX_RETRIES", "3")),
+            backoff_base=float(os.getenv("SMTP_BACKOFF_BASE_SECONDS", "1")),
+            backoff_max=float(os.getenv("SMTP_BACKOFF_MAX_SECONDS", "30")),
+            # An idle connection older than this gets a NOOP before it is reused
+            healthcheck_idle_seconds=float(os.getenv("SMTP_HEALTHCHECK_IDLE_SECONDS", "60")),
+        )
+
+    def validate(self):
+        if not all([self.smtp_username, self.smtp_password, self.manager_email]):
+            raise EmailConfigurationError(
+                "Email configuration incomplete. Please set SMTP_USERNAME, SMTP_PASSWORD, "
+                "and MANAGER_EMAIL environment variables."
+            )
+
+def _is_retryable(error: Exception):
+    """Connection problems and 4xx replies are transient; 5xx replies (bad recipient, auth) are not."""
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 400 <= error.code < 500
+    return isinstance(error, (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError,
+                              aiosmtplib.SMTPTimeoutError, ConnectionError, OSError, asyncio.TimeoutError))
+
+class SMTPTransport:
+    """
+    Sends mail over a small pool of persistent, authenticated SMTP connections.
+
+    At most `max_connections` messages are in flight at once; each borrows an idle
+    connection (or opens one) instead of paying connect, STARTTLS and login per
+    message. Connections idle for longer than `healthcheck_idle_seconds` are checked
+    with NOOP before reuse. Transient failures are retried with exponential backoff
+    and jitter on a fresh connection.
+
+    Connections belong to the event loop that opened them, so the pool starts over
+    when it is used from a different loop.
+    """
+
+    def __init__(self, settings: EmailSettings, sleep=asyncio.sleep, clock=time.monotonic):
+        self.settings = settings
+        self._sleep = sleep
+        self._clock = clock
+        self._loop = None
+        self._semaphore = None
+        self._idle = []
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self.retries_total = 0
+
+    async def send(self, message, max_retries: int = None):
+        """
+        Sends one message, retrying transient failures up to `max_retries` times (default:
+        settings.max_retries). Raises the last error when retries run out.
+        """
+        if max_retries is None:
+            max_retries = self.settings.max_retries
+        self._bind_loop()
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                client = None
+                try:
+                    client = await self._acquire()
+                    await client.send_message(message)
+                except Exception as e:
+                    if not _is_retryable(e):
+                        self._release(client)
+                        raise
+                    self._discard(client)
+                    if attempt >= max_retries:
+                        raise
+                    delay = random.uniform(0, min(self.settings.backoff_max, self.settings.backoff_base * 2 ** attempt))
+                    logger.warning(
+                        f"Sending mail failed ({e}), retrying in {delay:.1f}s "
+                        f"[{attempt + 1}/{max_retries}]"
+                    )
+                    await self._sleep(delay)
+                    attempt += 1
+                    self.retries_total += 1
+                    continue
+                self._release(client)
+                self.messages_sent += 1
+                return
+
+    async def close(self):
+        """Politely closes every idle connection."""
+        idle, self._idle = self._idle, []
+        for client, _ in idle:
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+
+    def metrics(self):
+        return {
+            "connections_opened": self.connections_opened,
+            "idle_connections": len(self._idle),
+            "messages_sent": self.messages_sent,
+            "retries_total": self.retries_total,
+        }
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.settings.max_connections)
+            self._idle = []
+
+    async def _acquire(self):
+        while self._idle:
+            client, last_used = self._idle.pop()
+            if not client.is_connected:
+                continue
+            if self._clock() - last_used > self.settings.healthcheck_idle_seconds:
+                try:
+                    await client.noop()
+                except Exception as e:
+                    logger.info(f"Idle SMTP connection failed its health check ({e}), reconnecting.")
+                    self._discard(client)
+                    continue
+            return client
+        return await self._connect()
+
+    async def _connect(self):
+        settings = self.settings
+        client = aiosmtplib.SMTP(
+            hostname=settings.smtp_server,
+            port=settings.smtp_port,
+            username=settings.smtp_username,
+            password=settings.smtp_password,
+            start_tls=settings.start_tls,
+            timeout=settings.timeout,
+        )
+        # Connects, upgrades with STARTTLS and logs in
+        await client.connect()
+        self.connections_opened += 1
+        return client
+
+    def _release(self, client):
+        if client is not None and client.is_connected:
+            self._idle.append((client, self._clock()))
+
+    def _discard(self, client):
+        if client is not None:
+            client.close()
+
+_settings = None
+_transport = None
+
+def get_email_settings():
+    """Returns the mail settings, parsing the environment on first use."""
+    global _settings
+    if _settings is None:
+        _settings = EmailSettings.from_env()
+    return _settings
+
+def get_mail_transport():
+    """Returns the process-wide SMTP transport."""
+    global _transport
+    if _transport is None:
+        _transport = SMTPTransport(get_email_settings())
+    return _transport
+
+async def reset_mail_transport(settings: EmailSettings = None):
+    """Closes the shared transport and re-reads the settings (or uses the given ones) on next use."""
+    global _settings, _transport
+    if _transport is not None:
+        await _transport.close()
+    _settings = settings
+    _transport = None
+
+def build_date_change_message(epic: models.Epic, reason: str, proposed_date: str = None, settings: EmailSettings = None):
+    """Builds the date change request email for an epic."""
+    settings = settings or get_email_settings()
+
     # Create email content
     subject = f"Date Change Request for Epic: {epic.title}"
-    
+
     # Build email body
     body_lines = [
         f"Date Change Request",
@@ -35,7 +236,7 @@ async def send_date_change_request(epic: models.Epic, reason: str, proposed_date
         f"",
         f"Associated Risks:",
     ]
-    
+
     # Add risks information
     if epic.risks:
         for risk in epic.risks:
@@ -47,32 +248,76 @@ async def send_date_change_request(epic: models.Epic, reason: str, proposed_date
                 body_lines.append("")
     else:
         body_lines.append("No active risks associated with this epic.")
-    
+
     body_lines.extend([
         "",
         "Please review and approve/reject this date change request.",
         "",
         "Generated by Risk Tracker Application"
     ])
-    
+
     body = "\n".join(body_lines)
-    
+
     # Create email message
     message = MIMEMultipart()
-    message["From"] = sender_email
-    message["To"] = manager_email
+    message["From"] = settings.sender_email
+    message["To"] = settings.manager_email
     message["Subject"] = subject
     message.attach(MIMEText(body, "plain"))
-    
-    # Send email
+    return message
+
+def build_digest_message(recipient: str, deadlines: list, stale_risks: list, deadline_days: int,
+                         stale_risk_days: int, settings: EmailSettings = None):
+    """Builds the deadline and stale-risk digest from rows returned by the crud digest queries."""
+    settings = settings or get_email_settings()
+
+    body_lines = [
+        f"Risk Tracker Digest",
+        f"===================",
+        f"",
+        f"Epics due in the next {deadline_days} days ({len(deadlines)}):",
+    ]
+    for epic in deadlines:
+        project = f" [{epic.project_name}]" if epic.project_name else ""
+        body_lines.append(f"• {epic.target_launch_date}  {epic.title}{project}")
+        body_lines.append(f"  Status: {epic.status}, active risks: {epic.open_risks}")
+    if not deadlines:
+        body_lines.append("None.")
+
+    body_lines.extend(["", f"Active risks without an update in {stale_risk_days} days ({len(stale_risks)}):"])
+    for risk in stale_risks:
+        last_activity = risk.last_activity.date() if hasattr(risk.last_activity, "date") else risk.last_activity
+        body_lines.append(f"• Risk: {risk.description}")
+        body_lines.append(f"  Epic: {risk.epic_title}, status: {risk.status}, last activity: {last_activity}")
+    if not stale_risks:
+        body_lines.append("None.")
+
+    body_lines.extend(["", "Generated by Risk Tracker Application"])
+
+    message = MIMEText("\n".join(body_lines), "plain")
+    message["From"] = settings.sender_email
+    message["To"] = recipient
+    message["Subject"] = (
+        f"Risk Tracker Digest: {len(deadlines)} upcoming deadline(s), {len(stale_risks)} stale risk(s)"
+    )
+    return message
+
+async def send_messages_over_one_session(messages: list, settings: EmailSettings = None):
+    """
+    Sends messages one after another on a private transport, so they share a single SMTP
+    session, then closes it. Returns the list of (message, error) pairs that failed.
+    """
+    settings = settings or get_email_settings()
+    settings.validate()
+    transport = SMTPTransport(settings)
+    failures = []
     try:
-        await aiosmtplib.send(
-            message,
-            hostname=smtp_server,
-            port=smtp_port,
-            start_tls=True,
-            username=smtp_username,
-            password=smtp_password,
-        )
-    except Exception as e:
-        raise Exception(f"Failed to send email: {str(e)}") 
\ No newline at end of file
+        for message in messages:
+            try:
+                await transport.send(message)
+            except Exception as e:
+                logger.error(f"Failed to send '{message['Subject']}' to {message['To']}: {e}")
+                failures.append((message, e))
+    finally:
+        await transport.close()
+    return failures
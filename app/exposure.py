@@ -0,0 +1,174 @@
+import logging
+import os
+import time
+from datetime import datetime
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from . import changes, crud, models
+from .database import SessionLocal
+
+# Mean age of an epic's active risks at which the age input saturates
+EXPOSURE_RISK_AGE_DAYS = float(os.getenv("EXPOSURE_RISK_AGE_DAYS", "90"))
+# Days without a risk update at which the staleness input saturates
+EXPOSURE_STALE_DAYS = float(os.getenv("EXPOSURE_STALE_DAYS", "30"))
+# Launches closer than this raise exposure linearly; overdue epics get the full launch input
+EXPOSURE_LAUNCH_WINDOW_DAYS = float(os.getenv("EXPOSURE_LAUNCH_WINDOW_DAYS", "60"))
+# How often the scheduler catches the scores up, so reads rarely have work to do; 0 disables
+EXPOSURE_REFRESH_MINUTES = float(os.getenv("EXPOSURE_REFRESH_MINUTES", "10"))
+# Above this many touched epics a full pass is cheaper than rescoring them by id
+EXPOSURE_INCREMENTAL_LIMIT = 5000
+
+logger = logging.getLogger(__name__)
+
+# Weights of the normalized (0-1) inputs; they sum to 1, so scores run from 0 to 100
+WEIGHTS = {"open_risks": 0.30, "risk_age": 0.15, "staleness": 0.20, "launch": 0.20, "status": 0.15}
+# Status input per epic status; unknown statuses count as in progress
+STATUS_INPUTS = {"Blocked": 1.0, "Delayed": 0.8, "In Progress": 0.3, "Planned": 0.1}
+# Open-risk count at which the count input reaches about 63%
+OPEN_RISKS_SCALE = 3.0
+
+def compute_scores(epic_ids, statuses, days_to_launch, closed, risk_epic_ids, risk_age_days, risk_idle_days):
+    """
+    Exposure scores for many epics at once, as NumPy array operations.
+
+    Epic arrays are aligned with `epic_ids`, which must be sorted; days_to_launch is NaN
+    without a target date. Risk arrays hold one entry per active risk: its epic, its age
+    and the days since its last update (or creation). Closed epics score 0. Returns a
+    dict of arrays: score and the per-epic inputs.
+    """
+    n = len(epic_ids)
+    positions = np.searchsorted(epic_ids, risk_epic_ids)
+    open_risks = np.bincount(positions, minlength=n)
+    has_risks = open_risks > 0
+    mean_age = np.full(n, np.nan)
+    mean_age[has_risks] = np.bincount(positions, weights=risk_age_days, minlength=n)[has_risks] / open_risks[has_risks]
+    # Days since the most recent update on any of the epic's active risks
+    idle = np.full(n, np.inf)
+    np.minimum.at(idle, positions, risk_idle_days)
+    idle[~has_risks] = np.nan
+
+    status_values, status_index = np.unique(statuses, return_inverse=True)
+    status_input = np.array([STATUS_INPUTS.get(status, STATUS_INPUTS["In Progress"]) for status in status_values])
+
+    inputs = {
+        "open_risks": 1 - np.exp(-open_risks / OPEN_RISKS_SCALE),
+        "risk_age": np.nan_to_num(np.clip(mean_age / EXPOSURE_RISK_AGE_DAYS, 0, 1)),
+        "staleness": np.nan_to_num(np.clip(idle / EXPOSURE_STALE_DAYS, 0, 1)),
+        "launch": np.nan_to_num(np.clip(1 - days_to_launch / EXPOSURE_LAUNCH_WINDOW_DAYS, 0, 1)),
+        "status": status_input[status_index.reshape(-1)] if n else np.zeros(0),
+    }
+    score = 100 * sum(WEIGHTS[name] * values for name, values in inputs.items())
+    score[closed] = 0
+    return {"score": np.round(score, 2), "open_risks": open_risks, "mean_risk_age_days": mean_age,
+            "days_since_update": idle, "days_to_launch": days_to_launch}
+
+def _columns(rows, count: int):
+    """Row tuples to one float array per column; NULL becomes NaN."""
+    if not rows:
+        return [np.zeros(0)] * count
+    # Transpose first: NumPy converts tuples of floats far faster than a list of Row objects
+    return [np.array(column, dtype=float) for column in zip(*rows)]
+
+def _load_inputs(db: Session, epic_ids: list, now: datetime):
+    """Reads just the scoring columns, with SQLite doing the date arithmetic: no ORM objects."""
+    Epic, Risk = models.Epic, models.Risk
+    today = now.date().isoformat()
+    epics = select(
+        Epic.id, Epic.status, func.julianday(Epic.target_launch_date) - func.julianday(today),
+        Epic.actual_launch_date.is_not(None),
+    ).order_by(Epic.id)
+    risks = select(
+        Risk.epic_id,
+        func.julianday(today) - func.julianday(Risk.date_added),
+        func.julianday(now.isoformat(sep=" ")) - func.julianday(func.coalesce(Risk.last_update_at, Risk.created_at)),
+    ).where(Risk.status.in_(crud.ACTIVE_RISK_STATUSES))
+    if epic_ids is not None:
+        epics = epics.where(Epic.id.in_(epic_ids))
+        risks = risks.where(Risk.epic_id.in_(epic_ids))
+
+    # Core rows, skipping the ORM result layer
+    connection = db.connection()
+    epic_rows = connection.execute(epics).all()
+    ids = np.array([row[0] for row in epic_rows], dtype=np.int64)
+    statuses = np.array([row[1] for row in epic_rows], dtype=object)
+    days_to_launch, launched = _columns([row[2:] for row in epic_rows], 2)
+    closed = (launched > 0) | np.isin(statuses, crud.CLOSED_EPIC_STATUSES)
+    risk_epic_ids, risk_age_days, risk_idle_days = _columns(connection.execute(risks).all(), 3)
+    return ids, statuses, days_to_launch, closed, risk_epic_ids.astype(np.int64), risk_age_days, risk_idle_days
+
+def score_epics(db: Session, epic_ids: list = None, now: datetime = None):
+    """
+    Recomputes and stores the scores of the given epics (all when None) in the current
+    transaction. Rows of epics that no longer exist are removed. Returns the number scored.
+    """
+    now = now or datetime.utcnow()
+    ids, *inputs = _load_inputs(db, epic_ids, now)
+    result = compute_scores(ids, *inputs)
+
+    Exposure = models.EpicExposure
+    stale = delete(Exposure)
+    if epic_ids is not None:
+        stale = stale.where(Exposure.epic_id.in_(epic_ids))
+    db.execute(stale)
+    if len(ids):
+        def nullable(values, cast):
+            values = values.astype(object)
+            values[np.isnan(values.astype(float))] = None
+            return [None if value is None else cast(value) for value in values]
+
+        # Plain tuples through the driver: per-row ORM/Core bind processing would cost more than the scoring
+        db.connection().exec_driver_sql(
+            "INSERT INTO epic_exposure (epic_id, score, open_risks, mean_risk_age_days, days_since_update, "
+            "days_to_launch, computed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            list(zip(ids.tolist(), result["score"].tolist(), result["open_risks"].tolist(),
+                     nullable(result["mean_risk_age_days"], float), nullable(result["days_since_update"], float),
+                     nullable(result["days_to_launch"], int), [now.isoformat(sep=" ")] * len(ids))),
+        )
+    return len(ids)
+
+def refresh(db: Session, now: datetime = None):
+    """
+    Brings the stored scores up to date. Only epics with change log entries since the last
+    refresh are rescored; everything is rescored once a day, since ages and deadlines move
+    without any write, and when compaction has dropped entries the last refresh did not see.
+    Returns {"epics_scored", "full"}.
+    """
+    now = now or datetime.utcnow()
+    state = db.get(models.ExposureState, 1)
+    latest = db.query(func.max(models.ChangeLog.id)).scalar() or 0
+    full = state is None or state.scored_on != now.date() or state.cursor < changes.get_horizon(db)
+    epic_ids = None
+    if not full:
+        if latest == state.cursor:
+            return {"epics_scored": 0, "full": False}
+        epic_ids = [row[0] for row in db.query(models.ChangeLog.epic_id).filter(
+            models.ChangeLog.id > state.cursor, models.ChangeLog.id <= latest,
+            models.ChangeLog.epic_id.is_not(None),
+        ).distinct()]
+        full = len(epic_ids) > EXPOSURE_INCREMENTAL_LIMIT
+    try:
+        scored = score_epics(db, None if full else epic_ids, now=now)
+        if state is None:
+            state = models.ExposureState(id=1)
+            db.add(state)
+        state.cursor = latest
+        state.scored_on = now.date()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"epics_scored": scored, "full": full}
+
+def run_scheduled_refresh():
+    """Scheduler entry point."""
+    db = SessionLocal()
+    try:
+        started = time.monotonic()
+        result = refresh(db)
+        if result["epics_scored"]:
+            logger.info(f"Exposure scores refreshed: {result} in {time.monotonic() - started:.2f}s")
+    except Exception as e:
+        logger.error(f"Exposure refresh failed: {e}", exc_info=True)
+    finally:
+        db.close()
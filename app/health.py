@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from urllib.parse import urlparse
+from sqlalchemy import text
+from . import email_service, jira_service, migrations
+from .database import SessionLocal
+from .scheduler import scheduler
+
+# Readiness results are reused this long, so frequent probes do not each hit the database, Jira and SMTP
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "5"))
+# Upper bound on each individual check; a dependency slower than this counts as down
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+
+logger = logging.getLogger(__name__)
+
+class CheckSkipped(Exception):
+    """Raised by a check whose dependency is not configured."""
+
+def check_database(session_factory=SessionLocal):
+    """One round trip on a pooled connection, plus the schema version; no table scans."""
+    db = session_factory()
+    try:
+        db.execute(text("SELECT 1"))
+        has_migrations = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'")
+        ).first() if db.get_bind().dialect.name == "sqlite" else None
+        version = db.execute(
+            text("SELECT MAX(version) FROM schema_migrations WHERE status = 'applied'")
+        ).scalar() if has_migrations else None
+        return {"schema_version": version, "latest_schema_version": migrations.MIGRATIONS[-1].version}
+    finally:
+        db.close()
+
+def check_scheduler():
+    if not scheduler.running:
+        raise RuntimeError("Scheduler is not running")
+    jobs = scheduler.get_jobs()
+    next_run = min((job.next_run_time for job in jobs if job.next_run_time), default=None)
+    return {"jobs": len(jobs), "next_run_time": next_run.isoformat() if next_run else None}
+
+def _connect(host: str, port: int, timeout: float):
+    # A TCP handshake shows the server is reachable without spending API quota or a login
+    started = time.monotonic()
+    with socket.create_connection((host, port), timeout=timeout):
+        return round((time.monotonic() - started) * 1000, 1)
+
+def check_jira(timeout: float = HEALTH_CHECK_TIMEOUT_SECONDS):
+    server = os.getenv("JIRA_SERVER")
+    if not server:
+        raise CheckSkipped("JIRA_SERVER is not set")
+    circuit_state = jira_service.get_jira_throttle(server).metrics()["circuit_state"]
+    if circuit_state == "open":
+        raise RuntimeError("Circuit breaker is open after repeated Jira failures")
+    url = urlparse(server)
+    port = url.port or (443 if url.scheme == "https" else 80)
+    return {"server": server, "circuit_state": circuit_state, "connect_ms": _connect(url.hostname, port, timeout)}
+
+def check_smtp(timeout: float = HEALTH_CHECK_TIMEOUT_SECONDS):
+    settings = email_service.get_email_settings()
+    if not settings.smtp_username:
+        raise CheckSkipped("SMTP_USERNAME is not set")
+    return {"server": f"{settings.smtp_server}:{settings.smtp_port}",
+            "connect_ms": _connect(settings.smtp_server, settings.smtp_port, timeout)}
+
+class HealthChecker:
+    """
+    Runs the readiness checks concurrently and caches the report for `cache_seconds`.
+
+    Concurrent callers during a refresh share the one in flight, so a burst of probes
+    costs a single round of checks. Each check is a blocking call run in a thread with
+    its own timeout. A failing critical check (database, scheduler) makes the service
+    not ready; a failing optional one (Jira, SMTP) only marks it degraded.
+    """
+
+    def __init__(self, checks: dict = None, cache_seconds: float = HEALTH_CACHE_SECONDS,
+                 timeout_seconds: float = HEALTH_CHECK_TIMEOUT_SECONDS, clock=time.monotonic):
+        # {name: (check function, critical)}
+        self.checks = checks if checks is not None else {
+            "database": (check_database, True),
+            "scheduler": (check_scheduler, True),
+            "jira": (check_jira, False),
+            "smtp": (check_smtp, False),
+        }
+        self.cache_seconds = cache_seconds
+        self.timeout_seconds = timeout_seconds
+        self._clock = clock
+        self._report = None
+        self._checked_at = None
+        self._refresh = None
+
+    async def _run_check(self, name: str, check, critical: bool):
+        started = self._clock()
+        result = {"critical": critical}
+        try:
+            details = await asyncio.wait_for(asyncio.to_thread(check), timeout=self.timeout_seconds)
+            result.update(status="ok", **(details or {}))
+        except CheckSkipped as e:
+            result.update(status="skipped", reason=str(e))
+        except asyncio.TimeoutError:
+            result.update(status="fail", error=f"Timed out after {self.timeout_seconds}s")
+        except Exception as e:
+            logger.warning(f"Health check {name} failed: {e}")
+            result.update(status="fail", error=str(e))
+        result["latency_ms"] = round((self._clock() - started) * 1000, 1)
+        return name, result
+
+    async def _run(self):
+        results = dict(await asyncio.gather(*(
+            self._run_check(name, check, critical) for name, (check, critical) in self.checks.items()
+        )))
+        failed = [result for result in results.values() if result["status"] == "fail"]
+        ready = not any(result["critical"] for result in failed)
+        self._report = {
+            "status": "fail" if not ready else ("degraded" if failed else "ok"),
+            "ready": ready,
+            "checks": results,
+        }
+        self._checked_at = self._clock()
+        return self._report
+
+    async def report(self):
+        """The cached report, refreshed when older than cache_seconds."""
+        if self._report is not None and self._clock() - self._checked_at < self.cache_seconds:
+            return self._report
+        if self._refresh is None:
+            self._refresh = asyncio.ensure_future(self._run())
+            self._refresh.add_done_callback(lambda _: setattr(self, "_refresh", None))
+        return await asyncio.shield(self._refresh)
+
+# Process-wide checker behind /readyz
+health_checker = HealthChecker()
@@ -0,0 +1,243 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import struct
+import time
+from datetime import datetime
+from . import backup
+from .backup import BackupError
+
+# Where backup chains (a full base plus page deltas) are kept
+INCREMENTAL_BACKUP_DIR = os.getenv("INCREMENTAL_BACKUP_DIR", os.path.join(backup.BACKUP_DIR, "incremental"))
+# Take scheduled backups as page deltas instead of full copies
+BACKUP_INCREMENTAL = os.getenv("BACKUP_INCREMENTAL", "false").lower() in ("1", "true", "yes")
+# Deltas after which the next backup starts a new chain with a full base
+BACKUP_FULL_EVERY = int(os.getenv("BACKUP_FULL_EVERY", "24"))
+# Whole chains kept by pruning, newest first
+BACKUP_KEEP_CHAINS = int(os.getenv("BACKUP_KEEP_CHAINS", "2"))
+
+MANIFEST_NAME = "chain.json"
+HASHES_NAME = "latest.hashes"
+DELTA_MAGIC = b"RTDELTA1"
+_DIGEST_BYTES = 16
+_HEADER = struct.Struct(">II")
+_PAGE_NUMBER = struct.Struct(">I")
+
+logger = logging.getLogger(__name__)
+
+def _page_size(db_path: str):
+    with open(db_path, "rb") as f:
+        header = f.read(100)
+    size = struct.unpack(">H", header[16:18])[0]
+    # The header stores 1 for 64 KiB pages
+    return 65536 if size == 1 else size
+
+def _iter_pages(db_path: str, page_size: int):
+    with open(db_path, "rb") as f:
+        while True:
+            page = f.read(page_size)
+            if not page:
+                return
+            yield page
+
+def _page_digest(page: bytes):
+    return hashlib.blake2b(page, digest_size=_DIGEST_BYTES).digest()
+
+def _read_manifest(chain_dir: str):
+    path = os.path.join(chain_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"entries": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_atomically(path: str, data: bytes):
+    partial_path = f"{path}.partial"
+    with open(partial_path, "wb") as f:
+        f.write(data)
+    os.replace(partial_path, path)
+
+def _read_hashes(chain_dir: str, page_count: int):
+    path = os.path.join(chain_dir, HASHES_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) != page_count * _DIGEST_BYTES:
+        return None
+    return [data[i:i + _DIGEST_BYTES] for i in range(0, len(data), _DIGEST_BYTES)]
+
+def _write_delta(snapshot_path: str, delta_path: str, page_size: int, page_count: int, previous_hashes: list):
+    """Writes the pages whose digest differs from the previous backup. Returns (digests, pages written)."""
+    digests = []
+    written = 0
+    with gzip.open(delta_path, "wb", compresslevel=6) as out:
+        out.write(DELTA_MAGIC + _HEADER.pack(page_size, page_count))
+        for page_number, page in enumerate(_iter_pages(snapshot_path, page_size)):
+            digest = _page_digest(page)
+            digests.append(digest)
+            if page_number >= len(previous_hashes) or previous_hashes[page_number] != digest:
+                out.write(_PAGE_NUMBER.pack(page_number) + page)
+                written += 1
+    return digests, written
+
+def _apply_delta(delta_path: str, target_path: str):
+    """Writes a delta's pages into a reconstructed database and trims it to the recorded size."""
+    with gzip.open(delta_path, "rb") as delta, open(target_path, "r+b") as target:
+        header = delta.read(len(DELTA_MAGIC) + _HEADER.size)
+        if header[:len(DELTA_MAGIC)] != DELTA_MAGIC:
+            raise BackupError(f"{delta_path} is not a page delta")
+        page_size, page_count = _HEADER.unpack(header[len(DELTA_MAGIC):])
+        while True:
+            number = delta.read(_PAGE_NUMBER.size)
+            if not number:
+                break
+            page = delta.read(page_size)
+            if len(number) != _PAGE_NUMBER.size or len(page) != page_size:
+                raise BackupError(f"{delta_path} is truncated")
+            target.seek(_PAGE_NUMBER.unpack(number)[0] * page_size)
+            target.write(page)
+        target.truncate(page_count * page_size)
+
+def create_incremental_backup(db_path: str = None, chain_dir: str = INCREMENTAL_BACKUP_DIR,
+                              full_every: int = BACKUP_FULL_EVERY, now: datetime = None):
+    """
+    Backs up only the database pages that changed since the previous backup in the chain.
+
+    A consistent snapshot is taken with the online backup API (see backup.create_backup)
+    and hashed page by page against the digests of the last backup; changed pages go
+    into a compressed delta. The first backup, a page size change or `full_every`
+    deltas start a new chain with a compressed full base. Returns the manifest entry.
+    """
+    db_path = db_path or backup.sqlite_path_from_url()
+    if not os.path.exists(db_path):
+        raise BackupError(f"Database file not found: {db_path}")
+    os.makedirs(chain_dir, exist_ok=True)
+
+    started = time.monotonic()
+    now = now or datetime.now()
+    manifest = _read_manifest(chain_dir)
+    entries = manifest["entries"]
+    snapshot = backup.create_backup(db_path, chain_dir, prefix=".snapshot", compress=False)
+    snapshot_path = snapshot["path"]
+    try:
+        page_size = _page_size(snapshot_path)
+        page_count = os.path.getsize(snapshot_path) // page_size
+        last = entries[-1] if entries else None
+        deltas_since_base = 0
+        for entry in reversed(entries):
+            if entry["kind"] == "base":
+                break
+            deltas_since_base += 1
+        previous_hashes = None
+        if last and last["page_size"] == page_size and deltas_since_base < full_every:
+            previous_hashes = _read_hashes(chain_dir, last["page_count"])
+
+        stamp = now.strftime("%Y%m%d_%H%M%S_%f")
+        if previous_hashes is None:
+            kind = "base"
+            file_name = f"risk_tracker_base_{stamp}.db.gz"
+            digests = [_page_digest(page) for page in _iter_pages(snapshot_path, page_size)]
+            backup._compress(snapshot_path, os.path.join(chain_dir, file_name))
+            pages_written = page_count
+        else:
+            kind = "delta"
+            file_name = f"risk_tracker_delta_{stamp}.pages.gz"
+            digests, pages_written = _write_delta(
+                snapshot_path, os.path.join(chain_dir, file_name), page_size, page_count, previous_hashes
+            )
+    finally:
+        os.remove(snapshot_path)
+
+    entry = {
+        "kind": kind,
+        "file": file_name,
+        "created_at": now.isoformat(),
+        "page_size": page_size,
+        "page_count": page_count,
+        "pages_written": pages_written,
+        "bytes": os.path.getsize(os.path.join(chain_dir, file_name)),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    manifest["entries"] = entries + [entry]
+    _write_atomically(os.path.join(chain_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode("utf-8"))
+    # Saved after the manifest: if this write is lost, the next delta is taken against older
+    # digests and simply contains more pages than it needs to
+    _write_atomically(os.path.join(chain_dir, HASHES_NAME), b"".join(digests))
+    return entry
+
+def list_restore_points(chain_dir: str = INCREMENTAL_BACKUP_DIR):
+    """Returns the manifest entries, oldest first; each one is a point the database can be restored to."""
+    return _read_manifest(chain_dir)["entries"]
+
+def reconstruct(at: datetime, output_path: str, chain_dir: str = INCREMENTAL_BACKUP_DIR):
+    """
+    Rebuilds the database as of the newest backup taken at or before `at` into output_path,
+    from its chain's base plus the deltas up to it, and checks its integrity.
+    Returns the manifest entry that was restored.
+    """
+    entries = list_restore_points(chain_dir)
+    candidates = [i for i, entry in enumerate(entries) if datetime.fromisoformat(entry["created_at"]) <= at]
+    if not candidates:
+        raise BackupError(f"No backup taken at or before {at.isoformat(sep=' ')}")
+    target = candidates[-1]
+    base = max(i for i in range(target + 1) if entries[i]["kind"] == "base")
+
+    partial_path = f"{output_path}.partial"
+    try:
+        backup._decompress(os.path.join(chain_dir, entries[base]["file"]), partial_path)
+        for entry in entries[base + 1:target + 1]:
+            _apply_delta(os.path.join(chain_dir, entry["file"]), partial_path)
+        backup.check_integrity(partial_path)
+        os.replace(partial_path, output_path)
+    except (OSError, EOFError, gzip.BadGzipFile) as e:
+        raise BackupError(f"Could not rebuild the database as of {entries[target]['created_at']}: {e}")
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return entries[target]
+
+def restore_at(at: datetime, db_path: str = None, chain_dir: str = INCREMENTAL_BACKUP_DIR):
+    """Point-in-time restore: rebuilds the database as of `at` and copies it over the live database."""
+    db_path = db_path or backup.sqlite_path_from_url()
+    rebuilt_path = os.path.join(chain_dir, ".restore.db")
+    try:
+        entry = reconstruct(at, rebuilt_path, chain_dir)
+        backup.restore_backup(rebuilt_path, db_path)
+    finally:
+        if os.path.exists(rebuilt_path):
+            os.remove(rebuilt_path)
+    return entry
+
+def prune_chains(chain_dir: str = INCREMENTAL_BACKUP_DIR, keep_chains: int = BACKUP_KEEP_CHAINS):
+    """Deletes whole chains (a base and its deltas) beyond the newest `keep_chains`. Returns the deleted files."""
+    manifest = _read_manifest(chain_dir)
+    entries = manifest["entries"]
+    bases = [i for i, entry in enumerate(entries) if entry["kind"] == "base"]
+    if len(bases) <= max(keep_chains, 1):
+        return []
+    first_kept = bases[-max(keep_chains, 1)]
+    removed, manifest["entries"] = entries[:first_kept], entries[first_kept:]
+    _write_atomically(os.path.join(chain_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode("utf-8"))
+    deleted = []
+    for entry in removed:
+        path = os.path.join(chain_dir, entry["file"])
+        if os.path.exists(path):
+            os.remove(path)
+            deleted.append(path)
+    return deleted
+
+def run_scheduled_backup():
+    """A background job that takes an incremental backup and prunes old chains."""
+    try:
+        entry = create_incremental_backup()
+    except BackupError as e:
+        logger.error(f"Scheduled incremental backup failed: {e}")
+        return None
+    deleted = prune_chains()
+    logger.info(
+        f"Incremental backup ({entry['kind']}) wrote {entry['pages_written']}/{entry['page_count']} pages, "
+        f"{entry['bytes']} bytes in {entry['seconds']}s; pruned {len(deleted)} file(s)."
+    )
+    return entry
@@ -1,6 +1,13 @@
 import logging
 import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
 from jira import JIRA, JIRAError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from . import crud, schemas, models
@@ -8,35 +15,359 @@ from . import crud, schemas, models
 # Load environment variables from .env file
 load_dotenv()
 
-JIRA_SERVER = os.getenv("JIRA_SERVER")
-JIRA_USERNAME = os.getenv("JIRA_USERNAME")
-JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN")
+# How long the shared client may sit unused before it is health-checked again
+JIRA_HEALTHCHECK_IDLE_SECONDS = int(os.getenv("JIRA_HEALTHCHECK_IDLE_SECONDS", "300"))
+# Size of the keep-alive connection pool behind the shared client
+JIRA_POOL_MAXSIZE = int(os.getenv("JIRA_POOL_MAXSIZE", "10"))
+JIRA_TIMEOUT = float(os.getenv("JIRA_TIMEOUT", "30"))
+# Number of issues requested (and upserted in one transaction) per Jira search page
+JIRA_PAGE_SIZE = int(os.getenv("JIRA_PAGE_SIZE", "100"))
+
+# Request throttling, applied per Jira server
+JIRA_RATE_LIMIT_PER_SECOND = float(os.getenv("JIRA_RATE_LIMIT_PER_SECOND", "5"))
+JIRA_RATE_LIMIT_BURST = int(os.getenv("JIRA_RATE_LIMIT_BURST", "10"))
+JIRA_MAX_RETRIES = int(os.getenv("JIRA_MAX_RETRIES", "5"))
+JIRA_BACKOFF_BASE_SECONDS = float(os.getenv("JIRA_BACKOFF_BASE_SECONDS", "1"))
+JIRA_BACKOFF_MAX_SECONDS = float(os.getenv("JIRA_BACKOFF_MAX_SECONDS", "60"))
+JIRA_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("JIRA_CIRCUIT_FAILURE_THRESHOLD", "5"))
+JIRA_CIRCUIT_RESET_SECONDS = float(os.getenv("JIRA_CIRCUIT_RESET_SECONDS", "60"))
+
+# Status codes Jira uses to ask clients to slow down or come back later
+RETRYABLE_STATUS_CODES = (429, 503)
+
+# Only the fields we map are requested from Jira
+EPIC_FIELDS = ('summary', 'description', 'duedate', 'status')
+CHILD_ISSUE_FIELDS = ('status',)
+
+# Child issue progress rollup: epics per child issue query, or 0 to skip the rollup
+JIRA_CHILD_ROLLUP_BATCH_SIZE = int(os.getenv("JIRA_CHILD_ROLLUP_BATCH_SIZE", "100"))
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
-def get_jira_client():
-    """Establishes a connection to the Jira API and returns a client object."""
-    if not all([JIRA_SERVER, JIRA_USERNAME, JIRA_API_TOKEN]):
-        logger.error("Jira credentials not found in .env file.")
+def _jira_credentials():
+    """Reads the Jira credentials from the environment on every call so changes are picked up."""
+    return (os.getenv("JIRA_SERVER"), os.getenv("JIRA_USERNAME"), os.getenv("JIRA_API_TOKEN"))
+
+class JiraCircuitOpenError(ConnectionError):
+    """Raised instead of calling Jira while the circuit breaker for its server is open."""
+
+class JiraRequestThrottle:
+    """
+    Rate-limit-aware gate for every request sent to one Jira server.
+
+    - A token bucket caps the request rate. The rate is halved whenever Jira answers
+      429/503 and grows back gradually after successful requests.
+    - Throttled requests are retried, waiting for `Retry-After` when Jira sends it
+      and for an exponential backoff with jitter otherwise.
+    - A circuit breaker opens after `failure_threshold` consecutive failures (5xx answers,
+      connection errors and timeouts) and rejects calls until `reset_seconds` have passed.
+      It then lets one trial call through; other callers fail fast until the trial ends.
+    """
+
+    def __init__(self, server: str, rate: float = JIRA_RATE_LIMIT_PER_SECOND, burst: int = JIRA_RATE_LIMIT_BURST,
+                 max_retries: int = JIRA_MAX_RETRIES, backoff_base: float = JIRA_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = JIRA_BACKOFF_MAX_SECONDS, failure_threshold: int = JIRA_CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = JIRA_CIRCUIT_RESET_SECONDS, sleep=time.sleep, clock=time.monotonic):
+        self.server = server
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._refilled_at = clock()
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._request_times = deque()
+        self.requests_total = 0
+        self.throttled_total = 0
+        self.retries_total = 0
+        self.throttle_seconds_total = 0.0
+
+    def call(self, func, *args, **kwargs):
+        """Calls `func` (a Jira client method) under the rate limit, retrying throttled requests."""
+        trial = self._check_circuit()
+        try:
+            return self._call(func, *args, **kwargs)
+        finally:
+            if trial:
+                with self._lock:
+                    self._trial_in_flight = False
+
+    def _call(self, func, *args, **kwargs):
+        attempt = 0
+        while True:
+            self._acquire_token()
+            try:
+                result = func(*args, **kwargs)
+            except JIRAError as e:
+                if e.status_code not in RETRYABLE_STATUS_CODES:
+                    # Client errors (404, 401, ...) say nothing about the server's health
+                    if e.status_code is None or e.status_code >= 500:
+                        self._record_failure()
+                    else:
+                        self._record_success()
+                    raise
+                self._record_throttled()
+                if attempt >= self.max_retries:
+                    self._record_failure()
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logger.warning(
+                    f"Jira at {self.server} answered {e.status_code}, "
+                    f"retrying in {delay:.1f}s [{attempt + 1}/{self.max_retries}]"
+                )
+                self._wait(delay)
+                attempt += 1
+                with self._lock:
+                    self.retries_total += 1
+                continue
+            except (RequestsConnectionError, RequestsTimeout):
+                self._record_failure()
+                raise
+            self._record_success()
+            return result
+
+    def metrics(self):
+        """Returns a snapshot of the throttle's counters for monitoring."""
+        with self._lock:
+            now = self._clock()
+            self._trim_request_times(now)
+            return {
+                "server": self.server,
+                "requests_total": self.requests_total,
+                "observed_rate_per_second": round(len(self._request_times) / 60.0, 3),
+                "rate_limit_per_second": round(self.rate, 3),
+                "throttled_total": self.throttled_total,
+                "retries_total": self.retries_total,
+                "throttle_seconds_total": round(self.throttle_seconds_total, 3),
+                "circuit_state": self._circuit_state(now),
+                "consecutive_failures": self._consecutive_failures,
+            }
+
+    def _check_circuit(self):
+        """Raises while the circuit is open; returns True if this call is the half-open trial."""
+        with self._lock:
+            state = self._circuit_state(self._clock())
+            if state == "open":
+                raise JiraCircuitOpenError(
+                    f"Jira at {self.server} is unavailable after {self._consecutive_failures} "
+                    f"consecutive failures. Retrying after {self.reset_seconds:.0f}s."
+                )
+            if state == "half-open":
+                if self._trial_in_flight:
+                    raise JiraCircuitOpenError(
+                        f"Jira at {self.server} is unavailable; a trial request is checking whether it is back."
+                    )
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def _circuit_state(self, now):
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half-open"
+
+    def _acquire_token(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                # Tolerate float rounding, or a refill that lands just short of 1 spins on ever-smaller waits
+                if self._tokens >= 1 - 1e-9:
+                    self._tokens -= 1
+                    self.requests_total += 1
+                    self._request_times.append(now)
+                    self._trim_request_times(now)
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._wait(wait)
+
+    def _retry_delay(self, error, attempt):
+        retry_after = _parse_retry_after(error)
+        if retry_after is not None:
+            # Honor the server's hint, with a little jitter so clients don't return in lockstep
+            return min(self.backoff_max, retry_after) + random.uniform(0, self.backoff_base)
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _wait(self, seconds):
+        with self._lock:
+            self.throttle_seconds_total += seconds
+        self._sleep(seconds)
+
+    def _record_throttled(self):
+        with self._lock:
+            self.throttled_total += 1
+            # Multiplicative decrease: Jira told us we are going too fast
+            self.rate = max(self.max_rate / 20, self.rate / 2)
+            self._tokens = min(self._tokens, 0)
+
+    def _record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+            self._opened_at = None
+            # Additive increase back towards the configured rate
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def _record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.error(f"Opening the circuit breaker for Jira at {self.server}.")
+                self._opened_at = self._clock()
+
+    def _trim_request_times(self, now):
+        while self._request_times and now - self._request_times[0] > 60:
+            self._request_times.popleft()
+
+def _parse_retry_after(error):
+    """Returns the Retry-After delay of a Jira error response in seconds, if present."""
+    response = getattr(error, 'response', None)
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
         return None
-    
     try:
-        jira_client = JIRA(
-            server=JIRA_SERVER,
-            basic_auth=(JIRA_USERNAME, JIRA_API_TOKEN)
-        )
-        # Test connection by getting server info
-        jira_client.server_info()
-        logger.info(f"Successfully connected to Jira server at {JIRA_SERVER}")
-        return jira_client
-    except JIRAError as e:
-        logger.error(f"Jira connection failed: {e.text}")
-        return None
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during Jira connection: {e}")
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
         return None
 
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+def get_jira_throttle(server: str):
+    """Returns the request throttle (and circuit breaker) for a Jira server, creating it on first use."""
+    server = server.rstrip('/')
+    with _throttles_lock:
+        if server not in _throttles:
+            _throttles[server] = JiraRequestThrottle(server)
+        return _throttles[server]
+
+def get_jira_metrics():
+    """Returns the request metrics of every Jira server contacted by this process."""
+    with _throttles_lock:
+        throttles = list(_throttles.values())
+    return [throttle.metrics() for throttle in throttles]
+
+class JiraClientManager:
+    """
+    Keeps a single Jira client per process and hands it out to every import.
+
+    The client (and the keep-alive connection pool of its HTTP session) is reused
+    across calls instead of paying the TLS handshake and authentication each time.
+    A health check only runs when the client has been idle for longer than
+    `idle_check_seconds`, and the client is rebuilt when the configured credentials
+    change or when `invalidate()` is called after a connection error.
+    """
+
+    def __init__(self, idle_check_seconds: int = JIRA_HEALTHCHECK_IDLE_SECONDS, pool_maxsize: int = JIRA_POOL_MAXSIZE):
+        self.idle_check_seconds = idle_check_seconds
+        self.pool_maxsize = pool_maxsize
+        self._lock = threading.Lock()
+        self._client = None
+        self._credentials = None
+        self._last_used = 0.0
+
+    def get_client(self):
+        """
+        Returns the shared Jira client, connecting or reconnecting if needed.
+        Raises JiraCircuitOpenError instead of connecting while Jira's circuit breaker is open.
+        """
+        credentials = _jira_credentials()
+        if not all(credentials):
+            logger.error("Jira credentials not found in .env file.")
+            return None
+
+        with self._lock:
+            if self._client is not None and credentials != self._credentials:
+                logger.info("Jira credentials changed, rebuilding the Jira client.")
+                self._close()
+
+            if self._client is not None and time.monotonic() - self._last_used > self.idle_check_seconds:
+                if not self._is_healthy():
+                    logger.info("Idle Jira client failed its health check, reconnecting.")
+                    self._close()
+
+            if self._client is None:
+                self._client = self._connect(credentials)
+                self._credentials = credentials if self._client else None
+
+            self._last_used = time.monotonic()
+            return self._client
+
+    def invalidate(self):
+        """Drops the shared client so the next `get_client()` call reconnects."""
+        with self._lock:
+            self._close()
+
+    def _connect(self, credentials):
+        server, username, api_token = credentials
+        try:
+            # The constructor already fetches server info, which doubles as the connection test.
+            # Retries are handled by our throttle, so the client's own retry loop is disabled.
+            jira_client = get_jira_throttle(server).call(
+                JIRA,
+                server=server,
+                basic_auth=(username, api_token),
+                timeout=JIRA_TIMEOUT,
+                max_retries=0,
+            )
+            # Reuse keep-alive connections across requests from every import
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+            jira_client._session.mount("https://", adapter)
+            jira_client._session.mount("http://", adapter)
+            logger.info(f"Successfully connected to Jira server at {server}")
+            return jira_client
+        except JiraCircuitOpenError:
+            # Callers such as the scheduled sync stop on this instead of trying every project
+            raise
+        except JIRAError as e:
+            logger.error(f"Jira connection failed: {e.text}")
+            return None
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during Jira connection: {e}")
+            return None
+
+    def _is_healthy(self):
+        try:
+            get_jira_throttle(self._credentials[0]).call(self._client.server_info)
+            return True
+        except Exception as e:
+            logger.warning(f"Jira health check failed: {e}")
+            return False
+
+    def _close(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+        self._client = None
+        self._credentials = None
+
+# Process-wide client manager shared by the API routes and the scheduler
+jira_client_manager = JiraClientManager()
+
+def get_jira_client():
+    """Returns the shared Jira client, or None if Jira is not configured or unreachable."""
+    return jira_client_manager.get_client()
+
 def map_jira_status_to_local(jira_status_name):
     """Maps a Jira status name to a local status."""
     
@@ -69,9 +400,114 @@ def map_jira_status_to_local(jira_status_name):
     
     return status_mapping.get(jira_status_name, 'Planned') # Default to 'Planned' if no match
 
-def import_epics_from_jira(db: Session, jira_project_key: str):
+def map_jira_epic(issue: dict, project_id: int):
+    """Maps a raw Jira issue (as returned by the REST API) to the fields of a local epic."""
+    fields = issue.get('fields') or {}
+    status = fields.get('status') or {}
+    return {
+        'title': fields.get('summary'),
+        'description': fields.get('description'),
+        'jira_epic_key': issue['key'],
+        'project_id': project_id,
+        'target_launch_date': fields.get('duedate'),
+        'status': map_jira_status_to_local(status.get('name', ''))
+    }
+
+def _is_done(issue: dict):
+    """Whether a Jira issue is finished, by status category when Jira sends it, else by status name."""
+    status = (issue.get('fields') or {}).get('status') or {}
+    category = status.get('statusCategory') or {}
+    if category.get('key'):
+        return category['key'] == 'done'
+    return map_jira_status_to_local(status.get('name', '')) == 'Launched'
+
+_epic_link_fields = {}
+_epic_link_fields_lock = threading.Lock()
+
+def _epic_link_field(jira):
+    """
+    Returns the id of the "Epic Link" custom field of a Jira Server/Data Center instance
+    (e.g. customfield_10008), or None without Jira Software. Looked up once per server.
+    """
+    server = jira.server_url
+    with _epic_link_fields_lock:
+        if server not in _epic_link_fields:
+            fields = get_jira_throttle(server).call(jira.fields)
+            _epic_link_fields[server] = next((field['id'] for field in fields if field.get('name') == 'Epic Link'), None)
+        return _epic_link_fields[server]
+
+def _epic_of(issue, link_field):
+    fields = issue.get('fields') or {}
+    if link_field == 'parent':
+        return (fields.get('parent') or {}).get('key')
+    return fields.get(link_field)
+
+def fetch_child_issue_counts(jira, epic_keys: list, batch_size: int = JIRA_CHILD_ROLLUP_BATCH_SIZE):
+    """
+    Counts the child issues of many epics with one paged search per batch of keys, instead of
+    one search per epic. Returns a {jira_epic_key: (done, total)} dict covering every key.
+
+    Jira Cloud links issues to their epic through `parent`. On Server/Data Center `parent`
+    only matches sub-tasks, so the search goes through the "Epic Link" field instead; an
+    instance without one has no epic children, and every key maps to (None, None).
+    """
+    if getattr(jira, 'deploymentType', None) == 'Cloud':
+        link_field, link_jql = 'parent', 'parent'
+    else:
+        link_field, link_jql = _epic_link_field(jira), '"Epic Link"'
+        if link_field is None:
+            logger.warning(f"Jira at {jira.server_url} has no Epic Link field, skipping the child issue rollup.")
+            return {key: (None, None) for key in epic_keys}
+    fields = CHILD_ISSUE_FIELDS + (link_field,)
+    counts = {key: [0, 0] for key in epic_keys}
+    for i in range(0, len(epic_keys), batch_size):
+        jql_query = f"{link_jql} in ({', '.join(epic_keys[i:i + batch_size])})"
+        for issues in _search_issue_pages(jira, jql_query, page_size=JIRA_PAGE_SIZE, fields=fields):
+            for issue in issues:
+                parent = _epic_of(issue, link_field)
+                if parent in counts:
+                    counts[parent][1] += 1
+                    if _is_done(issue):
+                        counts[parent][0] += 1
+    return {key: (done, total) for key, (done, total) in counts.items()}
+
+def _search_issue_pages(jira, jql_query: str, page_size: int, fields=EPIC_FIELDS):
+    """
+    Yields the raw issues matching a JQL query one page at a time.
+    Jira Cloud only supports token-based paging, Jira Server/Data Center uses startAt.
+    """
+    throttle = get_jira_throttle(jira.server_url)
+    if getattr(jira, 'deploymentType', None) == 'Cloud':
+        next_page_token = None
+        while True:
+            page = throttle.call(
+                jira.enhanced_search_issues, jql_query, nextPageToken=next_page_token,
+                maxResults=page_size, fields=list(fields), json_result=True
+            )
+            issues = page.get('issues', [])
+            if issues:
+                yield issues
+            next_page_token = page.get('nextPageToken')
+            if not issues or not next_page_token or page.get('isLast'):
+                break
+    else:
+        start_at = 0
+        while True:
+            page = throttle.call(
+                jira.search_issues, jql_query, startAt=start_at,
+                maxResults=page_size, fields=list(fields), json_result=True
+            )
+            issues = page.get('issues', [])
+            if issues:
+                yield issues
+            start_at += len(issues)
+            if not issues or start_at >= page.get('total', 0):
+                break
+
+def import_epics_from_jira(db: Session, jira_project_key: str, progress=None):
     """
     Imports epics from a specified Jira project into the Risk Tracker database.
+    If given, `progress` is called with the running counts after every page.
     """
     jira = get_jira_client()
     if not jira:
@@ -81,7 +517,7 @@ def import_epics_from_jira(db: Session, jira_project_key: str):
     project = crud.get_project_by_jira_key(db, jira_project_key=jira_project_key)
     if not project:
         try:
-            jira_project = jira.project(jira_project_key)
+            jira_project = get_jira_throttle(jira.server_url).call(jira.project, jira_project_key)
             project_create = schemas.ProjectCreate(
                 name=jira_project.name,
                 jira_project_key=jira_project.key,
@@ -94,54 +530,56 @@ def import_epics_from_jira(db: Session, jira_project_key: str):
                 raise ValueError(f"Jira project with key '{jira_project_key}' not found.")
             else:
                 raise IOError(f"Error fetching project from Jira: {e.text}")
+        except RequestsConnectionError as e:
+            jira_client_manager.invalidate()
+            raise ConnectionError(f"Lost connection to Jira: {e}")
 
-    # Step 2: Fetch epics from Jira
+    # Step 2: Fetch epics from Jira page by page, roll up the child issues of the whole page
+    # and upsert it in one transaction
     # Note: Jira's definition of "Epic" can vary. This JQL assumes you use a standard setup
     # where Epics are an issue type. You may need to adjust the JQL query.
     # Common epic type names: "Epic", "Story", etc. We search for 'Epic'.
-    try:
-        # A more robust JQL to find the Epic issue type name might be needed for some Jira instances.
-        # This one assumes the issue type is named 'Epic'.
-        jql_query = f'project = "{jira_project_key}" AND issuetype = Epic ORDER BY created DESC'
-        epics_from_jira = jira.search_issues(jql_query, maxResults=100) # Capped at 100 for safety
-        logger.info(f"Found {len(epics_from_jira)} epics in Jira project '{jira_project_key}'.")
-    except JIRAError as e:
-         raise IOError(f"Error fetching epics from Jira: {e.text}")
+    # A more robust JQL to find the Epic issue type name might be needed for some Jira instances.
+    # This one assumes the issue type is named 'Epic'.
+    jql_query = f'project = "{jira_project_key}" AND issuetype = Epic ORDER BY created DESC'
 
-    # Step 3: Upsert (Update or Insert) epics into the local database
     imported_count = 0
     updated_count = 0
+    unchanged_count = 0
+    total_found = 0
 
-    for epic_jira in epics_from_jira:
-        jira_key = epic_jira.key
-        
-        # Check if this epic already exists in our DB
-        db_epic = crud.get_epic_by_jira_key(db, jira_epic_key=jira_key)
-
-        # Map Jira fields to our schema
-        epic_data = {
-            'title': epic_jira.fields.summary,
-            'description': getattr(epic_jira.fields, 'description', None),
-            'jira_epic_key': jira_key,
-            'project_id': project.id,
-            'target_launch_date': getattr(epic_jira.fields, 'duedate', None),
-            'status': map_jira_status_to_local(epic_jira.fields.status.name)
-        }
-
-        if db_epic:
-            # Update existing epic
-            epic_update_schema = schemas.EpicUpdate(**epic_data)
-            crud.update_epic(db, epic_id=db_epic.id, epic=epic_update_schema)
-            updated_count += 1
-        else:
-            # Create new epic
-            epic_create_schema = schemas.EpicCreate(**epic_data)
-            crud.create_epic(db, epic=epic_create_schema)
-            imported_count += 1
+    try:
+        for issues in _search_issue_pages(jira, jql_query, page_size=JIRA_PAGE_SIZE):
+            # Map Jira fields to our schema
+            epics_data = [map_jira_epic(issue, project.id) for issue in issues]
+            if JIRA_CHILD_ROLLUP_BATCH_SIZE > 0:
+                counts = fetch_child_issue_counts(jira, [epic['jira_epic_key'] for epic in epics_data])
+                for epic in epics_data:
+                    epic['child_issues_done'], epic['child_issues_total'] = counts[epic['jira_epic_key']]
+            imported, updated, unchanged = crud.bulk_upsert_epics(db, epics_data)
+            imported_count += imported
+            updated_count += updated
+            unchanged_count += unchanged
+            total_found += len(issues)
+            if progress:
+                progress({
+                    "processed": total_found,
+                    "imported": imported_count,
+                    "updated": updated_count,
+                    "unchanged": unchanged_count,
+                })
+    except JIRAError as e:
+         raise IOError(f"Error fetching epics from Jira: {e.text}")
+    except RequestsConnectionError as e:
+        jira_client_manager.invalidate()
+        raise ConnectionError(f"Lost connection to Jira: {e}")
+
+    logger.info(f"Found {total_found} epics in Jira project '{jira_project_key}'.")
 
     return {
         "project_name": project.name,
         "imported": imported_count,
         "updated": updated_count,
-        "total_found": len(epics_from_jira)
-    } 
\ No newline at end of file
+        "unchanged": unchanged_count,
+        "total_found": total_found
+    }
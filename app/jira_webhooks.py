@@ -0,0 +1,197 @@
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from sqlalchemy.orm import Session
+from . import crud, jira_service
+from .database import SessionLocal
+
+# Events for the same issue arriving within this window are coalesced into one write
+JIRA_WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv("JIRA_WEBHOOK_DEBOUNCE_SECONDS", "2"))
+# A failed flush is retried after the debounce window, doubling per consecutive failure up to this
+JIRA_WEBHOOK_RETRY_MAX_SECONDS = float(os.getenv("JIRA_WEBHOOK_RETRY_MAX_SECONDS", "300"))
+
+ISSUE_EVENTS = ("jira:issue_created", "jira:issue_updated", "jira:issue_deleted")
+
+logger = logging.getLogger(__name__)
+
+class WebhookAuthError(Exception):
+    """Raised when a webhook request does not carry a valid shared secret."""
+
+def verify_webhook(body: bytes, signature: str = None, token: str = None, secret: str = None):
+    """
+    Checks that a webhook request was sent by our Jira.
+
+    Jira Cloud signs the body with the secret and sends `X-Hub-Signature: sha256=<hex>`.
+    Jira Server/Data Center cannot sign, so the secret may instead be passed as a
+    `secret` query parameter on the webhook URL.
+    """
+    # Read on every call, like the Jira credentials, so a rotated secret is picked up
+    secret = secret if secret is not None else os.getenv("JIRA_WEBHOOK_SECRET")
+    if not secret:
+        raise WebhookAuthError("Jira webhooks are disabled: JIRA_WEBHOOK_SECRET is not set.")
+    if signature:
+        if hmac.compare_digest(signature, sign_webhook(body, secret)):
+            return
+    elif token and hmac.compare_digest(token, secret):
+        return
+    raise WebhookAuthError("Invalid Jira webhook signature.")
+
+def sign_webhook(body: bytes, secret: str):
+    """Returns the `X-Hub-Signature` header value Jira Cloud would send for this body."""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+def _is_epic(issue: dict):
+    issue_type = (issue.get('fields') or {}).get('issuetype') or {}
+    return issue_type.get('name', '').lower() == 'epic'
+
+class JiraWebhookProcessor:
+    """
+    Applies Jira issue events to local epics as incremental upserts.
+
+    Events are buffered per issue key for `debounce_seconds` after the first event
+    of a burst; only the newest event of each issue is applied, with one upsert
+    transaction (and one delete transaction) per flush. Out-of-order deliveries
+    older than the pending event are dropped. If a flush fails its events go back
+    into the buffer (unless a newer event for the issue arrived meanwhile) and are
+    retried with exponential backoff.
+    """
+
+    def __init__(self, debounce_seconds: float = JIRA_WEBHOOK_DEBOUNCE_SECONDS, session_factory=SessionLocal,
+                 retry_max_seconds: float = JIRA_WEBHOOK_RETRY_MAX_SECONDS):
+        self.debounce_seconds = debounce_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+        self._failures = 0
+        self.received_total = 0
+        self.coalesced_total = 0
+        self.ignored_total = 0
+        self.applied_total = 0
+        self.failed_flushes_total = 0
+
+    def submit(self, event: dict):
+        """Queues an issue event. Returns False if it is not an epic event we handle."""
+        issue = event.get('issue') or {}
+        key = issue.get('key')
+        with self._lock:
+            self.received_total += 1
+            if event.get('webhookEvent') not in ISSUE_EVENTS or not key:
+                self.ignored_total += 1
+                return False
+            if event['webhookEvent'] != "jira:issue_deleted" and not _is_epic(issue):
+                self.ignored_total += 1
+                return False
+
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced_total += 1
+                if event.get('timestamp', 0) < pending.get('timestamp', 0):
+                    return True
+            self._pending[key] = event
+
+            if self._timer is None:
+                self._start_timer(self.debounce_seconds)
+        return True
+
+    def _start_timer(self, delay: float):
+        # Called with self._lock held
+        self._timer = threading.Timer(delay, self._scheduled_flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _scheduled_flush(self):
+        try:
+            self.flush()
+        except Exception:
+            # Logged by flush, and the events are queued again for a retry
+            pass
+
+    def flush(self):
+        """Applies every pending event now. Returns an (upserted, deleted) tuple of counts."""
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                events, self._pending = list(self._pending.values()), {}
+            if not events:
+                return 0, 0
+
+            db: Session = self._session_factory()
+            try:
+                upserted, deleted = self._apply(db, events)
+            except Exception as e:
+                delay = self._requeue(events)
+                logger.error(f"Failed to apply {len(events)} Jira webhook events, retrying in {delay:.0f}s: {e}",
+                             exc_info=True)
+                raise
+            finally:
+                db.close()
+            with self._lock:
+                self._failures = 0
+                self.applied_total += len(events)
+            return upserted, deleted
+
+    def _requeue(self, events: list):
+        """Puts a failed flush's events back and re-arms the timer with backoff. Returns the delay."""
+        with self._lock:
+            for event in events:
+                key = event['issue']['key']
+                pending = self._pending.get(key)
+                # An event submitted during the failed flush is at least as new
+                if pending is None or event.get('timestamp', 0) > pending.get('timestamp', 0):
+                    self._pending[key] = event
+            self._failures += 1
+            self.failed_flushes_total += 1
+            delay = min(self.debounce_seconds * 2 ** self._failures, self.retry_max_seconds)
+            if self._timer is not None:
+                self._timer.cancel()
+            self._start_timer(delay)
+            return delay
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "received_total": self.received_total,
+                "coalesced_total": self.coalesced_total,
+                "ignored_total": self.ignored_total,
+                "applied_total": self.applied_total,
+                "failed_flushes_total": self.failed_flushes_total,
+                "pending": len(self._pending),
+            }
+
+    def _apply(self, db: Session, events: list):
+        epics_data = []
+        deleted_keys = []
+        projects = {}
+        for event in events:
+            issue = event['issue']
+            if event['webhookEvent'] == "jira:issue_deleted":
+                deleted_keys.append(issue['key'])
+                continue
+
+            project_key = ((issue.get('fields') or {}).get('project') or {}).get('key')
+            if project_key not in projects:
+                projects[project_key] = crud.get_project_by_jira_key(db, project_key) if project_key else None
+            project = projects[project_key]
+            if project is None:
+                # Only projects that were imported at least once are kept in sync
+                logger.info(f"Ignoring Jira webhook for {issue['key']}: project '{project_key}' is not tracked.")
+                continue
+            epics_data.append(jira_service.map_jira_epic(issue, project.id))
+
+        imported, updated, unchanged = crud.bulk_upsert_epics(db, epics_data)
+        deleted = crud.delete_epics_by_jira_keys(db, deleted_keys)
+        logger.info(
+            f"Applied Jira webhook events. Imported: {imported}, Updated: {updated}, "
+            f"Unchanged: {unchanged}, Deleted: {deleted}."
+        )
+        return imported + updated, deleted
+
+# Process-wide processor shared by the webhook route
+webhook_processor = JiraWebhookProcessor()
@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from . import jira_service
+from .database import SessionLocal
+
+# Number of background jobs that may run at the same time
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# How long finished jobs stay available for status polling
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """A unit of background work whose status and progress can be polled."""
+
+    def __init__(self, kind: str, key: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = "queued"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        # A machine-readable failure, e.g. "not_found" or "unavailable", set by the job's error_kind function
+        self.error_kind = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at = None
+        self.finished_at = None
+        self._exception = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def report_progress(self, progress: dict):
+        """Called by the running job to publish its progress."""
+        self.progress = dict(progress)
+
+    def wait(self, timeout: float = None):
+        """Blocks until the job has finished, then returns its result or re-raises its error."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Job {self.id} did not finish within {timeout}s")
+        if self._exception is not None:
+            raise self._exception
+        return self.result
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "error_kind": self.error_kind,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class JobManager:
+    """
+    Runs jobs on a small thread pool and keeps their state in memory for polling.
+
+    Submissions are single-flight: while a job of the same kind and key is queued
+    or running, submitting it again returns the existing job instead of starting
+    a second run.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, retention_seconds: int = JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active = {}
+        self._finished_at = {}
+
+    def submit(self, kind: str, key: str, func, error_kind=None):
+        """
+        Schedules `func(job)` unless an identical job is already in flight.
+        If given, `error_kind(exception)` classifies a failure for the job's `error_kind`.
+        Returns a (job, created) tuple.
+        """
+        with self._lock:
+            self._prune()
+            active = self._active.get((kind, key))
+            if active is not None:
+                return active, False
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            self._active[(kind, key)] = job
+        self._executor.submit(self._run, job, func, error_kind)
+        return job, True
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, func, error_kind=None):
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        try:
+            job.result = func(job)
+            job.status = "succeeded"
+        except Exception as e:
+            logger.error(f"Job {job.kind} '{job.key}' ({job.id}) failed: {e}")
+            job.error = str(e)
+            job.error_kind = error_kind(e) if error_kind else "error"
+            job._exception = e
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            with self._lock:
+                self._active.pop((job.kind, job.key), None)
+                self._finished_at[job.id] = time.monotonic()
+            job._done.set()
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.retention_seconds
+        for job_id, finished_at in list(self._finished_at.items()):
+            if finished_at < cutoff:
+                del self._finished_at[job_id]
+                self._jobs.pop(job_id, None)
+
+# Process-wide job manager shared by the API routes and the scheduler
+job_manager = JobManager()
+
+def jira_import_error_kind(error: Exception):
+    """
+    Classifies a failed import the way the route's status codes did before imports ran
+    in the background: "unavailable" (503), "not_found" (404) or "error" (500).
+    """
+    if isinstance(error, (ConnectionError, jira_service.RequestsConnectionError, jira_service.RequestsTimeout)):
+        # Jira unreachable, bad credentials or an open circuit breaker
+        return "unavailable"
+    if isinstance(error, ValueError):
+        # No Jira project with that key (404)
+        return "not_found"
+    return "error"
+
+def submit_jira_import(jira_project_key: str):
+    """
+    Starts (or joins) a background import of a Jira project. Jira project keys are
+    upper case, so "plat" and "PLAT" share one job.
+    Returns a (job, created) tuple.
+    """
+    jira_project_key = jira_project_key.strip().upper()
+
+    def run(job: Job):
+        db: Session = SessionLocal()
+        try:
+            return jira_service.import_epics_from_jira(db, jira_project_key, progress=job.report_progress)
+        finally:
+            db.close()
+
+    return job_manager.submit("jira_import", jira_project_key, run, error_kind=jira_import_error_kind)
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from . import changes, models, schemas
+from .database import SessionLocal
+
+# How often each worker checks the change log for writes made elsewhere (other workers, jobs, scripts)
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "1"))
+# Comment frames that keep idle connections open through proxies and detect departed clients
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+# Events buffered per connection; a client that falls this far behind is told to reload
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+# Change log entries read per poll
+LIVE_BATCH_SIZE = int(os.getenv("LIVE_BATCH_SIZE", "500"))
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = b": keepalive\n\n"
+RESYNC = b"event: resync\ndata: {}\n\n"
+# Pushed to every queue on shutdown so open streams end
+_CLOSE = object()
+
+def encode_change(change: dict):
+    """One SSE frame; the cursor is the event id, so a reconnecting browser resumes via Last-Event-ID."""
+    data = schemas.ChangeEntry(**change).model_dump_json()
+    return f"id: {change['cursor']}\nevent: change\ndata: {data}\n\n".encode()
+
+class Subscription:
+    """One open event stream: its scope and a bounded queue of encoded frames."""
+    __slots__ = ("key", "queue", "overflowed")
+
+    def __init__(self, key: tuple, queue_size: int):
+        self.key = key
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+class ChangeBroadcaster:
+    """
+    Fans change log entries out to Server-Sent Events streams.
+
+    A single task per worker reads the change log, so database load does not grow with the
+    number of connections. Each change is encoded once and its frame is queued for the
+    subscribers of its project, its epic, and the unscoped feed. An idle connection costs a
+    queue and a suspended generator, nothing per poll. Commits in this process wake the
+    task at once; writes from elsewhere are picked up within poll_seconds.
+    """
+
+    def __init__(self, session_factory=SessionLocal, poll_seconds: float = LIVE_POLL_SECONDS,
+                 heartbeat_seconds: float = LIVE_HEARTBEAT_SECONDS, queue_size: int = LIVE_QUEUE_SIZE,
+                 batch_size: int = LIVE_BATCH_SIZE):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.cursor = None
+        self.subscribers = defaultdict(set)
+        self.published = 0
+        self._loop = None
+        self._wake = None
+        self._task = None
+
+    @property
+    def connections(self):
+        return sum(len(subscribers) for subscribers in self.subscribers.values())
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self.cursor = await asyncio.to_thread(self._latest_cursor)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscribers in self.subscribers.values():
+            for subscription in subscribers:
+                self._offer(subscription, _CLOSE, force=True)
+
+    def notify(self):
+        """Wakes the poller; safe to call from any thread."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def subscribe(self, project_id: int = None, epic_id: int = None):
+        if epic_id is not None:
+            key = ("epic", epic_id)
+        elif project_id is not None:
+            key = ("project", project_id)
+        else:
+            key = ("all", None)
+        subscription = Subscription(key, self.queue_size)
+        self.subscribers[key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self.subscribers.get(subscription.key)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[subscription.key]
+
+    def _latest_cursor(self):
+        db = self.session_factory()
+        try:
+            return db.query(func.max(models.ChangeLog.id)).scalar() or 0
+        finally:
+            db.close()
+
+    def _read_changes(self, since: int):
+        db = self.session_factory()
+        try:
+            return changes.get_changes(db, since=since, limit=self.batch_size)
+        finally:
+            db.close()
+
+    def _offer(self, subscription: Subscription, frame, force: bool = False):
+        try:
+            subscription.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            if force:
+                # Make room for the close marker; the stream is ending anyway
+                subscription.queue.get_nowait()
+                subscription.queue.put_nowait(frame)
+            else:
+                subscription.overflowed = True
+
+    def publish(self, change: dict):
+        keys = [("all", None)]
+        if change["project_id"] is not None:
+            keys.append(("project", change["project_id"]))
+        if change["epic_id"] is not None:
+            keys.append(("epic", change["epic_id"]))
+        frame = None
+        for key in keys:
+            for subscription in self.subscribers.get(key, ()):
+                frame = frame or encode_change(change)
+                self._offer(subscription, frame)
+        self.published += 1
+
+    async def poll_once(self):
+        """Publishes everything logged since the last poll. Returns the number of changes read."""
+        if not self.subscribers:
+            # Nobody is listening: just move the cursor forward, without reading rows
+            self.cursor = await asyncio.to_thread(self._latest_cursor)
+            return 0
+        read = 0
+        while True:
+            try:
+                feed = await asyncio.to_thread(self._read_changes, self.cursor)
+            except changes.CursorExpiredError:
+                # Compacted past us (a very long stall); everyone reloads
+                for subscribers in self.subscribers.values():
+                    for subscription in subscribers:
+                        subscription.overflowed = True
+                        self._offer(subscription, HEARTBEAT)
+                self.cursor = await asyncio.to_thread(self._latest_cursor)
+                return read
+            for change in feed["changes"]:
+                self.publish(change)
+            read += len(feed["changes"])
+            self.cursor = feed["next_cursor"]
+            if not feed["has_more"]:
+                return read
+
+    def heartbeat(self):
+        for subscribers in self.subscribers.values():
+            for subscription in subscribers:
+                self._offer(subscription, HEARTBEAT)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_heartbeat = loop.time() + self.heartbeat_seconds
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Live update poll failed: {e}", exc_info=True)
+            if loop.time() >= next_heartbeat:
+                self.heartbeat()
+                next_heartbeat = loop.time() + self.heartbeat_seconds
+
+    async def stream(self, project_id: int = None, epic_id: int = None, last_event_id: int = None):
+        """
+        Subscribes and yields SSE frames until the client goes away, falls too far behind,
+        or the server shuts down. With last_event_id, missed changes are replayed from the
+        change log first.
+        """
+        subscription = self.subscribe(project_id=project_id, epic_id=epic_id)
+        try:
+            yield b"retry: 3000\n\n"
+            sent = 0
+            if last_event_id:
+                try:
+                    feed = await asyncio.to_thread(self._replay, last_event_id, *subscription.key)
+                except changes.CursorExpiredError:
+                    feed = None
+                if feed is None or feed["has_more"]:
+                    yield RESYNC
+                    return
+                for change in feed["changes"]:
+                    yield encode_change(change)
+                sent = feed["next_cursor"]
+            while True:
+                frame = await subscription.queue.get()
+                if frame is _CLOSE:
+                    return
+                if subscription.overflowed:
+                    yield RESYNC
+                    return
+                if sent and frame.startswith(b"id: "):
+                    # Already replayed
+                    cursor = int(frame[4:frame.index(b"\n")])
+                    if cursor <= sent:
+                        continue
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    def _replay(self, since: int, kind: str, scope_id: int):
+        db = self.session_factory()
+        try:
+            return changes.get_changes(
+                db, since=since, limit=self.queue_size,
+                project_id=scope_id if kind == "project" else None,
+                epic_id=scope_id if kind == "epic" else None,
+            )
+        finally:
+            db.close()
+
+# Process-wide broadcaster, started and stopped by the app lifespan
+change_broadcaster = ChangeBroadcaster()
+
+@event.listens_for(Session, "after_commit")
+def _notify_broadcaster(session):
+    # Pushes this worker's own writes out without waiting for the next poll
+    change_broadcaster.notify()
@@ -1,15 +1,17 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import FastAPI, Depends, HTTPException, Request, Form, Query
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 import os
+import json
 from dotenv import load_dotenv
 import logging
+import time
 from contextlib import asynccontextmanager
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
-from . import models, database, crud, schemas, email_service, jira_service
+from . import models, database, crud, schemas, email_service, jira_service, jira_webhooks, jobs, outbox, changes, live, health, trends, reference_data, archive
 from .database import engine
 from .scheduler import scheduler
 
@@ -31,13 +33,26 @@ async def lifespan(app: FastAPI):
         logging.info("APScheduler started successfully.")
     except Exception as e:
         logging.error(f"Error starting APScheduler: {e}", exc_info=True)
+    # Deliver queued emails in the background
+    outbox.outbox_drainer.start()
+    # Push change log entries to open event streams
+    await live.change_broadcaster.start()
     
     yield
     
     # Shutdown
     logging.info("Application shutting down...")
+    try:
+        # Apply webhook events still waiting out their debounce window
+        jira_webhooks.webhook_processor.flush()
+    except Exception as e:
+        logging.error(f"Error applying pending Jira webhook events: {e}")
     scheduler.shutdown()
     logging.info("APScheduler shut down successfully.")
+    await outbox.outbox_drainer.stop()
+    await live.change_broadcaster.stop()
+    # Close pooled SMTP connections
+    await email_service.reset_mail_transport()
 
 app = FastAPI(
     title="Risk Tracker", 
@@ -54,6 +69,9 @@ def get_db():
     finally:
         db.close()
 
+# Process start, for the liveness uptime
+STARTED_AT = time.monotonic()
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
@@ -66,8 +84,8 @@ async def read_root(request: Request, db: Session = Depends(get_db)):
 
 # Project API Routes
 @app.get("/api/projects", response_model=list[schemas.Project])
-def get_projects(db: Session = Depends(get_db)):
-    return crud.get_projects(db)
+def get_projects(sort: str = Query(None, pattern="^epic_count$"), db: Session = Depends(get_db)):
+    return crud.get_projects(db, sort=sort)
 
 @app.post("/api/projects", response_model=schemas.Project)
 def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)):
@@ -95,28 +113,60 @@ def delete_project(project_id: int, db: Session = Depends(get_db)):
     return {"message": "Project deleted successfully"}
 
 @app.get("/api/projects/{project_id}/epics", response_model=list[schemas.Epic])
-def get_project_epics(project_id: int, db: Session = Depends(get_db)):
+def get_project_epics(project_id: int, archived: bool = False, db: Session = Depends(get_db)):
     # Verify project exists
     project = crud.get_project(db, project_id=project_id)
     if project is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    return crud.get_epics_by_project(db, project_id=project_id)
+    epics = crud.get_epics_by_project(db, project_id=project_id)
+    if archived:
+        epics = epics + archive.get_archived_epics(db, project_id=project_id)
+    return epics
 
 @app.get("/api/epics", response_model=list[schemas.Epic])
-def get_epics(db: Session = Depends(get_db)):
-    return crud.get_epics(db)
+def get_epics(
+    sort: str = Query(None, pattern="^(exposure|risk_count|open_risk_count)$"),
+    min_open_risks: int = Query(None, ge=0),
+    archived: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Sorts are highest first; the risk counts are stored on each epic, so neither needs its risks loaded.
+    archived=true appends archived epics (marked "archived": true) after the live ones.
+    """
+    if sort == "exposure":
+        # Stored scores only; the scheduled refresh keeps them current, so a GET never writes
+        epics = crud.get_epics_by_exposure(db, min_open_risks=min_open_risks)
+    else:
+        epics = crud.get_epics(db, min_open_risks=min_open_risks, sort=sort)
+    if archived:
+        epics = epics + archive.get_archived_epics(db, min_open_risks=min_open_risks)
+    return epics
 
 @app.post("/api/epics", response_model=schemas.Epic)
 def create_epic(epic: schemas.EpicCreate, db: Session = Depends(get_db)):
     return crud.create_epic(db=db, epic=epic)
 
 @app.get("/api/epics/{epic_id}", response_model=schemas.Epic)
-def get_epic(epic_id: int, db: Session = Depends(get_db)):
+def get_epic(epic_id: int, archived: bool = False, db: Session = Depends(get_db)):
     epic = crud.get_epic(db, epic_id=epic_id)
+    if epic is None and archived:
+        epic = archive.get_archived_epic(db, epic_id)
     if epic is None:
         raise HTTPException(status_code=404, detail="Epic not found")
     return epic
 
+@app.post("/api/epics/{epic_id}/restore", response_model=schemas.Epic)
+def restore_epic(epic_id: int, db: Session = Depends(get_db)):
+    """Moves an archived epic, with its risks and updates, back to the live tables."""
+    try:
+        epic = archive.restore_epic(db, epic_id)
+    except archive.ArchiveError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if epic is None:
+        raise HTTPException(status_code=404, detail="Archived epic not found")
+    return epic
+
 @app.put("/api/epics/{epic_id}", response_model=schemas.Epic)
 def update_epic(epic_id: int, epic: schemas.EpicUpdate, db: Session = Depends(get_db)):
     db_epic = crud.update_epic(db, epic_id=epic_id, epic=epic)
@@ -135,9 +185,32 @@ def delete_epic(epic_id: int, db: Session = Depends(get_db)):
 def create_risk(epic_id: int, risk: schemas.RiskCreate, db: Session = Depends(get_db)):
     return crud.create_risk(db=db, risk=risk, epic_id=epic_id)
 
+@app.get("/api/risks", response_model=list[schemas.RiskSummary])
+def get_risks(
+    epic_id: int = None,
+    status: str = None,
+    updated_before: datetime = None,
+    updated_since: datetime = None,
+    sort: str = Query(None, pattern="^-?last_update_at$"),
+    limit: int = Query(1000, ge=1, le=5000),
+    archived: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    E.g. ?status=Open&updated_before=2025-03-01T00:00:00&sort=-last_update_at for the longest idle open risks.
+    archived=true appends archived risks matching epic_id and status; the date filters and sort apply to live risks only.
+    """
+    risks = crud.get_risks(db, epic_id=epic_id, status=status, updated_before=updated_before,
+                           updated_since=updated_since, sort=sort, limit=limit)
+    if archived and len(risks) < limit:
+        risks = risks + archive.get_archived_risks(db, epic_id=epic_id, status=status, limit=limit - len(risks))
+    return risks
+
 @app.get("/api/risks/{risk_id}", response_model=schemas.Risk)
-def get_risk(risk_id: int, db: Session = Depends(get_db)):
+def get_risk(risk_id: int, archived: bool = False, db: Session = Depends(get_db)):
     risk = crud.get_risk(db, risk_id=risk_id)
+    if risk is None and archived:
+        risk = archive.get_archived_risk(db, risk_id)
     if risk is None:
         raise HTTPException(status_code=404, detail="Risk not found")
     return risk
@@ -160,7 +233,7 @@ def delete_risk(risk_id: int, db: Session = Depends(get_db)):
 def create_risk_update(risk_id: int, update: schemas.RiskUpdateCreate, db: Session = Depends(get_db)):
     return crud.create_risk_update(db=db, update=update, risk_id=risk_id)
 
-@app.post("/api/epics/{epic_id}/request-date-change")
+@app.post("/api/epics/{epic_id}/request-date-change", status_code=202)
 async def request_date_change(
     epic_id: int,
     reason: str = Form(...),
@@ -172,10 +245,77 @@ async def request_date_change(
         raise HTTPException(status_code=404, detail="Epic not found")
     
     try:
-        await email_service.send_date_change_request(epic, reason, proposed_date)
-        return {"message": "Date change request sent successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
+        # Queued in the outbox; the drainer sends it in the background
+        queued = outbox.enqueue_date_change_request(db, epic, reason, proposed_date)
+    except email_service.EmailConfigurationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    outbox.outbox_drainer.notify()
+    return {"message": "Date change request queued", "outbox_id": queued.id, "status": queued.status}
+
+@app.get("/api/epics/{epic_id}/date-change-requests", response_model=list[schemas.OutboxMessage])
+def list_date_change_requests(epic_id: int, db: Session = Depends(get_db)):
+    if crud.get_epic(db, epic_id=epic_id) is None:
+        raise HTTPException(status_code=404, detail="Epic not found")
+    return crud.get_outbox_messages_by_epic(db, epic_id, kind=outbox.DATE_CHANGE_REQUEST)
+
+@app.get("/api/outbox/{message_id}", response_model=schemas.OutboxMessage)
+def get_outbox_message(message_id: int, db: Session = Depends(get_db)):
+    message = crud.get_outbox_message(db, message_id=message_id)
+    if message is None:
+        raise HTTPException(status_code=404, detail="Outbox message not found")
+    return message
+
+@app.get("/api/trends", response_model=schemas.Trend)
+def get_trends(
+    entity: str = Query("risks", pattern="^(epics|risks)$"),
+    status: list[str] = Query(None),
+    project_id: int = Query(trends.PORTFOLIO, ge=0),
+    start: date = None,
+    end: date = None,
+    interval: str = Query("day", pattern="^(day|week|month)$"),
+    db: Session = Depends(get_db)
+):
+    """Counts from the daily snapshots, e.g. ?entity=risks&status=Open&status=Mitigating&project_id=3&interval=week."""
+    points = trends.get_trend(db, entity, statuses=status, project_id=project_id, start=start, end=end,
+                              interval=interval)
+    return {"entity": entity, "project_id": project_id, "statuses": status, "interval": interval, "points": points}
+
+@app.get("/api/trends/date-changes", response_model=list[schemas.TargetDateChange])
+def get_target_date_changes(
+    project_id: int = None,
+    epic_id: int = None,
+    start: date = None,
+    end: date = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    return trends.get_date_changes(db, project_id=project_id, epic_id=epic_id, start=start, end=end, limit=limit)
+
+@app.get("/api/changes", response_model=schemas.ChangeFeed)
+def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    project_id: int = None,
+    epic_id: int = None,
+    db: Session = Depends(get_db)
+):
+    try:
+        return changes.get_changes(db, since=since, limit=limit, project_id=project_id, epic_id=epic_id)
+    except changes.CursorExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+@app.get("/api/events")
+async def stream_events(request: Request, project_id: int = None, epic_id: int = None):
+    # Sent by browsers when an EventSource reconnects
+    last_event_id = request.headers.get("last-event-id", "")
+    return StreamingResponse(
+        live.change_broadcaster.stream(
+            project_id=project_id, epic_id=epic_id,
+            last_event_id=int(last_event_id) if last_event_id.isdigit() else None,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # HTML Routes for web interface
 @app.get("/projects", response_class=HTMLResponse)
@@ -193,10 +333,10 @@ async def project_detail(request: Request, project_id: int, db: Session = Depend
 
 @app.get("/epics/{epic_id}", response_class=HTMLResponse)
 async def epic_detail(request: Request, epic_id: int, db: Session = Depends(get_db)):
-    epic = crud.get_epic(db, epic_id=epic_id)
+    epic = crud.get_epic_detail(db, epic_id=epic_id)
     if epic is None:
         raise HTTPException(status_code=404, detail="Epic not found")
-    projects = crud.get_projects(db)  # For project dropdown in edit
+    projects = reference_data.project_choices.get(db)  # For project dropdown in edit
     return templates.TemplateResponse("epic_detail.html", {"request": request, "epic": epic, "projects": projects})
 
 @app.get("/epics", response_class=HTMLResponse)
@@ -206,7 +346,7 @@ async def epics_list(request: Request, project_id: str = None, status: str = Non
         p_id = int(project_id)
 
     epics = crud.get_epics(db, project_id=p_id, status=status, quarter=quarter)
-    projects = crud.get_projects(db)
+    projects = reference_data.project_choices.get(db)
     statuses = ["Planned", "In Progress", "Blocked", "Delayed", "Launched", "Cancelled"]
 
     # Generate a list of relevant quarters for the filter
@@ -239,20 +379,54 @@ async def epics_list(request: Request, project_id: str = None, status: str = Non
     })
 
 # Jira Integration API Route
-@app.post("/api/jira/import/{jira_project_key}", status_code=200)
-def import_jira_project(jira_project_key: str, db: Session = Depends(get_db)):
+@app.post("/api/jira/import/{jira_project_key}", status_code=202)
+def import_jira_project(jira_project_key: str):
+    """
+    Starts a background import of the Jira project; poll /api/jobs/{id} for its status.
+    A failed job's error_kind is "not_found" (no such project), "unavailable" (Jira unreachable) or "error".
+    """
+    job, created = jobs.submit_jira_import(jira_project_key)
+    return {**job.to_dict(), "created": created}
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/api/jira/webhook", status_code=202)
+async def jira_webhook(request: Request, secret: str = None):
+    """Receives Jira issue events and applies epic changes after a short debounce."""
+    body = await request.body()
     try:
-        result = jira_service.import_epics_from_jira(db, jira_project_key)
-        return result
-    except ConnectionError as e:
-        raise HTTPException(status_code=503, detail=str(e))
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except IOError as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    except Exception as e:
-        # Catch any other unexpected errors
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+        jira_webhooks.verify_webhook(body, signature=request.headers.get("X-Hub-Signature"), token=secret)
+    except jira_webhooks.WebhookAuthError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    try:
+        event = json.loads(body)
+    except ValueError:
+        event = None
+    if not isinstance(event, dict):
+        raise HTTPException(status_code=400, detail="Webhook body must be a JSON object")
+    accepted = jira_webhooks.webhook_processor.submit(event)
+    return {"accepted": accepted}
+
+@app.get("/api/jira/metrics")
+def get_jira_metrics():
+    """Request rate, throttling and circuit breaker state for each Jira server."""
+    return jira_service.get_jira_metrics()
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests. Touches no dependency."""
+    return {"status": "ok", "uptime_seconds": round(time.monotonic() - STARTED_AT, 1)}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: database, scheduler, Jira and SMTP, checked concurrently and cached briefly. 503 when not ready."""
+    report = await health.health_checker.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,166 @@
+import logging
+import os
+import sqlite3
+import time
+from .backup import BackupError, sqlite_path_from_url
+
+# Hour (server time) of the nightly maintenance run, at :15; -1 disables it
+MAINTENANCE_HOUR = int(os.getenv("MAINTENANCE_HOUR", "4"))
+# Rows ANALYZE samples per index; 0 reads every row
+MAINTENANCE_ANALYSIS_LIMIT = int(os.getenv("MAINTENANCE_ANALYSIS_LIMIT", "1000"))
+# Free pages returned to the filesystem per incremental vacuum step (one short write transaction each)
+MAINTENANCE_VACUUM_PAGES = int(os.getenv("MAINTENANCE_VACUUM_PAGES", "1000"))
+# Pause between steps; a step is put off while other connections keep committing
+MAINTENANCE_STEP_PAUSE_SECONDS = float(os.getenv("MAINTENANCE_STEP_PAUSE_SECONDS", "0.5"))
+# Time the vacuum may take per run; what is left waits for the next run
+MAINTENANCE_VACUUM_SECONDS = float(os.getenv("MAINTENANCE_VACUUM_SECONDS", "60"))
+# How long each statement waits for the write lock
+MAINTENANCE_BUSY_TIMEOUT_MS = int(os.getenv("MAINTENANCE_BUSY_TIMEOUT_MS", "5000"))
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+logger = logging.getLogger(__name__)
+
+def connect(db_path: str):
+    """A connection in autocommit mode, so each vacuum step is its own transaction."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout = {MAINTENANCE_BUSY_TIMEOUT_MS}")
+    return conn
+
+def _pragma(conn, name: str):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+def database_stats(conn, db_path: str):
+    """File sizes and page counts; free pages are what a vacuum would give back."""
+    wal_path = f"{db_path}-wal"
+    return {
+        "file_bytes": os.path.getsize(db_path),
+        "wal_bytes": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+        "page_size": _pragma(conn, "page_size"),
+        "page_count": _pragma(conn, "page_count"),
+        "free_pages": _pragma(conn, "freelist_count"),
+        "auto_vacuum": AUTO_VACUUM_MODES.get(_pragma(conn, "auto_vacuum"), "unknown"),
+    }
+
+def quick_check(conn, max_errors: int = 10):
+    """PRAGMA quick_check: the integrity check without index cross-checks, linear in the file size."""
+    return [row[0] for row in conn.execute(f"PRAGMA quick_check({max_errors})")]
+
+def analyze(conn, analysis_limit: int = MAINTENANCE_ANALYSIS_LIMIT):
+    """Refreshes the planner's statistics, sampling at most analysis_limit rows per index."""
+    conn.execute(f"PRAGMA analysis_limit = {analysis_limit}")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+
+def incremental_vacuum(conn, pages: int = MAINTENANCE_VACUUM_PAGES, pause: float = MAINTENANCE_STEP_PAUSE_SECONDS,
+                       max_seconds: float = MAINTENANCE_VACUUM_SECONDS):
+    """
+    Gives free pages back to the filesystem, pages at a time, until none are left or
+    max_seconds is up. PRAGMA data_version moves whenever another connection commits; a
+    step is skipped while it keeps moving, so the vacuum only writes between bursts of
+    application writes. Needs auto_vacuum=INCREMENTAL (see enable_incremental_vacuum).
+    """
+    result = {"pages_freed": 0, "steps": 0, "deferred": 0, "complete": False}
+    if _pragma(conn, "auto_vacuum") != 2:
+        return result
+    deadline = time.monotonic() + max_seconds
+    version = _pragma(conn, "data_version")
+    while True:
+        free_pages = _pragma(conn, "freelist_count")
+        if not free_pages:
+            result["complete"] = True
+            break
+        if time.monotonic() >= deadline:
+            break
+        current = _pragma(conn, "data_version")
+        if current != version:
+            version = current
+            result["deferred"] += 1
+        else:
+            # It frees one page per step and returns no rows, so execute() would stop after
+            # one page; executescript() steps it to the end
+            conn.executescript(f"PRAGMA incremental_vacuum({pages});")
+            result["steps"] += 1
+            result["pages_freed"] += free_pages - _pragma(conn, "freelist_count")
+        if pause:
+            time.sleep(pause)
+    if result["pages_freed"] and _pragma(conn, "journal_mode") == "wal":
+        # The file only shrinks once the truncation is checkpointed; PASSIVE never waits on readers
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+    return result
+
+def enable_incremental_vacuum(db_path: str = None):
+    """
+    Switches an existing database to auto_vacuum=INCREMENTAL. That takes one full VACUUM,
+    which rewrites the whole file under the write lock, so run it while the app is idle.
+    Databases created by the app are incremental from the start (see app/database.py).
+    """
+    db_path = db_path or sqlite_path_from_url()
+    conn = connect(db_path)
+    try:
+        started = time.monotonic()
+        before = database_stats(conn, db_path)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        if _pragma(conn, "journal_mode") == "wal":
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return {"before": before, "after": database_stats(conn, db_path),
+                "seconds": round(time.monotonic() - started, 3)}
+    finally:
+        conn.close()
+
+def run_maintenance(db_path: str = None, vacuum_pages: int = MAINTENANCE_VACUUM_PAGES,
+                    pause: float = MAINTENANCE_STEP_PAUSE_SECONDS, vacuum_seconds: float = MAINTENANCE_VACUUM_SECONDS):
+    """
+    quick_check, then ANALYZE and PRAGMA optimize, then a bounded incremental vacuum.
+    A database that fails the check is not vacuumed: moving pages around would only
+    spread the damage. Returns the check result, the vacuum's progress, file stats
+    before and after, and the time each phase took.
+    """
+    db_path = db_path or sqlite_path_from_url()
+    conn = connect(db_path)
+    try:
+        started = time.monotonic()
+        report = {"before": database_stats(conn, db_path), "seconds": {}}
+
+        phase = time.monotonic()
+        problems = quick_check(conn)
+        report["quick_check"] = "ok" if problems == ["ok"] else problems
+        report["seconds"]["quick_check"] = round(time.monotonic() - phase, 3)
+
+        phase = time.monotonic()
+        analyze(conn)
+        report["seconds"]["analyze"] = round(time.monotonic() - phase, 3)
+
+        phase = time.monotonic()
+        if report["quick_check"] == "ok":
+            report["vacuum"] = incremental_vacuum(conn, pages=vacuum_pages, pause=pause, max_seconds=vacuum_seconds)
+        else:
+            report["vacuum"] = None
+        report["seconds"]["vacuum"] = round(time.monotonic() - phase, 3)
+
+        report["after"] = database_stats(conn, db_path)
+        report["seconds"]["total"] = round(time.monotonic() - started, 3)
+        return report
+    finally:
+        conn.close()
+
+def run_scheduled_maintenance():
+    """Scheduler entry point."""
+    try:
+        report = run_maintenance()
+    except (BackupError, sqlite3.Error) as e:
+        logger.error(f"Database maintenance failed: {e}")
+        return None
+    before, after, vacuum = report["before"], report["after"], report["vacuum"]
+    if report["quick_check"] != "ok":
+        logger.error(f"Database quick_check failed, vacuum skipped: {'; '.join(report['quick_check'])}")
+    elif after["auto_vacuum"] != "incremental" and after["free_pages"]:
+        logger.warning(f"{after['free_pages']} free pages cannot be reclaimed until the database is switched "
+                       f"to incremental auto-vacuum (python database_migration.py vacuum)")
+    steps = f" ({vacuum['steps']} vacuum steps, {vacuum['deferred']} deferred)" if vacuum else ""
+    logger.info(
+        f"Database maintenance: {before['file_bytes']} -> {after['file_bytes']} bytes, free pages "
+        f"{before['free_pages']} -> {after['free_pages']}{steps}; seconds {report['seconds']}"
+    )
+    return report
@@ -0,0 +1,428 @@
+import logging
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+from . import changes, counters
+from .backup import sqlite_path_from_url
+
+# Rows updated per backfill transaction; each chunk holds the write lock only briefly
+MIGRATION_CHUNK_ROWS = int(os.getenv("MIGRATION_CHUNK_ROWS", "2000"))
+# Pause between backfill chunks, leaving the database to the app's own writes
+MIGRATION_CHUNK_PAUSE_SECONDS = float(os.getenv("MIGRATION_CHUNK_PAUSE_SECONDS", "0.05"))
+# How long a migration statement waits for the app's write lock before failing
+MIGRATION_BUSY_TIMEOUT_MS = int(os.getenv("MIGRATION_BUSY_TIMEOUT_MS", "10000"))
+
+logger = logging.getLogger(__name__)
+
+class MigrationError(Exception):
+    """Raised when a migration cannot be applied or rolled back."""
+
+class Backfill:
+    """
+    An UPDATE applied in primary-key ranges, one short transaction per chunk. The last
+    key done is saved in the same transaction, so an interrupted backfill resumes where
+    it stopped and never repeats a chunk.
+    """
+
+    def __init__(self, name: str, table: str, set_sql: str, where_sql: str = "1 = 1", key: str = "id"):
+        self.name = name
+        self.table = table
+        self.set_sql = set_sql
+        self.where_sql = where_sql
+        self.key = key
+
+    def describe(self):
+        return f"UPDATE {self.table} SET {self.set_sql} WHERE {self.where_sql}  -- in chunks by {self.key}"
+
+    def remaining_rows(self, conn: sqlite3.Connection, after: int = 0):
+        return conn.execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE {self.key} > ? AND ({self.where_sql})", (after,)
+        ).fetchone()[0]
+
+    def run(self, conn: sqlite3.Connection, version: int, chunk_rows: int, pause_seconds: float):
+        row = conn.execute(
+            "SELECT last_key, rows_updated, completed_at FROM migration_backfills WHERE version = ? AND name = ?",
+            (version, self.name),
+        ).fetchone()
+        last_key, rows_updated, completed_at = row or (0, 0, None)
+        if completed_at:
+            return rows_updated
+        if row is None:
+            conn.execute("INSERT INTO migration_backfills (version, name, last_key, rows_updated) VALUES (?, ?, 0, 0)",
+                         (version, self.name))
+        while True:
+            upper = conn.execute(
+                f"SELECT MAX({self.key}) FROM (SELECT {self.key} FROM {self.table} WHERE {self.key} > ? "
+                f"ORDER BY {self.key} LIMIT ?)", (last_key, chunk_rows),
+            ).fetchone()[0]
+            if upper is None:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                updated = conn.execute(
+                    f"UPDATE {self.table} SET {self.set_sql} "
+                    f"WHERE {self.key} > ? AND {self.key} <= ? AND ({self.where_sql})", (last_key, upper),
+                ).rowcount
+                conn.execute(
+                    "UPDATE migration_backfills SET last_key = ?, rows_updated = rows_updated + ? "
+                    "WHERE version = ? AND name = ?", (upper, updated, version, self.name),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            last_key = upper
+            rows_updated += updated
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        conn.execute("UPDATE migration_backfills SET completed_at = ? WHERE version = ? AND name = ?",
+                     (datetime.utcnow().isoformat(sep=" "), version, self.name))
+        return rows_updated
+
+class Migration:
+    """
+    One schema version. `up` and `down` are lists of SQL strings or callables taking the
+    connection; each list runs in a single transaction. Backfills run in chunks once the
+    schema steps are in. `down=None` marks the migration as irreversible. `applied_if`
+    detects databases that already have the change (built by create_all from the current
+    models), which are recorded as migrated without running the steps or backfills.
+    """
+
+    def __init__(self, version: int, name: str, up: list, down: list = None, backfills: list = (),
+                 applied_if=None):
+        self.version = version
+        self.name = name
+        self.up = up
+        self.down = down
+        self.backfills = list(backfills)
+        self.applied_if = applied_if
+
+# --- Helpers for idempotent steps, since create_all may already have built the schema ---
+
+def column_exists(conn: sqlite3.Connection, table: str, column: str):
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+# The change log's update trigger names every column of its table: SQLite refuses to drop a
+# column a trigger uses, and a trigger naming a missing column fails every update
+def _drop_change_triggers(conn: sqlite3.Connection, table: str):
+    if table in changes.TRACKED:
+        for statement in changes.trigger_statements({table: []}):
+            if statement.startswith("DROP"):
+                conn.execute(statement)
+
+def _create_change_triggers(conn: sqlite3.Connection, table: str):
+    if table in changes.TRACKED and conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'change_log'").fetchone():
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        for statement in changes.trigger_statements({table: columns}):
+            conn.execute(statement)
+
+def create_counter_triggers(conn: sqlite3.Connection):
+    """CREATE TRIGGER counters_*  -- the counter triggers of app/counters.py"""
+    for statement in counters.trigger_statements():
+        conn.execute(statement)
+
+def drop_counter_triggers(conn: sqlite3.Connection):
+    """DROP TRIGGER counters_*"""
+    for statement in counters.drop_statements():
+        conn.execute(statement)
+
+def add_column(table: str, column: str, definition: str):
+    def step(conn):
+        if not column_exists(conn, table, column):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            _create_change_triggers(conn, table)
+    step.__doc__ = f"ALTER TABLE {table} ADD COLUMN {column} {definition}  -- unless it exists"
+    return step
+
+def drop_column(table: str, column: str):
+    def step(conn):
+        if column_exists(conn, table, column):
+            _drop_change_triggers(conn, table)
+            conn.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+            _create_change_triggers(conn, table)
+    step.__doc__ = f"ALTER TABLE {table} DROP COLUMN {column}  -- if it exists"
+    return step
+
+def _table_sql(conn: sqlite3.Connection, table: str):
+    return conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+
+def _autoincrement_sql(table_sql: str, table: str, new_name: str):
+    """The CREATE TABLE of `table` under new_name, with its id column made AUTOINCREMENT."""
+    sql = re.sub(rf'^CREATE TABLE\s+"?{table}"?', f"CREATE TABLE {new_name}", table_sql, count=1)
+    if re.search(r"\bid INTEGER PRIMARY KEY\b", sql, re.IGNORECASE):
+        # Hand-written schema: id INTEGER PRIMARY KEY
+        return re.sub(r"\bid INTEGER PRIMARY KEY\b", "id INTEGER PRIMARY KEY AUTOINCREMENT", sql, count=1, flags=re.IGNORECASE)
+    if re.search(r",\s*PRIMARY KEY \(id\)", sql, re.IGNORECASE):
+        # create_all's schema: id INTEGER NOT NULL, ..., PRIMARY KEY (id)
+        sql = re.sub(r",\s*PRIMARY KEY \(id\)", "", sql, count=1, flags=re.IGNORECASE)
+        return re.sub(r"\bid INTEGER NOT NULL\b", "id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT", sql, count=1, flags=re.IGNORECASE)
+    raise MigrationError(f"Cannot find the integer primary key of {table} in: {table_sql}")
+
+def rebuild_with_autoincrement(id_floors: dict):
+    """
+    Rebuilds tables with AUTOINCREMENT ids: copy into a new table, drop the old one, rename,
+    then recreate its indexes. Every trigger is dropped first and recreated last, since
+    triggers on other tables name the tables being swapped. id_floors maps each table to
+    other tables whose ids it must never hand out again; its sequence starts above them.
+    """
+    def step(conn):
+        pending = [table for table in id_floors if "AUTOINCREMENT" not in _table_sql(conn, table).upper()]
+        if not pending:
+            return
+        triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+        for name, _ in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+        for table in pending:
+            indexes = [sql for (sql,) in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+            columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+            conn.execute(_autoincrement_sql(_table_sql(conn, table), table, f"{table}_rebuild"))
+            conn.execute(f"INSERT INTO {table}_rebuild ({columns}) SELECT {columns} FROM {table}")
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {table}_rebuild RENAME TO {table}")
+            for sql in indexes:
+                conn.execute(sql)
+            floor = max(conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {source}").fetchone()[0]
+                        for source in [table] + [name for name in id_floors[table]
+                                                 if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone()])
+            conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, floor))
+        for _, sql in triggers:
+            conn.execute(sql)
+    step.__doc__ = f"Rebuild {', '.join(id_floors)} with AUTOINCREMENT ids  -- unless they have them"
+    return step
+
+# Per-row values of the counters in app/counters.py, for chunked backfills
+_RISK_COUNT = "(SELECT COUNT(*) FROM risks WHERE risks.epic_id = epics.id)"
+_OPEN_RISK_COUNT = "(SELECT COUNT(*) FROM risks WHERE risks.epic_id = epics.id AND risks.status IN ('Open', 'Mitigating'))"
+_EPIC_COUNT = "(SELECT COUNT(*) FROM epics WHERE epics.project_id = projects.id)"
+_LAST_UPDATE_AT = "(SELECT MAX(created_at) FROM risk_updates WHERE risk_updates.risk_id = risks.id)"
+
+# --- Migrations, oldest first. Never edit an applied one; add a new version instead. ---
+
+MIGRATIONS = [
+    Migration(
+        1, "projects",
+        up=[
+            """CREATE TABLE IF NOT EXISTS projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                jira_project_key VARCHAR(100) UNIQUE,
+                name VARCHAR(255) NOT NULL,
+                description TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )""",
+            add_column("epics", "project_id", "INTEGER REFERENCES projects(id)"),
+            add_column("epics", "jira_epic_key", "VARCHAR(100)"),
+            """INSERT INTO projects (name, description)
+               SELECT 'General', 'Default project for manually created epics'
+               WHERE NOT EXISTS (SELECT 1 FROM projects WHERE name = 'General')""",
+            "CREATE INDEX IF NOT EXISTS idx_epics_project_id ON epics(project_id)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_epics_jira_epic_key ON epics(jira_epic_key) WHERE jira_epic_key IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS idx_projects_jira_key ON projects(jira_project_key)",
+        ],
+        # SQLite cannot drop a column that is part of a foreign key without rebuilding the table
+        down=None,
+        backfills=[
+            Backfill("assign_general_project", "epics",
+                     set_sql="project_id = (SELECT id FROM projects WHERE name = 'General')",
+                     where_sql="project_id IS NULL"),
+        ],
+        # Newer databases have projects from the start; their unassigned epics are deliberate
+        applied_if=lambda conn: column_exists(conn, "epics", "project_id"),
+    ),
+    Migration(
+        2, "child_issue_progress",
+        up=[add_column("epics", "child_issues_done", "INTEGER"),
+            add_column("epics", "child_issues_total", "INTEGER")],
+        down=[drop_column("epics", "child_issues_done"), drop_column("epics", "child_issues_total")],
+    ),
+    Migration(
+        3, "digest_indexes",
+        up=[
+            "CREATE INDEX IF NOT EXISTS ix_epics_target_launch_date ON epics(target_launch_date)",
+            "CREATE INDEX IF NOT EXISTS ix_risks_epic_id ON risks(epic_id)",
+            "CREATE INDEX IF NOT EXISTS ix_risks_status ON risks(status)",
+            "CREATE INDEX IF NOT EXISTS ix_risk_updates_risk_id_created_at ON risk_updates(risk_id, created_at)",
+        ],
+        down=[
+            "DROP INDEX IF EXISTS ix_epics_target_launch_date",
+            "DROP INDEX IF EXISTS ix_risks_epic_id",
+            "DROP INDEX IF EXISTS ix_risks_status",
+            "DROP INDEX IF EXISTS ix_risk_updates_risk_id_created_at",
+        ],
+    ),
+    Migration(
+        4, "denormalized_counters",
+        up=[
+            add_column("epics", "risk_count", "INTEGER NOT NULL DEFAULT 0"),
+            add_column("epics", "open_risk_count", "INTEGER NOT NULL DEFAULT 0"),
+            add_column("projects", "epic_count", "INTEGER NOT NULL DEFAULT 0"),
+            add_column("risks", "last_update_at", "DATETIME"),
+            create_counter_triggers,
+        ],
+        # The triggers use the columns, so they go first
+        down=[
+            drop_counter_triggers,
+            drop_column("epics", "risk_count"),
+            drop_column("epics", "open_risk_count"),
+            drop_column("projects", "epic_count"),
+            drop_column("risks", "last_update_at"),
+        ],
+        # Only rows whose value is off are written; the triggers keep them right from then on
+        backfills=[
+            Backfill("epic_risk_counts", "epics",
+                     set_sql=f"risk_count = {_RISK_COUNT}, open_risk_count = {_OPEN_RISK_COUNT}",
+                     where_sql=f"risk_count IS NOT {_RISK_COUNT} OR open_risk_count IS NOT {_OPEN_RISK_COUNT}"),
+            Backfill("project_epic_counts", "projects", set_sql=f"epic_count = {_EPIC_COUNT}",
+                     where_sql=f"epic_count IS NOT {_EPIC_COUNT}"),
+            Backfill("risk_last_update_at", "risks", set_sql=f"last_update_at = {_LAST_UPDATE_AT}",
+                     where_sql=f"last_update_at IS NOT {_LAST_UPDATE_AT}"),
+        ],
+    ),
+    Migration(
+        5, "autoincrement_ids",
+        # Archived rows keep their ids, so no live row may take one of them
+        up=[rebuild_with_autoincrement({"epics": ["archived_epics"], "risks": ["archived_risks"],
+                                        "risk_updates": ["archived_risk_updates"]})],
+        # AUTOINCREMENT is harmless to older versions of the app; the tables stay as they are
+        down=[],
+    ),
+]
+
+# --- Runner ---
+
+def connect(db_path: str = None):
+    """A connection in autocommit mode, so the runner controls every transaction itself."""
+    conn = sqlite3.connect(db_path or sqlite_path_from_url(), isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout = {MIGRATION_BUSY_TIMEOUT_MS}")
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        applied_at TIMESTAMP
+    )""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS migration_backfills (
+        version INTEGER NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        last_key INTEGER NOT NULL DEFAULT 0,
+        rows_updated INTEGER NOT NULL DEFAULT 0,
+        completed_at TIMESTAMP,
+        PRIMARY KEY (version, name)
+    )""")
+    return conn
+
+def applied_versions(conn: sqlite3.Connection):
+    """{version: status}; status is "backfilling" until a migration's backfills finish."""
+    return dict(conn.execute("SELECT version, status FROM schema_migrations"))
+
+def current_version(conn: sqlite3.Connection):
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations WHERE status = 'applied'").fetchone()[0]
+
+def pending_migrations(conn: sqlite3.Connection, migrations: list = None, target: int = None):
+    applied = applied_versions(conn)
+    return [m for m in (migrations or MIGRATIONS)
+            if applied.get(m.version) != "applied" and (target is None or m.version <= target)]
+
+def _describe(step):
+    return " ".join(step.split()) if isinstance(step, str) else (step.__doc__ or step.__name__)
+
+def _run_steps(conn: sqlite3.Connection, steps: list, record_sql: str, record_params: tuple):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for step in steps:
+            if isinstance(step, str):
+                conn.execute(step)
+            else:
+                step(conn)
+        conn.execute(record_sql, record_params)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def migrate(conn: sqlite3.Connection, target: int = None, dry_run: bool = False, migrations: list = None,
+            chunk_rows: int = MIGRATION_CHUNK_ROWS, pause_seconds: float = MIGRATION_CHUNK_PAUSE_SECONDS,
+            log=logger.info):
+    """
+    Applies pending migrations up to `target` (default: all), in two phases:
+    - schema steps, one short transaction per migration;
+    - backfills, in chunks while the app keeps serving.
+    Every schema change is in place before any backfill runs, so a backfill can rely on
+    the full target schema (the change log triggers, for one, read every epic column).
+    Rerunning after an interruption resumes unfinished backfills. With dry_run, only logs
+    the plan and the rows each backfill would touch. Returns the versions applied.
+    """
+    applied = applied_versions(conn)
+    pending = pending_migrations(conn, migrations, target)
+    already_present = set()
+    for migration in pending:
+        if applied.get(migration.version) == "backfilling":
+            log(f"{migration.version} {migration.name}: schema already applied, backfills pending")
+            continue
+        record = ("INSERT INTO schema_migrations (version, name, status, applied_at) VALUES (?, ?, ?, ?)",
+                  (migration.version, migration.name, "backfilling" if migration.backfills else "applied",
+                   datetime.utcnow().isoformat(sep=" ")))
+        if migration.applied_if is not None and migration.applied_if(conn):
+            log(f"{'Would record' if dry_run else 'Recording'} {migration.version} {migration.name}: already present")
+            if not dry_run:
+                _run_steps(conn, [], record[0], record[1][:2] + ("applied", record[1][3]))
+            already_present.add(migration.version)
+            continue
+        log(f"{'Would apply' if dry_run else 'Applying'} {migration.version} {migration.name}")
+        if dry_run:
+            for step in migration.up:
+                log(f"  {_describe(step)}")
+            continue
+        _run_steps(conn, migration.up, *record)
+
+    for migration in pending:
+        if migration.version in already_present:
+            continue
+        for backfill in migration.backfills:
+            if dry_run:
+                log(f"Would backfill {migration.version} {backfill.name}: {backfill.describe()}")
+                try:
+                    log(f"  about {backfill.remaining_rows(conn):,} rows")
+                except sqlite3.OperationalError:
+                    # The columns it touches do not exist until the schema steps run
+                    log("  row count available once the schema steps are applied")
+                continue
+            started = time.monotonic()
+            rows = backfill.run(conn, migration.version, chunk_rows, pause_seconds)
+            log(f"Backfill {migration.version} {backfill.name}: {rows:,} rows in {time.monotonic() - started:.1f}s")
+        if migration.backfills and not dry_run:
+            conn.execute("UPDATE schema_migrations SET status = 'applied' WHERE version = ?", (migration.version,))
+    return [] if dry_run else [migration.version for migration in pending]
+
+def rollback(conn: sqlite3.Connection, target: int, dry_run: bool = False, migrations: list = None,
+             log=logger.info):
+    """Runs the down steps of every applied migration above `target`, newest first. Returns the versions reverted."""
+    applied = applied_versions(conn)
+    to_revert = [m for m in reversed(migrations or MIGRATIONS) if m.version > target and m.version in applied]
+    irreversible = [m for m in to_revert if m.down is None]
+    if irreversible:
+        raise MigrationError(f"Migration {irreversible[0].version} {irreversible[0].name} cannot be rolled back")
+    done = []
+    for migration in to_revert:
+        log(f"{'Would revert' if dry_run else 'Reverting'} {migration.version} {migration.name}")
+        if dry_run:
+            for step in migration.down:
+                log(f"  {_describe(step)}")
+            continue
+        _run_steps(conn, migration.down, "DELETE FROM schema_migrations WHERE version = ?", (migration.version,))
+        conn.execute("DELETE FROM migration_backfills WHERE version = ?", (migration.version,))
+        done.append(migration.version)
+    return done
+
+def migration_status(conn: sqlite3.Connection, migrations: list = None):
+    """[{version, name, status, applied_at}] for every known migration; status is "pending" if not applied."""
+    rows = {row[0]: row for row in conn.execute("SELECT version, name, status, applied_at FROM schema_migrations")}
+    return [{
+        "version": m.version,
+        "name": m.name,
+        "status": rows[m.version][2] if m.version in rows else "pending",
+        "applied_at": rows[m.version][3] if m.version in rows else None,
+    } for m in (migrations or MIGRATIONS)]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, Text, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -10,6 +10,8 @@ class Project(Base):
     jira_project_key = Column(String(100), unique=True, nullable=True)
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
+    # Maintained by triggers, see app/counters.py
+    epic_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -18,15 +20,23 @@ class Project(Base):
 
 class Epic(Base):
     __tablename__ = "epics"
+    # AUTOINCREMENT so ids of deleted and archived rows are never handed out again (app/archive.py restores them)
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
     jira_epic_key = Column(String(100), unique=True, nullable=True)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
-    target_launch_date = Column(Date, nullable=True)
+    target_launch_date = Column(Date, nullable=True, index=True)
     actual_launch_date = Column(Date, nullable=True)
     status = Column(String(50), nullable=False, default="Planned")
+    # Child issue rollup from Jira; NULL for epics that were never synced
+    child_issues_done = Column(Integer, nullable=True)
+    child_issues_total = Column(Integer, nullable=True)
+    # Maintained by triggers, see app/counters.py; open counts Open and Mitigating risks
+    risk_count = Column(Integer, nullable=False, default=0, server_default="0")
+    open_risk_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -36,13 +46,16 @@ class Epic(Base):
 
 class Risk(Base):
     __tablename__ = "risks"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
-    epic_id = Column(Integer, ForeignKey("epics.id", ondelete="CASCADE"), nullable=False)
+    epic_id = Column(Integer, ForeignKey("epics.id", ondelete="CASCADE"), nullable=False, index=True)
     description = Column(Text, nullable=False)
     mitigation_plan = Column(Text, nullable=True)
     date_added = Column(Date, nullable=False, server_default=func.current_date())
-    status = Column(String(50), nullable=False, default="Open")
+    status = Column(String(50), nullable=False, default="Open", index=True)
+    # created_at of the latest risk update, NULL if there is none; maintained by triggers, see app/counters.py
+    last_update_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -50,8 +63,30 @@ class Risk(Base):
     epic = relationship("Epic", back_populates="risks")
     updates = relationship("RiskUpdate", back_populates="risk", cascade="all, delete-orphan")
 
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Foreign keys are off in SQLite, so the epic deletes in crud.py clear this themselves
+    epic_id = Column(Integer, ForeignKey("epics.id", ondelete="SET NULL"), nullable=True, index=True)
+    kind = Column(String(50), nullable=False)
+    recipient = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    # The complete MIME message, exactly as it will be sent
+    body = Column(Text, nullable=False)
+    # pending -> sending -> sent, or back to pending for a retry, or dead once retries run out
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class RiskUpdate(Base):
     __tablename__ = "risk_updates"
+    # Serves loading a risk's updates and the MAX(created_at) the last_update_at triggers recompute on delete
+    __table_args__ = (Index("ix_risk_updates_risk_id_created_at", "risk_id", "created_at"), {"sqlite_autoincrement": True})
 
     id = Column(Integer, primary_key=True, index=True)
     risk_id = Column(Integer, ForeignKey("risks.id", ondelete="CASCADE"), nullable=False)
@@ -60,4 +95,148 @@ class RiskUpdate(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship
-    risk = relationship("Risk", back_populates="updates") 
\ No newline at end of file
+    risk = relationship("Risk", back_populates="updates")
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    # AUTOINCREMENT so cursors are never reused once old entries are compacted away
+    __table_args__ = (Index("ix_change_log_entity", "entity", "entity_id", "id"), {"sqlite_autoincrement": True})
+
+    # The cursor clients sync from
+    id = Column(Integer, primary_key=True)
+    # Table name of the changed row: projects, epics, risks or risk_updates
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # insert, update or delete
+    op = Column(String(10), nullable=False)
+    # Scope of the change, for clients that follow one project or epic
+    project_id = Column(Integer, nullable=True)
+    epic_id = Column(Integer, nullable=True)
+    # Not indexed: every tracked write pays for each index, and compaction can scan daily
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ChangeLogCompaction(Base):
+    __tablename__ = "change_log_compactions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    collapsed = Column(Integer, nullable=False, default=0)
+    tombstones_removed = Column(Integer, nullable=False, default=0)
+    # Cursors below this may have missed deletes and must resync from 0
+    horizon = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class EpicExposure(Base):
+    """Stored risk-exposure score of an epic, kept current by app/exposure.py."""
+    __tablename__ = "epic_exposure"
+
+    epic_id = Column(Integer, ForeignKey("epics.id", ondelete="CASCADE"), primary_key=True)
+    # 0-100, higher is more exposed
+    score = Column(Float, nullable=False, index=True)
+    # Inputs, for explaining a score
+    open_risks = Column(Integer, nullable=False, default=0)
+    mean_risk_age_days = Column(Float, nullable=True)
+    days_since_update = Column(Float, nullable=True)
+    days_to_launch = Column(Integer, nullable=True)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ExposureState(Base):
+    """Single row: how far the exposure scores have caught up with the change log."""
+    __tablename__ = "exposure_state"
+
+    id = Column(Integer, primary_key=True)
+    # Change log cursor the scores reflect
+    cursor = Column(Integer, nullable=False, default=0)
+    # Day the age and deadline inputs were computed for; all scores are recomputed when it changes
+    scored_on = Column(Date, nullable=True)
+
+class TrendSnapshotRun(Base):
+    """One row per day a trend snapshot was taken, so days where every count was zero still show up."""
+    __tablename__ = "trend_snapshot_runs"
+
+    day = Column(Date, primary_key=True)
+    rows = Column(Integer, nullable=False, default=0)
+    taken_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class TrendSnapshot(Base):
+    """Daily count of epics or risks per project and status. Append-only, see app/trends.py."""
+    __tablename__ = "trend_snapshots"
+    # Clustered on the query path: a range query for one project and status is one contiguous read
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    # epics or risks
+    entity = Column(String(10), primary_key=True)
+    # 0 is the whole portfolio, including epics without a project
+    project_id = Column(Integer, primary_key=True)
+    status = Column(String(50), primary_key=True)
+    day = Column(Date, primary_key=True)
+    # Zero counts are not stored
+    count = Column(Integer, nullable=False)
+
+class EpicTargetDate(Base):
+    """An epic's target launch date, recorded on the first snapshot and on every day it changed."""
+    __tablename__ = "epic_target_dates"
+    __table_args__ = (Index("ix_epic_target_dates_project_day", "project_id", "day"), {"sqlite_with_rowid": False})
+
+    epic_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    project_id = Column(Integer, nullable=True)
+    target_launch_date = Column(Date, nullable=True)
+
+# --- Archive: closed epics moved out of the live tables by app/archive.py ---
+# Same columns as the live tables, ids kept, so restoring puts rows back exactly. No
+# change log or counter triggers: the stored counts are as they were when archived.
+
+class ArchivedEpic(Base):
+    __tablename__ = "archived_epics"
+
+    id = Column(Integer, primary_key=True)
+    # No foreign key: the project may be deleted while its epics sit in the archive
+    project_id = Column(Integer, nullable=True, index=True)
+    jira_epic_key = Column(String(100), nullable=True, index=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    target_launch_date = Column(Date, nullable=True)
+    actual_launch_date = Column(Date, nullable=True)
+    status = Column(String(50), nullable=False)
+    child_issues_done = Column(Integer, nullable=True)
+    child_issues_total = Column(Integer, nullable=True)
+    risk_count = Column(Integer, nullable=False, default=0)
+    open_risk_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    project = relationship("Project", primaryjoin="foreign(ArchivedEpic.project_id) == Project.id", viewonly=True)
+    risks = relationship("ArchivedRisk", back_populates="epic")
+
+    # Lets API responses tell archived rows apart
+    archived = True
+
+class ArchivedRisk(Base):
+    __tablename__ = "archived_risks"
+
+    id = Column(Integer, primary_key=True)
+    epic_id = Column(Integer, ForeignKey("archived_epics.id"), nullable=False, index=True)
+    description = Column(Text, nullable=False)
+    mitigation_plan = Column(Text, nullable=True)
+    date_added = Column(Date, nullable=False)
+    status = Column(String(50), nullable=False)
+    last_update_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+
+    epic = relationship("ArchivedEpic", back_populates="risks")
+    updates = relationship("ArchivedRiskUpdate", back_populates="risk")
+
+    archived = True
+
+class ArchivedRiskUpdate(Base):
+    __tablename__ = "archived_risk_updates"
+
+    id = Column(Integer, primary_key=True)
+    risk_id = Column(Integer, ForeignKey("archived_risks.id"), nullable=False, index=True)
+    update_text = Column(Text, nullable=False)
+    date_added = Column(Date, nullable=False)
+    created_at = Column(DateTime(timezone=True))
+
+    risk = relationship("ArchivedRisk", back_populates="updates")
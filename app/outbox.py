@@ -0,0 +1,179 @@
+import asyncio
+import email
+import logging
+import os
+import random
+from datetime import datetime, timedelta, timezone
+import aiosmtplib
+from sqlalchemy.orm import Session
+from . import crud, email_service, models
+from .database import SessionLocal
+
+# Messages claimed and sent per drain pass
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+# Delivery attempts before a message is marked dead
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# How often the drainer looks for due retries when nothing new is queued
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "15"))
+# Delay before the first retry; doubles per attempt up to the maximum
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "30"))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "3600"))
+
+DATE_CHANGE_REQUEST = "date_change_request"
+
+logger = logging.getLogger(__name__)
+
+def enqueue_date_change_request(db: Session, epic: models.Epic, reason: str, proposed_date: str = None):
+    """
+    Builds the date change request email and stores it in the outbox in the same
+    session that loaded the epic. Raises EmailConfigurationError when mail is not set up.
+    """
+    settings = email_service.get_email_settings()
+    settings.validate()
+    message = email_service.build_date_change_message(epic, reason, proposed_date, settings)
+    return crud.create_outbox_message(db, kind=DATE_CHANGE_REQUEST, message=message, epic_id=epic.id)
+
+def _is_permanent(error: Exception):
+    """A 5xx reply (unknown recipient, refused sender, failed login) will not succeed on retry."""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, aiosmtplib.SMTPResponseException) and error.code >= 500
+
+class OutboxDrainer:
+    """
+    Delivers queued outbox messages in the background.
+
+    Each pass claims a batch of due messages (marking them 'sending' and counting
+    the attempt), sends them concurrently over the shared pooled SMTP transport and
+    records every outcome in one transaction. Failed messages go back to 'pending'
+    with exponential backoff; permanent rejections and messages out of attempts
+    become 'dead'. Delivery is at-least-once: messages left in 'sending' by a crash
+    are requeued on start.
+    """
+
+    def __init__(self, session_factory=SessionLocal, transport_factory=email_service.get_mail_transport,
+                 batch_size: int = OUTBOX_BATCH_SIZE, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 poll_seconds: float = OUTBOX_POLL_SECONDS, retry_base_seconds: float = OUTBOX_RETRY_BASE_SECONDS,
+                 retry_max_seconds: float = OUTBOX_RETRY_MAX_SECONDS):
+        self._session_factory = session_factory
+        self._transport_factory = transport_factory
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+        self.sent_total = 0
+        self.retried_total = 0
+        self.dead_total = 0
+
+    def start(self):
+        """Starts the drain loop on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+
+    def notify(self):
+        """Wakes the drain loop so a newly queued message goes out right away. Safe from any thread."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def drain_once(self):
+        """Sends one batch of due messages. Returns the number of messages claimed."""
+        claimed = await asyncio.to_thread(self._claim)
+        if not claimed:
+            return 0
+        transport = self._transport_factory()
+        errors = await asyncio.gather(*(self._send(transport, body) for _, body, _ in claimed))
+
+        sent_ids, retries, dead = [], {}, {}
+        now = datetime.now(timezone.utc)
+        for (message_id, _, attempts), error in zip(claimed, errors):
+            if error is None:
+                sent_ids.append(message_id)
+            elif _is_permanent(error) or attempts >= self.max_attempts:
+                logger.error(f"Giving up on outbox message {message_id} after {attempts} attempt(s): {error}")
+                dead[message_id] = str(error)
+            else:
+                delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+                delay = random.uniform(delay / 2, delay)
+                logger.warning(f"Outbox message {message_id} failed ({error}), retrying in {delay:.0f}s")
+                retries[message_id] = (str(error), now + timedelta(seconds=delay))
+
+        await asyncio.to_thread(self._record, sent_ids, retries, dead)
+        self.sent_total += len(sent_ids)
+        self.retried_total += len(retries)
+        self.dead_total += len(dead)
+        return len(claimed)
+
+    def metrics(self):
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "sent_total": self.sent_total,
+            "retried_total": self.retried_total,
+            "dead_total": self.dead_total,
+        }
+
+    async def _run(self):
+        requeued = await asyncio.to_thread(self._requeue_stuck)
+        if requeued:
+            logger.info(f"Requeued {requeued} outbox message(s) interrupted by a restart.")
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Error draining the email outbox: {e}", exc_info=True)
+                claimed = 0
+            if claimed >= self.batch_size:
+                # A full batch: there may be more waiting
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send(self, transport, body: str):
+        try:
+            # One attempt per claim: the outbox's own backoff is the only retry loop
+            await transport.send(email.message_from_string(body), max_retries=0)
+        except Exception as e:
+            return e
+        return None
+
+    def _claim(self):
+        db = self._session_factory()
+        try:
+            return crud.claim_outbox_batch(db, self.batch_size)
+        finally:
+            db.close()
+
+    def _record(self, sent_ids, retries, dead):
+        db = self._session_factory()
+        try:
+            crud.record_outbox_results(db, sent_ids, retries, dead)
+        finally:
+            db.close()
+
+    def _requeue_stuck(self):
+        db = self._session_factory()
+        try:
+            return crud.requeue_stuck_outbox_messages(db)
+        finally:
+            db.close()
+
+# Process-wide outbox drainer, started with the application
+outbox_drainer = OutboxDrainer()
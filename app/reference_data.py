@@ -0,0 +1,45 @@
+import threading
+from collections import namedtuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import models
+
+# What the project dropdowns need; plain tuples, so they outlive the session that loaded them
+ProjectChoice = namedtuple("ProjectChoice", ["id", "name"])
+
+class ProjectChoicesCache:
+    """
+    Every project's id and name, for dropdowns. Each read costs one indexed lookup of the
+    latest projects entry in the change log; the list is reloaded only when that moved.
+    The change log records writes from every path and process (the API, Jira sync, the
+    importers), so none of them has to remember to invalidate the cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._choices = []
+
+    def _current_version(self, db: Session):
+        ChangeLog = models.ChangeLog
+        return db.query(func.max(ChangeLog.id)).filter(ChangeLog.entity == "projects").scalar() or 0
+
+    def get(self, db: Session):
+        version = self._current_version(db)
+        with self._lock:
+            if version == self._version:
+                return self._choices
+        # Read after the version, so the rows are at least that new
+        choices = [ProjectChoice(*row) for row in db.query(models.Project.id, models.Project.name).order_by(models.Project.id)]
+        with self._lock:
+            self._version = version
+            self._choices = choices
+        return choices
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._choices = []
+
+# Process-wide cache used by the HTML routes
+project_choices = ProjectChoicesCache()
@@ -1,20 +1,38 @@
+import asyncio
 import logging
+import os
+from datetime import date, datetime, timedelta, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
 from sqlalchemy.orm import Session
-from . import crud, jira_service
-from .database import SessionLocal
+from . import archive, backup, changes, crud, email_service, exposure, incremental_backup, jira_service, jobs, maintenance, trends
+from .database import SessionLocal, SQLALCHEMY_DATABASE_URL
 
 # Configure logging
 logging.basicConfig()
 logging.getLogger('apscheduler').setLevel(logging.INFO)
 
+# Once Jira pushes changes through the webhook, polling is only a safety net for missed events
+JIRA_WEBHOOKS_ENABLED = bool(os.getenv("JIRA_WEBHOOK_SECRET"))
+# An empty value counts as unset
+JIRA_SYNC_INTERVAL_HOURS = float(os.getenv("JIRA_SYNC_INTERVAL_HOURS") or ("24" if JIRA_WEBHOOKS_ENABLED else "1"))
+
+# Daily digest of upcoming deadlines and stale risks, sent at this hour (server time); -1 disables it
+DIGEST_HOUR = int(os.getenv("DIGEST_HOUR", "8"))
+DIGEST_DEADLINE_DAYS = int(os.getenv("DIGEST_DEADLINE_DAYS", "14"))
+DIGEST_STALE_RISK_DAYS = int(os.getenv("DIGEST_STALE_RISK_DAYS", "14"))
+# Rows per digest section, so the queries and the mail stay bounded on large portfolios
+DIGEST_MAX_ITEMS = int(os.getenv("DIGEST_MAX_ITEMS", "200"))
+# Per-project recipients, e.g. "PLAT=alice@example.com,bob@example.com;Mobile=carol@example.com".
+# Projects are matched by Jira key or name; everything else goes to MANAGER_EMAIL.
+DIGEST_RECIPIENTS = os.getenv("DIGEST_RECIPIENTS", "")
+
 def sync_all_jira_projects():
     """
     A background job that finds all projects linked to Jira and updates them.
     """
     db: Session = SessionLocal()
     try:
-        logging.info("--- Starting hourly Jira sync for all linked projects ---")
+        logging.info("--- Starting Jira sync for all linked projects ---")
         
         # Get all projects from the database
         all_projects = crud.get_projects(db, limit=1000) # Assuming max 1000 projects
@@ -31,23 +49,116 @@ def sync_all_jira_projects():
         for project in jira_projects:
             try:
                 logging.info(f"Syncing project: '{project.name}' (Key: {project.jira_project_key})...")
-                result = jira_service.import_epics_from_jira(db, project.jira_project_key)
+                # Goes through the job manager so a manual import of the same project is joined, not repeated
+                job, _ = jobs.submit_jira_import(project.jira_project_key)
+                result = job.wait()
                 logging.info(
                     f"Sync for '{project.name}' complete. "
                     f"Found: {result['total_found']}, "
                     f"Imported: {result['imported']}, "
-                    f"Updated: {result['updated']}."
+                    f"Updated: {result['updated']}, "
+                    f"Unchanged: {result['unchanged']}."
                 )
+            except jira_service.JiraCircuitOpenError as e:
+                # Jira is down or keeps throttling us; the remaining projects would fail the same way
+                logging.error(f"Stopping Jira sync early: {e}")
+                break
             except Exception as e:
                 logging.error(f"Failed to sync project '{project.name}': {e}", exc_info=True)
-                
-        logging.info("--- Hourly Jira sync finished ---")
+
+        for metrics in jira_service.get_jira_metrics():
+            logging.info(f"Jira request metrics: {metrics}")
+        logging.info("--- Jira sync finished ---")
 
     finally:
         db.close()
 
+def parse_digest_recipients(value: str):
+    """Parses DIGEST_RECIPIENTS into a {project key or name: [emails]} dict."""
+    recipients = {}
+    for entry in value.split(";"):
+        project, _, emails = entry.partition("=")
+        emails = [address.strip() for address in emails.split(",") if address.strip()]
+        if project.strip() and emails:
+            recipients[project.strip()] = emails
+    return recipients
+
+def group_digest_by_recipient(deadlines: list, stale_risks: list, recipients: dict, default_recipient: str):
+    """Returns {recipient: (deadlines, stale_risks)}, routing each row by its project."""
+    grouped = {}
+    for section, rows in enumerate((deadlines, stale_risks)):
+        for row in rows:
+            addresses = recipients.get(row.jira_project_key) or recipients.get(row.project_name) or [default_recipient]
+            for address in addresses:
+                grouped.setdefault(address, ([], []))[section].append(row)
+    return grouped
+
+def send_digest(today: date = None):
+    """
+    A background job that mails each recipient their upcoming deadlines and stale risks.
+    The candidates come from two aggregate queries; all mail goes out over one SMTP session.
+    """
+    settings = email_service.get_email_settings()
+    try:
+        settings.validate()
+    except email_service.EmailConfigurationError as e:
+        logging.warning(f"Skipping digest: {e}")
+        return None
+
+    today = today or date.today()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=DIGEST_STALE_RISK_DAYS)
+    db: Session = SessionLocal()
+    try:
+        deadlines = crud.get_upcoming_deadlines(
+            db, today, today + timedelta(days=DIGEST_DEADLINE_DAYS), limit=DIGEST_MAX_ITEMS
+        )
+        stale_risks = crud.get_stale_risks(db, cutoff, limit=DIGEST_MAX_ITEMS)
+    finally:
+        db.close()
+
+    grouped = group_digest_by_recipient(
+        deadlines, stale_risks, parse_digest_recipients(DIGEST_RECIPIENTS), settings.manager_email
+    )
+    messages = [
+        email_service.build_digest_message(
+            recipient, recipient_deadlines, recipient_risks, DIGEST_DEADLINE_DAYS, DIGEST_STALE_RISK_DAYS, settings
+        )
+        for recipient, (recipient_deadlines, recipient_risks) in grouped.items()
+    ]
+    failures = asyncio.run(email_service.send_messages_over_one_session(messages, settings)) if messages else []
+    summary = {
+        "recipients": len(messages),
+        "failed": len(failures),
+        "deadlines": len(deadlines),
+        "stale_risks": len(stale_risks),
+    }
+    logging.info(f"Digest sent: {summary}")
+    return summary
+
 # Initialize the scheduler
 scheduler = BackgroundScheduler(daemon=True)
 
-# Add the job to the scheduler to run every hour
-scheduler.add_job(sync_all_jira_projects, 'interval', hours=1) 
\ No newline at end of file
+# Add the job to the scheduler: hourly polling, or a daily reconciliation when webhooks are enabled
+scheduler.add_job(sync_all_jira_projects, 'interval', hours=JIRA_SYNC_INTERVAL_HOURS)
+if DIGEST_HOUR >= 0:
+    scheduler.add_job(send_digest, 'cron', hour=DIGEST_HOUR)
+# Online backups of the SQLite database (full copies, or page deltas), with retention pruning
+if backup.BACKUP_INTERVAL_HOURS > 0 and SQLALCHEMY_DATABASE_URL.startswith("sqlite:///"):
+    backup_job = (incremental_backup.run_scheduled_backup if incremental_backup.BACKUP_INCREMENTAL
+                  else backup.run_scheduled_backup)
+    scheduler.add_job(backup_job, 'interval', hours=backup.BACKUP_INTERVAL_HOURS)
+# Keeps the change feed's log proportional to live rows plus recent history
+if changes.CHANGE_LOG_COMPACT_INTERVAL_HOURS > 0:
+    scheduler.add_job(changes.run_scheduled_compaction, 'interval', hours=changes.CHANGE_LOG_COMPACT_INTERVAL_HOURS)
+# Keeps exposure scores current (and rescores everything after midnight) off the request path
+if exposure.EXPOSURE_REFRESH_MINUTES > 0:
+    scheduler.add_job(exposure.run_scheduled_refresh, 'interval', minutes=exposure.EXPOSURE_REFRESH_MINUTES)
+# Daily counts and target date changes behind /api/trends
+if trends.TREND_SNAPSHOT_HOUR >= 0:
+    scheduler.add_job(trends.run_scheduled_snapshot, 'cron', hour=trends.TREND_SNAPSHOT_HOUR, minute=55)
+# Moves long-closed epics, with their risks and updates, to the archive tables
+if archive.ARCHIVE_AFTER_MONTHS > 0:
+    scheduler.add_job(archive.run_scheduled_archive, 'cron', hour=archive.ARCHIVE_HOUR, minute=30)
+# quick_check, fresh planner statistics and a bounded incremental vacuum, after the archiving run
+if maintenance.MAINTENANCE_HOUR >= 0 and SQLALCHEMY_DATABASE_URL.startswith("sqlite:///"):
+    scheduler.add_job(maintenance.run_scheduled_maintenance, 'cron', hour=maintenance.MAINTENANCE_HOUR, minute=15)
@@ -43,10 +43,27 @@ class Risk(BaseModel):
     mitigation_plan: Optional[str] = None
     date_added: date
     status: str
+    last_update_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
+    # True for rows read from the archive tables (?archived=true)
+    archived: bool = False
     updates: List[RiskUpdateResponse] = []
 
+class RiskSummary(BaseModel):
+    """A Risk without its updates, for lists."""
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    epic_id: int
+    description: str
+    mitigation_plan: Optional[str] = None
+    date_added: date
+    status: str
+    last_update_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+    archived: bool = False
+
 class Epic(BaseModel):
     """The full response for an Epic, including its project and risks."""
     model_config = ConfigDict(from_attributes=True)
@@ -58,8 +75,15 @@ class Epic(BaseModel):
     status: str
     project_id: Optional[int] = None
     jira_epic_key: Optional[str] = None
+    child_issues_done: Optional[int] = None
+    child_issues_total: Optional[int] = None
+    risk_count: int = 0
+    open_risk_count: int = 0
     created_at: datetime
     updated_at: datetime
+    # Set when listing with sort=exposure
+    exposure_score: Optional[float] = None
+    archived: bool = False
     project: Optional[ProjectForEpic] = None # Non-recursive project info
     risks: List[Risk] = []
 
@@ -70,10 +94,67 @@ class Project(BaseModel):
     name: str
     description: Optional[str] = None
     jira_project_key: Optional[str] = None
+    epic_count: int = 0
     created_at: datetime
     updated_at: datetime
     epics: List[EpicForProject] = [] # Non-recursive epic info
 
+class OutboxMessage(BaseModel):
+    """Delivery state of a queued email (the message body is not exposed)."""
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    epic_id: Optional[int] = None
+    kind: str
+    recipient: str
+    subject: str
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None
+    sent_at: Optional[datetime] = None
+    created_at: datetime
+
+class ChangeEntry(BaseModel):
+    """One insert, update or delete from the change feed, with the row's current state."""
+    cursor: int
+    entity: str
+    entity_id: int
+    op: str
+    project_id: Optional[int] = None
+    epic_id: Optional[int] = None
+    changed_at: datetime
+    data: Optional[dict] = None # None once the row is deleted
+
+class ChangeFeed(BaseModel):
+    """A page of the change feed; pass next_cursor as `since` to fetch the next one."""
+    changes: List[ChangeEntry]
+    next_cursor: int
+    has_more: bool
+
+class TrendPoint(BaseModel):
+    # Start of the day, week or month
+    date: date
+    # Day of the snapshot the count comes from
+    as_of: date
+    count: int
+
+class Trend(BaseModel):
+    """Daily, weekly or monthly counts of epics or risks, for one project or the portfolio (project_id 0)."""
+    entity: str
+    project_id: int
+    statuses: Optional[List[str]] = None
+    interval: str
+    points: List[TrendPoint]
+
+class TargetDateChange(BaseModel):
+    epic_id: int
+    project_id: Optional[int] = None
+    day: date
+    previous_date: Optional[date] = None
+    target_launch_date: Optional[date] = None
+    # Positive when the launch moved later
+    slip_days: Optional[int] = None
+
 # --- Schemas for Creating New Items ---
 
 class ProjectCreate(BaseModel):
@@ -117,4 +198,12 @@ class EpicUpdate(BaseModel):
 class RiskUpdate(BaseModel):
     description: Optional[str] = None
     mitigation_plan: Optional[str] = None
-    status: Optional[str] = None 
\ No newline at end of file
+    status: Optional[str] = None
+
+# --- Internal Schemas (never accepted from API clients) ---
+
+class JiraEpicUpsert(EpicUpdate):
+    """An epic as Jira sync and webhooks write it, including the Jira-owned child issue rollup."""
+    jira_epic_key: str
+    child_issues_done: Optional[int] = None
+    child_issues_total: Optional[int] = None
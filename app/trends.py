@@ -0,0 +1,135 @@
+import logging
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import Date, func, insert, select
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal
+
+# Hour (server time) of the daily snapshot, taken at :55 so it records end-of-day state; -1 disables it
+TREND_SNAPSHOT_HOUR = int(os.getenv("TREND_SNAPSHOT_HOUR", "23"))
+
+logger = logging.getLogger(__name__)
+
+# project_id of the whole-portfolio rows
+PORTFOLIO = 0
+
+def take_snapshot(db: Session, day: date = None):
+    """
+    Records the day's epic and risk counts per project and status, plus the target dates
+    that changed since the last snapshot. Append-only: a day that already has a snapshot
+    is left as it is. Returns {"day", "rows", "date_changes"}, or None when already taken.
+    """
+    day = day or date.today()
+    if db.get(models.TrendSnapshotRun, day) is not None:
+        return None
+    Epic, Risk = models.Epic, models.Risk
+    counts = {
+        "epics": db.query(Epic.project_id, Epic.status, func.count()).group_by(Epic.project_id, Epic.status).all(),
+        "risks": db.query(Epic.project_id, Risk.status, func.count())
+                   .join(Epic, Risk.epic_id == Epic.id).group_by(Epic.project_id, Risk.status).all(),
+    }
+    rows = []
+    for entity, entity_counts in counts.items():
+        totals = defaultdict(int)
+        for project_id, status, count in entity_counts:
+            totals[status] += count
+            if project_id is not None:
+                rows.append({"entity": entity, "project_id": project_id, "status": status, "day": day, "count": count})
+        rows.extend({"entity": entity, "project_id": PORTFOLIO, "status": status, "day": day, "count": count}
+                    for status, count in totals.items())
+
+    # SQLite returns the other columns from the row holding the MAX
+    History = models.EpicTargetDate
+    recorded = {epic_id: target for epic_id, target, _ in db.execute(
+        select(History.epic_id, History.target_launch_date, func.max(History.day)).group_by(History.epic_id)
+    )}
+    changed = [
+        {"epic_id": epic_id, "day": day, "project_id": project_id, "target_launch_date": target}
+        for epic_id, project_id, target in db.query(Epic.id, Epic.project_id, Epic.target_launch_date)
+        if epic_id not in recorded or recorded[epic_id] != target
+    ]
+    try:
+        if rows:
+            db.execute(insert(models.TrendSnapshot), rows)
+        if changed:
+            db.execute(insert(History), changed)
+        db.add(models.TrendSnapshotRun(day=day, rows=len(rows)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"day": day, "rows": len(rows), "date_changes": len(changed)}
+
+def _bucket(day: date, interval: str):
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+def get_trend(db: Session, entity: str, statuses: list = None, project_id: int = PORTFOLIO, start: date = None,
+              end: date = None, interval: str = "day"):
+    """
+    Counts of `entity` in the given statuses (all when None) for one project or the whole
+    portfolio, one point per day, week (from Monday) or month. Counts are levels, so a
+    week or month reports its last snapshot, not a sum. Days without a snapshot are absent.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=90)
+    Snapshot, Run = models.TrendSnapshot, models.TrendSnapshotRun
+    days = [row[0] for row in db.query(Run.day).filter(Run.day.between(start, end)).order_by(Run.day)]
+    query = db.query(Snapshot.day, func.sum(Snapshot.count)).filter(
+        Snapshot.entity == entity, Snapshot.project_id == project_id, Snapshot.day.between(start, end),
+    )
+    if statuses:
+        query = query.filter(Snapshot.status.in_(statuses))
+    counts = dict(query.group_by(Snapshot.day).all())
+    points = {}
+    for day in days:
+        # Later days overwrite earlier ones, leaving each bucket's last snapshot
+        points[_bucket(day, interval)] = (day, counts.get(day, 0))
+    return [{"date": bucket, "as_of": day, "count": count} for bucket, (day, count) in points.items()]
+
+def get_date_changes(db: Session, project_id: int = None, epic_id: int = None, start: date = None,
+                     end: date = None, limit: int = 1000):
+    """Target date changes recorded between start and end, oldest first, with the date each replaced."""
+    end = end or date.today()
+    start = start or end - timedelta(days=90)
+    History = models.EpicTargetDate
+    history = select(
+        History.epic_id, History.project_id, History.day, History.target_launch_date,
+        func.lag(History.target_launch_date, type_=Date)
+            .over(partition_by=History.epic_id, order_by=History.day).label("previous_date"),
+        func.lag(History.day, type_=Date).over(partition_by=History.epic_id, order_by=History.day).label("previous_day"),
+    ).where(History.day <= end)
+    if epic_id is not None:
+        history = history.where(History.epic_id == epic_id)
+    if project_id is not None:
+        history = history.where(History.project_id == project_id)
+    history = history.subquery()
+    # The first row per epic is its baseline, not a change; the window sees rows before start so it has one
+    rows = db.execute(
+        select(history.c.epic_id, history.c.project_id, history.c.day, history.c.previous_date,
+               history.c.target_launch_date)
+        .where(history.c.previous_day.is_not(None), history.c.day >= start)
+        .order_by(history.c.day, history.c.epic_id)
+        .limit(limit)
+    ).mappings().all()
+    return [{
+        **row,
+        "slip_days": (row["target_launch_date"] - row["previous_date"]).days
+                     if row["target_launch_date"] and row["previous_date"] else None,
+    } for row in rows]
+
+def run_scheduled_snapshot():
+    """Scheduler entry point."""
+    db = SessionLocal()
+    try:
+        result = take_snapshot(db)
+        logger.info(f"Trend snapshot: {result or 'already taken today'}")
+    except Exception as e:
+        logger.error(f"Trend snapshot failed: {e}", exc_info=True)
+    finally:
+        db.close()
@@ -1,134 +1,222 @@
 #!/usr/bin/env python3
 """
 Database backup script for Risk Tracker
-Creates timestamped backups of the SQLite database
+Creates consistent, compressed, verified backups of the SQLite database,
+safe to run while the application is writing to it
 """
 
-import shutil
 import os
 from datetime import datetime
 
+from app import backup, incremental_backup
+
 def backup_database():
     """Create a timestamped backup of the database"""
-    
-    # Database file location
-    db_file = "risk_tracker.db"
-    
-    if not os.path.exists(db_file):
+    try:
+        db_path = backup.sqlite_path_from_url()
+    except backup.BackupError as e:
+        print(f"❌ {e}")
+        return False
+
+    if not os.path.exists(db_path):
         print("❌ Database file not found. Make sure the application has been run at least once.")
         return False
-    
-    # Create backups directory if it doesn't exist
-    backup_dir = "backups"
-    if not os.path.exists(backup_dir):
-        os.makedirs(backup_dir)
-        print(f"📁 Created backups directory: {backup_dir}")
-    
-    # Generate timestamp for backup filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_filename = f"risk_tracker_backup_{timestamp}.db"
-    backup_path = os.path.join(backup_dir, backup_filename)
-    
+
     try:
-        # Copy the database file
-        shutil.copy2(db_file, backup_path)
-        
-        # Get file size for confirmation
-        file_size = os.path.getsize(backup_path)
-        file_size_kb = round(file_size / 1024, 2)
-        
-        print(f"✅ Database backup created successfully!")
-        print(f"📄 Backup file: {backup_path}")
-        print(f"📊 File size: {file_size_kb} KB")
-        print(f"🕒 Created at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        return True
-        
-    except Exception as e:
+        result = backup.create_backup(db_path)
+    except backup.BackupError as e:
         print(f"❌ Error creating backup: {e}")
         return False
 
+    print(f"✅ Database backup created and verified successfully!")
+    print(f"📄 Backup file: {result['path']}")
+    print(f"📊 File size: {round(result['backup_bytes'] / 1024, 2)} KB "
+          f"(database {round(result['database_bytes'] / 1024, 2)} KB)")
+    print(f"⏱️  Took {result['seconds']}s")
+    print(f"🕒 Created at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    return True
+
 def list_backups():
     """List all existing backups"""
-    backup_dir = "backups"
-    
-    if not os.path.exists(backup_dir):
+    if not os.path.exists(backup.BACKUP_DIR):
         print("📁 No backups directory found.")
         return
-    
-    backups = [f for f in os.listdir(backup_dir) if f.endswith('.db')]
-    
+
+    backups = backup.list_backups()
+
     if not backups:
         print("📄 No backup files found.")
         return
-    
+
     print(f"\n📋 Found {len(backups)} backup files:")
     print("-" * 50)
-    
-    for backup in sorted(backups, reverse=True):
-        backup_path = os.path.join(backup_dir, backup)
-        file_size = os.path.getsize(backup_path)
-        file_size_kb = round(file_size / 1024, 2)
+
+    for backup_path in backups:
+        file_size_kb = round(os.path.getsize(backup_path) / 1024, 2)
         modified_time = datetime.fromtimestamp(os.path.getmtime(backup_path))
-        
-        print(f"📄 {backup}")
+
+        print(f"📄 {os.path.basename(backup_path)}")
         print(f"   Size: {file_size_kb} KB")
         print(f"   Date: {modified_time.strftime('%Y-%m-%d %H:%M:%S')}")
         print()
 
+def verify_backup(backup_filename):
+    """Check that a backup file restores to a consistent database"""
+    backup_path = os.path.join(backup.BACKUP_DIR, backup_filename)
+    if not os.path.exists(backup_path):
+        print(f"❌ Backup file not found: {backup_path}")
+        return False
+    try:
+        backup.verify_backup(backup_path)
+    except backup.BackupError as e:
+        print(f"❌ {e}")
+        return False
+    print(f"✅ Backup is intact: {backup_filename}")
+    return True
+
+def prune_backups():
+    """Delete scheduled backups outside the retention policy"""
+    deleted = backup.prune_backups()
+    for path in deleted:
+        print(f"🗑️  Deleted {os.path.basename(path)}")
+    print(f"✅ Pruned {len(deleted)} backup(s) "
+          f"(keeping the newest {backup.BACKUP_KEEP} and anything newer than {backup.BACKUP_MAX_AGE_DAYS:g} days)")
+    deleted = incremental_backup.prune_chains()
+    for path in deleted:
+        print(f"🗑️  Deleted {os.path.basename(path)}")
+    print(f"✅ Pruned {len(deleted)} incremental file(s) (keeping the newest {incremental_backup.BACKUP_KEEP_CHAINS} chains)")
+
+def incremental_backup_database():
+    """Back up only the pages changed since the last incremental backup"""
+    try:
+        entry = incremental_backup.create_incremental_backup()
+    except backup.BackupError as e:
+        print(f"❌ Error creating incremental backup: {e}")
+        return False
+
+    kind = "Full base" if entry['kind'] == "base" else "Delta"
+    print(f"✅ {kind} backup created successfully!")
+    print(f"📄 Backup file: {os.path.join(incremental_backup.INCREMENTAL_BACKUP_DIR, entry['file'])}")
+    print(f"📊 Pages written: {entry['pages_written']:,} of {entry['page_count']:,} "
+          f"({round(entry['bytes'] / 1024, 2)} KB)")
+    print(f"⏱️  Took {entry['seconds']}s")
+    return True
+
+def list_restore_points():
+    """List the points in time an incremental restore can go back to"""
+    points = incremental_backup.list_restore_points()
+    if not points:
+        print("📄 No incremental backups found.")
+        return
+
+    print(f"\n📋 Found {len(points)} restore points:")
+    print("-" * 50)
+    for point in points:
+        icon = "🧱" if point['kind'] == "base" else "➕"
+        print(f"{icon} {point['created_at']}  {point['kind']:<5}  "
+              f"{point['pages_written']:,} pages, {round(point['bytes'] / 1024, 2)} KB")
+
+def restore_at(timestamp):
+    """Restore the database as it was at a point in time, from a base backup plus deltas"""
+    try:
+        at = datetime.fromisoformat(timestamp)
+    except ValueError:
+        print(f"❌ Invalid timestamp: {timestamp} (use e.g. 2024-12-01T14:30:00)")
+        return False
+
+    response = input(f"⚠️  This will replace the current database with its state at {at}. Are you sure? (yes/no): ")
+    if response.lower() != 'yes':
+        print("🚫 Restore cancelled.")
+        return False
+
+    try:
+        db_path = backup.sqlite_path_from_url()
+        if os.path.exists(db_path):
+            current = backup.create_backup(db_path, prefix="risk_tracker_pre_restore")
+            print(f"📄 Current database backed up as: {os.path.basename(current['path'])}")
+
+        entry = incremental_backup.restore_at(at, db_path)
+        print(f"✅ Database restored to the backup taken at {entry['created_at']}")
+        return True
+
+    except backup.BackupError as e:
+        print(f"❌ Error restoring backup: {e}")
+        return False
+
 def restore_backup(backup_filename):
     """Restore from a backup file"""
-    backup_path = os.path.join("backups", backup_filename)
-    
+    backup_path = os.path.join(backup.BACKUP_DIR, backup_filename)
+
     if not os.path.exists(backup_path):
         print(f"❌ Backup file not found: {backup_path}")
         return False
-    
+
     # Confirm with user
     response = input(f"⚠️  This will replace the current database. Are you sure? (yes/no): ")
     if response.lower() != 'yes':
         print("🚫 Restore cancelled.")
         return False
-    
+
     try:
         # Backup current database first
-        if os.path.exists("risk_tracker.db"):
-            current_backup = f"risk_tracker_pre_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-            shutil.copy2("risk_tracker.db", os.path.join("backups", current_backup))
-            print(f"📄 Current database backed up as: {current_backup}")
-        
+        db_path = backup.sqlite_path_from_url()
+        if os.path.exists(db_path):
+            current = backup.create_backup(db_path, prefix="risk_tracker_pre_restore")
+            print(f"📄 Current database backed up as: {os.path.basename(current['path'])}")
+
         # Restore from backup
-        shutil.copy2(backup_path, "risk_tracker.db")
+        backup.restore_backup(backup_path, db_path)
         print(f"✅ Database restored from: {backup_filename}")
         return True
-        
-    except Exception as e:
+
+    except backup.BackupError as e:
         print(f"❌ Error restoring backup: {e}")
         return False
 
 if __name__ == "__main__":
     import sys
-    
+
     if len(sys.argv) == 1:
         # Default action: create backup
         print("🔄 Creating database backup...")
-        backup_database()
-        
+        sys.exit(0 if backup_database() else 1)
+
+    elif sys.argv[1] == "incremental":
+        sys.exit(0 if incremental_backup_database() else 1)
+
     elif sys.argv[1] == "list":
         list_backups()
-        
+
+    elif sys.argv[1] == "points":
+        list_restore_points()
+
+    elif sys.argv[1] == "verify" and len(sys.argv) == 3:
+        sys.exit(0 if verify_backup(sys.argv[2]) else 1)
+
+    elif sys.argv[1] == "prune":
+        prune_backups()
+
+    elif sys.argv[1] == "restore" and len(sys.argv) == 4 and sys.argv[2] == "--at":
+        restore_at(sys.argv[3])
+
     elif sys.argv[1] == "restore" and len(sys.argv) == 3:
         restore_backup(sys.argv[2])
-        
+
     else:
         print("🚀 Risk Tracker Database Backup Tool")
         print("=" * 40)
         print("Usage:")
         print("  python backup_database.py           # Create backup")
         print("  python backup_database.py list      # List all backups")
+        print("  python backup_database.py verify <filename>   # Check a backup's integrity")
+        print("  python backup_database.py prune     # Apply the retention policy")
         print("  python backup_database.py restore <filename>  # Restore from backup")
+        print("  python backup_database.py incremental       # Back up changed pages only")
+        print("  python backup_database.py points            # List incremental restore points")
+        print("  python backup_database.py restore --at <timestamp>  # Point-in-time restore")
         print()
         print("Examples:")
         print("  python backup_database.py")
         print("  python backup_database.py list")
-        print("  python backup_database.py restore risk_tracker_backup_20241201_143022.db") 
\ No newline at end of file
+        print("  python backup_database.py restore risk_tracker_backup_20241201_143022.db.gz")
+        print("  python backup_database.py restore --at 2024-12-01T14:30:00")
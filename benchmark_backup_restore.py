@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Backup benchmark for Risk Tracker
+Compares full-copy backups with incremental page-delta backups on a generated
+database: storage written per run, backup time, and restore time
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark full vs incremental backups and restores")
+    parser.add_argument("--epics", type=int, default=100000, help="Epics in the generated database")
+    parser.add_argument("--risks", type=int, default=2, help="Risks per epic")
+    parser.add_argument("--runs", type=int, default=10, help="Backups taken after the first one")
+    parser.add_argument("--change", type=float, default=0.01, help="Fraction of epics updated between backups")
+    parser.add_argument("--workdir", help="Directory to use (default: a temporary directory)")
+    return parser.parse_args()
+
+def generate_database(path, epics, risks_per_epic):
+    """Create the app schema and fill it with synthetic epics and risks"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from app import models
+    from app.database import engine
+    models.Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO projects (name) VALUES ('Benchmark')")
+    conn.executemany(
+        "INSERT INTO epics (project_id, title, description, status, target_launch_date) VALUES (1, ?, ?, 'Planned', ?)",
+        ((f"Epic {n}", "x" * 300, f"2030-{n % 12 + 1:02d}-15") for n in range(epics)),
+    )
+    conn.executemany(
+        "INSERT INTO risks (epic_id, description, status, date_added) VALUES (?, ?, 'Open', '2030-01-01')",
+        ((n // risks_per_epic + 1, "y" * 200) for n in range(epics * risks_per_epic)),
+    )
+    conn.commit()
+    conn.close()
+
+def change_epics(path, epics, fraction, run):
+    conn = sqlite3.connect(path)
+    ids = random.sample(range(1, epics + 1), max(1, int(epics * fraction)))
+    conn.executemany("UPDATE epics SET status = ?, description = ? WHERE id = ?",
+                     ((f"Run {run}", "z" * 300, epic_id) for epic_id in ids))
+    conn.commit()
+    conn.close()
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def main():
+    args = parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="backup_bench_")
+    database = os.path.join(workdir, "risk_tracker.db")
+    full_dir = os.path.join(workdir, "full")
+    chain_dir = os.path.join(workdir, "incremental")
+
+    print("🚀 Risk Tracker Backup Benchmark")
+    print("=" * 40)
+    print(f"📦 Generating {args.epics:,} epics x {args.risks} risks in {database}...")
+    generate_database(database, args.epics, args.risks)
+    print(f"🗄️  Database size: {os.path.getsize(database) / 1024 / 1024:.1f} MB")
+
+    from app import backup, incremental_backup
+
+    full_bytes = incremental_bytes = 0
+    full_seconds = incremental_seconds = 0.0
+    start = datetime(2030, 1, 1)
+    for run in range(args.runs + 1):
+        if run:
+            change_epics(database, args.epics, args.change, run)
+        full, seconds = timed(backup.create_backup, database, full_dir, prefix=f"run_{run:03d}")
+        full_bytes += full["backup_bytes"]
+        full_seconds += seconds
+        entry, seconds = timed(incremental_backup.create_incremental_backup, database, chain_dir,
+                               full_every=args.runs + 1, now=start + timedelta(hours=run))
+        incremental_bytes += entry["bytes"]
+        incremental_seconds += seconds
+        print(f"   Run {run:>3}: full {full['backup_bytes'] / 1024:>9,.0f} KB | "
+              f"{entry['kind']:<5} {entry['bytes'] / 1024:>9,.0f} KB ({entry['pages_written']:,} pages)")
+
+    print("\n♻️  Restoring the latest state...")
+    restored_full = os.path.join(workdir, "restored_full.db")
+    restored_pitr = os.path.join(workdir, "restored_pitr.db")
+    open(restored_full, "wb").close()
+    _, full_restore = timed(backup.restore_backup, full["path"], restored_full)
+    _, pitr_restore = timed(incremental_backup.reconstruct, start + timedelta(hours=args.runs), restored_pitr, chain_dir)
+    middle = start + timedelta(hours=args.runs // 2)
+    _, pitr_middle = timed(incremental_backup.reconstruct, middle, restored_pitr, chain_dir)
+
+    print("\n📊 Summary")
+    print("-" * 40)
+    print(f"Backups taken:           {args.runs + 1} ({args.change:.1%} of epics changed between runs)")
+    print(f"Full copies:             {full_bytes / 1024 / 1024:,.1f} MB written, {full_seconds:.2f}s")
+    print(f"Base + page deltas:      {incremental_bytes / 1024 / 1024:,.1f} MB written, {incremental_seconds:.2f}s")
+    print(f"Full-copy restore:       {full_restore:.2f}s")
+    print(f"PITR restore (latest):   {pitr_restore:.2f}s (base + {args.runs} deltas)")
+    print(f"PITR restore (midpoint): {pitr_middle:.2f}s (base + {args.runs // 2} deltas)")
+
+    if not args.workdir:
+        shutil.rmtree(workdir)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
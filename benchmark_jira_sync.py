@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Jira sync benchmark for Risk Tracker
+Runs sync_all_jira_projects against the offline Jira stand-in (fake_jira_server.py)
+and reports throughput for a full initial import and for an incremental re-sync
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from fake_jira_server import FakeJiraData, FakeJiraServer
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Jira sync against a local fake Jira")
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--epics", type=int, default=2000, help="Epics per project")
+    parser.add_argument("--children", type=int, default=0, help="Child issues per epic (progress rollup)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every Jira response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra random seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 500")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--rate-limit", type=float, default=100.0,
+                        help="JIRA_RATE_LIMIT_PER_SECOND for the client (the app default of 5 would dominate)")
+    parser.add_argument("--touch", type=float, default=0.05, help="Fraction of epics changed before the re-sync")
+    parser.add_argument("--database", help="SQLite file to use (default: a temporary file)")
+    return parser.parse_args()
+
+def run_pass(name, sync, count_epics, expected_epics):
+    """Run one full sync and print its throughput"""
+    print(f"\n🔄 {name}...")
+    started = time.perf_counter()
+    sync()
+    elapsed = time.perf_counter() - started
+    stored = count_epics()
+    print(f"   ⏱️  {elapsed:.2f}s  |  {expected_epics / elapsed:,.0f} epics/s  |  {stored:,} epics stored")
+    return elapsed
+
+def main():
+    args = parse_args()
+
+    print("🚀 Risk Tracker Jira Sync Benchmark")
+    print("=" * 40)
+    print(f"📦 Generating {args.projects} projects x {args.epics:,} epics x {args.children} child issues...")
+    fake = FakeJiraServer(
+        FakeJiraData(args.projects, args.epics, args.children), latency=args.latency, jitter=args.jitter,
+        throttle_rate=args.throttle_rate, error_rate=args.error_rate, retry_after=args.retry_after,
+    ).start()
+    print(f"🌐 Fake Jira at {fake.url}")
+
+    database = args.database or os.path.join(tempfile.mkdtemp(prefix="jira_bench_"), "risk_tracker.db")
+    # The app reads its configuration at import time, so set it before importing
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{database}",
+        "JIRA_SERVER": fake.url,
+        "JIRA_USERNAME": "bench@example.com",
+        "JIRA_API_TOKEN": "fake",
+        "JIRA_RATE_LIMIT_PER_SECOND": str(args.rate_limit),
+        "JIRA_RATE_LIMIT_BURST": str(max(10, int(args.rate_limit))),
+    })
+    from app import crud, jira_service, models, schemas
+    from app.database import SessionLocal, engine
+    from app.scheduler import sync_all_jira_projects
+
+    logging.getLogger().setLevel(logging.WARNING)
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for project in fake.data.projects.values():
+            if not crud.get_project_by_jira_key(db, project["key"]):
+                crud.create_project(db, schemas.ProjectCreate(name=project["name"], jira_project_key=project["key"]))
+
+        def count_epics():
+            return db.query(models.Epic).count()
+
+        total = args.projects * args.epics
+        print(f"🗄️  Database: {database}")
+        initial = run_pass("Initial sync (all inserts)", sync_all_jira_projects, count_epics, total)
+        changed = fake.data.touch(args.touch)
+        print(f"\n✏️  Changed {changed:,} epics in Jira")
+        resync = run_pass("Re-sync (mostly unchanged)", sync_all_jira_projects, count_epics, total)
+    finally:
+        db.close()
+        fake.stop()
+
+    print("\n📊 Summary")
+    print("-" * 40)
+    print(f"Epics per sync:     {total:,}")
+    print(f"Initial sync:       {initial:.2f}s ({total / initial:,.0f} epics/s)")
+    print(f"Re-sync:            {resync:.2f}s ({total / resync:,.0f} epics/s)")
+    stats = fake.stats()
+    print(f"Jira requests:      {stats['requests_total']:,} "
+          f"({stats['throttled_total']:,} throttled, {stats['errors_total']:,} failed)")
+    for metrics in jira_service.get_jira_metrics():
+        print(f"Client throttle:    {metrics['retries_total']:,} retries, "
+              f"{metrics['throttle_seconds_total']:.1f}s waiting, circuit {metrics['circuit_state']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
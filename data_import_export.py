@@ -113,6 +113,15 @@ def import_from_csv():
     # Import Risks (requires epics to exist first)
     if os.path.exists('risks_import.csv'):
         try:
+            # Fetch the epics once and look them up by title
+            epics_response = requests.get(f"{BASE_URL}/epics")
+            if epics_response.status_code != 200:
+                print("❌ Failed to fetch epics for risk import")
+                return
+            epics_by_title = {}
+            for epic in epics_response.json():
+                epics_by_title.setdefault(epic['title'], epic)
+
             with open('risks_import.csv', 'r', encoding='utf-8') as csvfile:
                 reader = csv.DictReader(csvfile)
                 imported_risks = 0
@@ -124,19 +133,7 @@ def import_from_csv():
                         print(f"⚠️  Skipping risk without epic_title: {row.get('description', '')[:50]}...")
                         continue
                     
-                    # Get all epics to find the right one
-                    epics_response = requests.get(f"{BASE_URL}/epics")
-                    if epics_response.status_code != 200:
-                        print("❌ Failed to fetch epics for risk import")
-                        break
-                    
-                    epics = epics_response.json()
-                    target_epic = None
-                    for epic in epics:
-                        if epic['title'] == epic_title:
-                            target_epic = epic
-                            break
-                    
+                    target_epic = epics_by_title.get(epic_title)
                     if not target_epic:
                         print(f"⚠️  Epic not found for risk: {epic_title}")
                         continue
@@ -161,6 +158,86 @@ def import_from_csv():
     else:
         print("📄 No risks_import.csv file found")
 
+def bulk_import_from_csv(epics_file='epics_import.csv', risks_file='risks_import.csv'):
+    """Import epics and risks straight into the database in batched transactions"""
+    print("📥 Bulk importing data from CSV files...")
+    from app import bulk_import, models
+    from app.database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        # One index of existing epics, shared by both files
+        index = bulk_import.EpicIndex(db)
+        for label, path, import_file in (
+            ("epics", epics_file, bulk_import.import_epics_csv),
+            ("risks", risks_file, bulk_import.import_risks_csv),
+        ):
+            if not os.path.exists(path):
+                print(f"📄 No {path} file found")
+                continue
+            result = import_file(db, path, index=index)
+            print(f"📊 Imported {result['imported']:,} of {result['rows']:,} {label} from {path} "
+                  f"in {result['seconds']}s")
+            if result['rejected']:
+                print(f"⚠️  {result['rejected']:,} rows rejected, see {result['reject_file']}")
+    except Exception as e:
+        print(f"❌ Error during bulk import: {e}")
+    finally:
+        db.close()
+
+def export_to_parquet(directory='export', file_format='parquet'):
+    """Export projects, epics, risks and risk updates straight from the database to Parquet or Arrow files"""
+    print(f"📤 Exporting data to {file_format} files in {directory}/...")
+    from app import columnar
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        summary = columnar.export_tables(db, directory, file_format)
+    except Exception as e:
+        print(f"❌ Error during export: {e}")
+        return None
+    finally:
+        db.close()
+    for table, result in summary.items():
+        print(f"✅ Exported {result['rows']:,} {table} to {result['path']} ({result['bytes']:,} bytes)")
+    compare_with_csv(directory, file_format)
+    return summary
+
+def compare_with_csv(directory='export', file_format='parquet'):
+    """Compare file size and load time of the columnar export with epics_export.csv and risks_export.csv"""
+    from app import columnar
+
+    for table in ('epics', 'risks'):
+        csv_path = f'{table}_export.csv'
+        columnar_path = columnar.export_path(directory, table, file_format)
+        if not os.path.exists(csv_path) or not os.path.exists(columnar_path):
+            continue
+        csv_bytes, columnar_bytes = os.path.getsize(csv_path), os.path.getsize(columnar_path)
+        csv_seconds, columnar_seconds = columnar.time_load(csv_path), columnar.time_load(columnar_path)
+        print(f"📊 {table}: {csv_path} {csv_bytes:,} bytes, loads in {csv_seconds:.3f}s; "
+              f"{columnar_path} {columnar_bytes:,} bytes, loads in {columnar_seconds:.3f}s")
+
+def import_from_parquet(directory='export', file_format='parquet', replace=False):
+    """Load a Parquet or Arrow export into the database, keeping ids"""
+    print(f"📥 Importing {file_format} files from {directory}/...")
+    from app import columnar, models
+    from app.database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        summary = columnar.import_tables(db, directory, file_format, replace=replace)
+    except Exception as e:
+        print(f"❌ Error during import: {e}")
+        return None
+    finally:
+        db.close()
+    for table, rows in summary.items():
+        print(f"✅ Imported {rows:,} {table}")
+    return summary
+
 def create_import_templates():
     """Create template CSV files for import"""
     print("📝 Creating import template files...")
@@ -230,11 +307,15 @@ if __name__ == "__main__":
         print("Usage:")
         print("  python data_import_export.py export     # Export to CSV")
         print("  python data_import_export.py import     # Import from CSV")
+        print("  python data_import_export.py bulk-import [epics.csv] [risks.csv]  # Fast import into the database")
+        print("  python data_import_export.py export-parquet [dir] [--arrow]  # Export all tables to Parquet/Arrow")
+        print("  python data_import_export.py import-parquet [dir] [--arrow] [--replace]  # Load a Parquet/Arrow export")
         print("  python data_import_export.py template   # Create import templates")
         print()
         print("Files used:")
         print("  📤 Export: epics_export.csv, risks_export.csv")
         print("  📥 Import: epics_import.csv, risks_import.csv")
+        print("  📦 Parquet: export/projects.parquet, epics.parquet, risks.parquet, risk_updates.parquet")
         
     elif sys.argv[1] == "export":
         export_to_csv()
@@ -242,8 +323,20 @@ if __name__ == "__main__":
     elif sys.argv[1] == "import":
         import_from_csv()
         
+    elif sys.argv[1] == "bulk-import":
+        bulk_import_from_csv(*sys.argv[2:4])
+
+    elif sys.argv[1] in ("export-parquet", "import-parquet"):
+        args = [arg for arg in sys.argv[2:] if not arg.startswith("--")]
+        file_format = "arrow" if "--arrow" in sys.argv else "parquet"
+        directory = args[0] if args else "export"
+        if sys.argv[1] == "export-parquet":
+            export_to_parquet(directory, file_format)
+        else:
+            import_from_parquet(directory, file_format, replace="--replace" in sys.argv)
+
     elif sys.argv[1] == "template":
         create_import_templates()
         
     else:
-        print("❌ Invalid command. Use: export, import, or template") 
\ No newline at end of file
+        print("❌ Invalid command. Use: export, import, bulk-import, export-parquet, import-parquet, or template")
\ No newline at end of file
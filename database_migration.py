@@ -1,239 +1,183 @@
 #!/usr/bin/env python3
 """
-Database Migration Script: Add Projects Support
-Migrates the Risk Tracker database to support Projects and Epic-Project relationships
+Database Migration Script
+Applies and rolls back the versioned schema migrations in app/migrations.py.
+Data backfills run in small, resumable chunks, so this is safe to run while
+the application is serving traffic.
 """
 
-import sqlite3
 import os
-from datetime import datetime
+import sys
 
-def backup_database():
+from app import backup, counters, maintenance, migrations
+from app.database import SessionLocal
+
+def backup_database(db_file, prefix):
     """Create a backup before migration"""
-    db_file = "risk_tracker.db"
-    if os.path.exists(db_file):
-        backup_file = f"risk_tracker_pre_projects_migration_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-        backup_path = os.path.join("backups", backup_file)
-        
-        # Create backups directory if it doesn't exist
-        if not os.path.exists("backups"):
-            os.makedirs("backups")
-        
-        import shutil
-        shutil.copy2(db_file, backup_path)
-        print(f"✅ Database backed up to: {backup_path}")
-        return backup_path
-    return None
-
-def check_migration_needed():
-    """Check if migration is needed"""
-    db_file = "risk_tracker.db"
-    if not os.path.exists(db_file):
-        print("❌ Database file not found. Run the application first to create the database.")
-        return False
-    
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-    
-    # Check if projects table exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='projects';")
-    projects_exists = cursor.fetchone() is not None
-    
-    # Check if epics table has project_id column
-    cursor.execute("PRAGMA table_info(epics);")
-    columns = cursor.fetchall()
-    column_names = [column[1] for column in columns]
-    project_id_exists = 'project_id' in column_names
-    jira_epic_key_exists = 'jira_epic_key' in column_names
-    
-    conn.close()
-    
-    if projects_exists and project_id_exists and jira_epic_key_exists:
-        print("✅ Migration already completed - Projects support is already enabled.")
-        return False
-    
-    return True
-
-def run_migration():
-    """Execute the database migration"""
-    db_file = "risk_tracker.db"
-    
-    print("🔄 Starting database migration...")
-    
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-    
-    try:
-        # Step 1: Create Projects table
-        print("📋 Creating Projects table...")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS projects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                jira_project_key VARCHAR(100) UNIQUE,
-                name VARCHAR(255) NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        
-        # Step 2: Add project_id column to epics table
-        print("🔗 Adding project_id column to epics table...")
-        try:
-            cursor.execute("ALTER TABLE epics ADD COLUMN project_id INTEGER REFERENCES projects(id);")
-        except sqlite3.OperationalError as e:
-            if "duplicate column name" in str(e).lower():
-                print("   ℹ️  project_id column already exists")
-            else:
-                raise
-        
-        # Step 3: Add jira_epic_key column to epics table
-        print("🔑 Adding jira_epic_key column to epics table...")
-        try:
-            # Add the column without the UNIQUE constraint first
-            cursor.execute("ALTER TABLE epics ADD COLUMN jira_epic_key VARCHAR(100);")
-        except sqlite3.OperationalError as e:
-            if "duplicate column name" in str(e).lower():
-                print("   ℹ️  jira_epic_key column already exists")
-            else:
-                raise
-        
-        # Step 4: Create a default "General" project for existing epics
-        print("📁 Creating default 'General' project...")
-        cursor.execute("""
-            INSERT OR IGNORE INTO projects (name, description)
-            VALUES ('General', 'Default project for manually created epics');
-        """)
-        
-        # Step 5: Assign existing epics to the General project
-        print("🔄 Assigning existing epics to General project...")
-        cursor.execute("""
-            UPDATE epics 
-            SET project_id = (SELECT id FROM projects WHERE name = 'General')
-            WHERE project_id IS NULL;
-        """)
-        
-        # Step 6: Create indexes for better performance
-        print("⚡ Creating database indexes...")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_epics_project_id ON epics(project_id);")
-        # Now, create a UNIQUE index on the new column
-        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_epics_jira_epic_key ON epics(jira_epic_key) WHERE jira_epic_key IS NOT NULL;")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_jira_key ON projects(jira_project_key);")
-        
-        # Commit all changes
-        conn.commit()
-        
-        # Step 7: Verify migration
-        print("🔍 Verifying migration...")
-        
-        # Check projects table
-        cursor.execute("SELECT COUNT(*) FROM projects;")
-        project_count = cursor.fetchone()[0]
-        
-        # Check epics with project assignment
-        cursor.execute("SELECT COUNT(*) FROM epics WHERE project_id IS NOT NULL;")
-        assigned_epics = cursor.fetchone()[0]
-        
-        # Check total epics
-        cursor.execute("SELECT COUNT(*) FROM epics;")
-        total_epics = cursor.fetchone()[0]
-        
-        print(f"✅ Migration completed successfully!")
-        print(f"   📊 Projects: {project_count}")
-        print(f"   📊 Assigned Epics: {assigned_epics}/{total_epics}")
-        
+    # Consistent online copy, verified before the migration touches anything
+    result = backup.create_backup(db_file, prefix=prefix)
+    print(f"✅ Database backed up to: {result['path']}")
+    return result['path']
+
+def show_status(conn):
+    """Print every known migration and whether it is applied"""
+    icons = {"applied": "✅", "backfilling": "🔄", "pending": "⏳"}
+    print(f"📋 Schema version: {migrations.current_version(conn)}")
+    for entry in migrations.migration_status(conn):
+        applied_at = f" ({entry['applied_at']})" if entry['applied_at'] else ""
+        print(f"   {icons[entry['status']]} {entry['version']:>3} {entry['name']}: {entry['status']}{applied_at}")
+
+def confirm(flags):
+    if "--yes" in flags:
         return True
-        
+    response = input("\n⚠️  This will modify your database. Continue? (yes/no): ")
+    return response.lower() == 'yes'
+
+def migrate_up(conn, db_file, target, flags):
+    """Apply pending migrations up to target (default: all)"""
+    dry_run = "--dry-run" in flags
+    if not migrations.pending_migrations(conn, target=target):
+        print("✅ Database is up to date.")
+        return 0
+
+    print("🔍 Migration plan:")
+    migrations.migrate(conn, target=target, dry_run=True, log=print)
+    if dry_run:
+        return 0
+    if not confirm(flags):
+        print("🚫 Migration cancelled.")
+        return 1
+
+    # Named after the version being migrated to, e.g. risk_tracker_pre_migration_v5_...
+    new_version = target if target is not None else max(migration.version for migration in migrations.MIGRATIONS)
+    backup_database(db_file, f"risk_tracker_pre_migration_v{new_version}")
+    print("🔄 Applying migrations...")
+    try:
+        applied = migrations.migrate(conn, target=target, log=print)
     except Exception as e:
         print(f"❌ Migration failed: {e}")
-        conn.rollback()
-        return False
+        print("   Finished steps are kept; rerun to resume the remaining ones.")
+        return 1
+    print(f"🎉 Applied {len(applied)} migration(s); schema version {migrations.current_version(conn)}")
+    return 0
+
+def migrate_down(conn, db_file, target, flags):
+    """Roll back applied migrations above target"""
+    dry_run = "--dry-run" in flags
+    try:
+        migrations.rollback(conn, target, dry_run=True, log=print)
+        if dry_run:
+            return 0
+        if not confirm(flags):
+            print("🚫 Rollback cancelled.")
+            return 1
+        backup_database(db_file, f"risk_tracker_pre_rollback_v{target}")
+        reverted = migrations.rollback(conn, target, log=print)
+    except migrations.MigrationError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ Reverted {len(reverted)} migration(s); schema version {migrations.current_version(conn)}")
+    return 0
+
+def check_counters(flags):
+    """Recount the denormalized counter columns, and fix them with --repair"""
+    repair = "--repair" in flags
+    if repair and not confirm(flags):
+        print("🚫 Repair cancelled.")
+        return 1
+    db = SessionLocal()
+    try:
+        report = counters.verify_counters(db, repair=repair)
     finally:
-        conn.close()
+        db.close()
+    for table, result in report.items():
+        if not result["mismatched"]:
+            print(f"   ✅ {table}: all counters match")
+            continue
+        print(f"   {'🔧' if repair else '❌'} {table}: {result['mismatched']:,} row(s) "
+              f"{'repaired' if repair else 'out of date'}")
+        for row in result["sample"]:
+            print(f"      {row}")
+    if any(result["mismatched"] for result in report.values()) and not repair:
+        print("   Run with --repair to fix them.")
+        return 1
+    return 0
+
+def show_size(label, stats):
+    print(f"   {label}: {stats['file_bytes']:,} bytes (+{stats['wal_bytes']:,} WAL), "
+          f"{stats['free_pages']:,} of {stats['page_count']:,} pages free, auto_vacuum={stats['auto_vacuum']}")
 
-def verify_migration():
-    """Verify the migration was successful"""
-    db_file = "risk_tracker.db"
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-    
-    print("\n🔍 Migration Verification:")
-    print("=" * 40)
-    
-    # Check projects table structure
-    cursor.execute("PRAGMA table_info(projects);")
-    projects_columns = cursor.fetchall()
-    print(f"✅ Projects table: {len(projects_columns)} columns")
-    
-    # Check epics table structure
-    cursor.execute("PRAGMA table_info(epics);")
-    epics_columns = cursor.fetchall()
-    epic_column_names = [col[1] for col in epics_columns]
-    
-    project_id_exists = 'project_id' in epic_column_names
-    jira_epic_key_exists = 'jira_epic_key' in epic_column_names
-    
-    print(f"✅ Epics table: {len(epics_columns)} columns")
-    print(f"   project_id column: {'✅' if project_id_exists else '❌'}")
-    print(f"   jira_epic_key column: {'✅' if jira_epic_key_exists else '❌'}")
-    
-    # Check data
-    cursor.execute("SELECT COUNT(*) FROM projects;")
-    project_count = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM epics;")
-    epic_count = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM epics WHERE project_id IS NOT NULL;")
-    assigned_count = cursor.fetchone()[0]
-    
-    print(f"📊 Data summary:")
-    print(f"   Projects: {project_count}")
-    print(f"   Total Epics: {epic_count}")
-    print(f"   Assigned Epics: {assigned_count}")
-    
-    conn.close()
-    
-    return project_id_exists and jira_epic_key_exists and assigned_count == epic_count
+def run_maintenance(db_file):
+    """Run the nightly maintenance job now"""
+    print("🧹 Running quick_check, ANALYZE and an incremental vacuum...")
+    report = maintenance.run_maintenance(db_file)
+    if report["quick_check"] != "ok":
+        print("❌ quick_check found problems (vacuum skipped):")
+        for problem in report["quick_check"]:
+            print(f"      {problem}")
+    show_size("Before", report["before"])
+    show_size("After ", report["after"])
+    vacuum = report["vacuum"]
+    if vacuum and vacuum["steps"]:
+        print(f"   ♻️  {vacuum['pages_freed']:,} pages freed in {vacuum['steps']} step(s)"
+              f"{'' if vacuum['complete'] else ', more left for the next run'}")
+    elif report["after"]["auto_vacuum"] != "incremental":
+        print("   ⚠️  Free pages cannot be reclaimed incrementally; run the vacuum command once.")
+    print(f"   ⏱️  {report['seconds']}")
+    return 0 if report["quick_check"] == "ok" else 1
+
+def full_vacuum(db_file, flags):
+    """Rewrite the database with incremental auto-vacuum enabled"""
+    print("⚠️  VACUUM rewrites the whole file and blocks writers until it finishes; stop the app or pick a quiet time.")
+    if not confirm(flags):
+        print("🚫 Vacuum cancelled.")
+        return 1
+    result = maintenance.enable_incremental_vacuum(db_file)
+    show_size("Before", result["before"])
+    show_size("After ", result["after"])
+    print(f"✅ Vacuumed in {result['seconds']}s")
+    return 0
 
 def main():
     """Main migration function"""
-    print("🚀 Risk Tracker Database Migration: Projects Support")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    flags = {arg for arg in sys.argv[1:] if arg.startswith("--")}
+    command = args[0] if args else "up"
+
+    print("🚀 Risk Tracker Database Migration")
     print("=" * 60)
-    
-    # Check if migration is needed
-    if not check_migration_needed():
-        return 0
-    
-    # Create backup
-    backup_path = backup_database()
-    if backup_path:
-        print(f"💾 Backup created: {backup_path}")
-    
-    # Confirm with user
-    response = input("\n⚠️  This will modify your database. Continue? (yes/no): ")
-    if response.lower() != 'yes':
-        print("🚫 Migration cancelled.")
-        return 1
-    
-    # Run migration
-    success = run_migration()
-    if not success:
-        print("\n❌ Migration failed. Database has been rolled back.")
+
+    db_file = backup.sqlite_path_from_url()
+    if not os.path.exists(db_file):
+        print("❌ Database file not found. Run the application first to create the database.")
         return 1
-    
-    # Verify migration
-    if verify_migration():
-        print("\n🎉 Migration completed successfully!")
-        print("📝 Next steps:")
-        print("   1. Restart your Risk Tracker application")
-        print("   2. The new Projects features will be available")
-        print("   3. Existing epics are assigned to 'General' project")
-        return 0
-    else:
-        print("\n⚠️  Migration completed but verification failed.")
+
+    conn = migrations.connect(db_file)
+    try:
+        if command == "status":
+            show_status(conn)
+            return 0
+        if command == "up":
+            return migrate_up(conn, db_file, int(args[1]) if len(args) > 1 else None, flags)
+        if command == "down" and len(args) > 1:
+            return migrate_down(conn, db_file, int(args[1]), flags)
+        if command == "counters":
+            return check_counters(flags)
+        if command == "maintain":
+            return run_maintenance(db_file)
+        if command == "vacuum":
+            return full_vacuum(db_file, flags)
+        print("Usage:")
+        print("  python database_migration.py status                        - Show applied and pending migrations")
+        print("  python database_migration.py up [version] [--dry-run]      - Apply pending migrations")
+        print("  python database_migration.py down <version> [--dry-run]    - Roll back to a version")
+        print("  python database_migration.py counters [--repair]           - Verify (and repair) the stored counts")
+        print("  python database_migration.py maintain                      - quick_check, ANALYZE and incremental vacuum now")
+        print("  python database_migration.py vacuum                        - Full VACUUM, switching to incremental auto-vacuum")
+        print("  Add --yes to skip the confirmation prompt")
         return 1
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
-    import sys
-    sys.exit(main()) 
\ No newline at end of file
+    sys.exit(main())
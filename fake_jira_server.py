@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Offline Jira stand-in for Risk Tracker
+Serves generated projects and epics over the subset of the Jira REST API used by
+the sync (server info, project lookup and paged JQL search), with configurable
+latency, throttling (429) and server errors for load and failure testing
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Jira Server caps search pages at this many issues
+MAX_RESULTS = 100
+
+# System fields listed by /rest/api/2/field, which the Jira client reads before searching
+FIELDS = ["summary", "description", "duedate", "status", "issuetype", "project", "created", "updated", "parent"]
+# Jira Software's custom field linking stories to their epic on Jira Server
+EPIC_LINK_FIELD = "customfield_10008"
+
+STATUSES = ["To Do", "Backlog", "In Progress", "In Review", "Blocked", "On Hold", "Done", "Cancelled"]
+STATUS_CATEGORIES = {"To Do": "new", "Backlog": "new", "Done": "done", "Cancelled": "done"}
+
+def make_status(name):
+    """A Jira status object including its status category"""
+    return {"name": name, "statusCategory": {"key": STATUS_CATEGORIES.get(name, "indeterminate")}}
+
+def format_jira_datetime(value):
+    """Format a datetime the way Jira does: 2024-01-31T09:15:00.000+0000"""
+    return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}" + value.strftime("%z")
+
+def parse_jql_datetime(value):
+    """Parse a JQL date literal: "yyyy-MM-dd HH:mm", "yyyy/MM/dd HH:mm" or a plain date (UTC)"""
+    value = value.replace('/', '-')
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid JQL date: {value}")
+
+class FakeJiraData:
+    """Generated Jira projects and epics, kept in memory"""
+
+    def __init__(self, projects=5, epics_per_project=100, children_per_epic=0, seed=42):
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.projects = {}
+        self.issues = {}
+        self.children = {}
+        started = datetime.now(timezone.utc) - timedelta(days=365)
+        for p in range(1, projects + 1):
+            project_key = f"LOAD{p}"
+            self.projects[project_key] = {
+                "id": str(10000 + p),
+                "key": project_key,
+                "name": f"Load Test Project {p}",
+                "description": f"Generated project {p} for sync load testing",
+            }
+            issues = []
+            for e in range(1, epics_per_project + 1):
+                created = started + timedelta(minutes=e)
+                issues.append({
+                    "id": str(p * 1000000 + e),
+                    "key": f"{project_key}-{e}",
+                    "fields": {
+                        "summary": f"Epic {e} of {project_key}",
+                        "description": f"Generated epic {e}",
+                        "duedate": (created + timedelta(days=self._random.randint(30, 400))).strftime("%Y-%m-%d"),
+                        "status": make_status(self._random.choice(STATUSES)),
+                        "issuetype": {"name": "Epic"},
+                        "project": {"key": project_key},
+                        "created": format_jira_datetime(created),
+                        "updated": format_jira_datetime(created),
+                    },
+                })
+            # Newest first, matching "ORDER BY created DESC"
+            self.issues[project_key] = issues[::-1]
+            for epic in issues:
+                self.children[epic["key"]] = [
+                    {
+                        "id": f"{epic['id']}{c:03d}",
+                        "key": f"{epic['key']}-{c}",
+                        "fields": {
+                            "summary": f"Story {c} of {epic['key']}",
+                            "status": make_status(self._random.choice(STATUSES)),
+                            "issuetype": {"name": "Story"},
+                            "project": {"key": project_key},
+                            EPIC_LINK_FIELD: epic["key"],
+                            "created": epic["fields"]["created"],
+                            "updated": epic["fields"]["updated"],
+                        },
+                    }
+                    for c in range(1, children_per_epic + 1)
+                ]
+
+    def touch(self, fraction=0.05):
+        """Change the status of a random fraction of epics and bump their `updated` timestamp"""
+        now = format_jira_datetime(datetime.now(timezone.utc))
+        changed = 0
+        with self._lock:
+            for issues in self.issues.values():
+                for issue in self._random.sample(issues, int(len(issues) * fraction)):
+                    fields = dict(issue["fields"])
+                    fields["status"] = make_status(self._random.choice(STATUSES))
+                    fields["updated"] = now
+                    issue["fields"] = fields
+                    changed += 1
+        return changed
+
+    def search(self, jql, start_at, max_results, fields=None):
+        """Run the small JQL subset the sync uses: project, issuetype, "Epic Link" and updated filters"""
+        parents = re.search(r'"Epic Link"\s+in\s*\(([^)]*)\)', jql, re.IGNORECASE)
+        project = re.search(r'project\s*=\s*"?([A-Za-z0-9_]+)"?', jql)
+        issuetype = re.search(r'issuetype\s*=\s*"?(\w+)"?', jql, re.IGNORECASE)
+        updated = re.search(r'updated\s*>=?\s*"([^"]+)"', jql)
+
+        with self._lock:
+            if parents:
+                keys = [key.strip().strip('"') for key in parents.group(1).split(",")]
+                issues = [child for key in keys for child in self.children.get(key, [])]
+            elif project:
+                if project.group(1) not in self.projects:
+                    return None
+                issues = self.issues[project.group(1)]
+            else:
+                issues = [issue for project_issues in self.issues.values() for issue in project_issues]
+        if issuetype:
+            issues = [i for i in issues if i["fields"]["issuetype"]["name"].lower() == issuetype.group(1).lower()]
+        if updated:
+            since = format_jira_datetime(parse_jql_datetime(updated.group(1)))
+            issues = [i for i in issues if i["fields"]["updated"] >= since]
+
+        page = issues[start_at:start_at + max_results]
+        if fields:
+            page = [{**issue, "fields": {k: v for k, v in issue["fields"].items() if k in fields}} for issue in page]
+        return {"startAt": start_at, "maxResults": max_results, "total": len(issues), "issues": page}
+
+class FakeJiraServer:
+    """
+    A threaded HTTP server speaking enough of the Jira REST API for the sync.
+
+    - `latency` seconds (plus up to `jitter`) are added to every response
+    - `throttle_rate` of requests answer 429 with `Retry-After: retry_after`
+    - `error_rate` of requests answer 500
+    """
+
+    def __init__(self, data=None, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 throttle_rate=0.0, error_rate=0.0, retry_after=1):
+        self.data = data or FakeJiraData()
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.requests_total = 0
+        self.throttled_total = 0
+        self.errors_total = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-jira", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests_total": self.requests_total,
+                "throttled_total": self.throttled_total,
+                "errors_total": self.errors_total,
+            }
+
+    def _fault(self):
+        """Decide whether this request is slowed, throttled or failed"""
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        roll = random.random()
+        with self._lock:
+            self.requests_total += 1
+            if roll < self.throttle_rate:
+                self.throttled_total += 1
+                return 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.errors_total += 1
+                return 500
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this each keep-alive response waits ~40ms
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v if k == "fields" else v[-1] for k, v in parse_qs(url.query).items()}
+                self._route(url.path, params)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                params = json.loads(self.rfile.read(length) or b"{}")
+                self._route(urlparse(self.path).path, params)
+
+            def _route(self, path, params):
+                status = server._fault()
+                if status == 429:
+                    return self._send(429, {"errorMessages": ["Rate limit exceeded."]},
+                                      {"Retry-After": str(server.retry_after)})
+                if status == 500:
+                    return self._send(500, {"errorMessages": ["Internal server error."]})
+
+                if path.endswith("/serverInfo"):
+                    return self._send(200, {
+                        "baseUrl": server.url, "version": "9.12.0", "versionNumbers": [9, 12, 0],
+                        "deploymentType": "Server", "buildNumber": 9120000, "serverTitle": "Fake Jira",
+                    })
+                if path.endswith("/rest/api/2/field"):
+                    return self._send(200, [
+                        {"id": name, "key": name, "name": name.capitalize(), "custom": False} for name in FIELDS
+                    ] + [{"id": EPIC_LINK_FIELD, "key": EPIC_LINK_FIELD, "name": "Epic Link", "custom": True}])
+                match = re.search(r"/rest/api/2/project/([^/]+)$", path)
+                if match:
+                    project = server.data.projects.get(match.group(1))
+                    if project is None:
+                        return self._send(404, {"errorMessages": [f"No project could be found with key '{match.group(1)}'."]})
+                    return self._send(200, {**project, "self": f"{server.url}{path}"})
+                if path.endswith("/rest/api/2/search"):
+                    return self._search(params)
+                return self._send(404, {"errorMessages": [f"Not found: {path}"]})
+
+            def _search(self, params):
+                # Sent as repeated and/or comma separated query parameters, or a JSON list
+                fields = params.get("fields")
+                if isinstance(fields, str):
+                    fields = [fields]
+                if fields:
+                    fields = [name for value in fields for name in value.split(",")]
+                try:
+                    result = server.data.search(
+                        params.get("jql", ""),
+                        int(params.get("startAt", 0)),
+                        min(int(params.get("maxResults", 50)), MAX_RESULTS),
+                        fields=fields if fields and fields != ["*all"] else None,
+                    )
+                except ValueError as e:
+                    return self._send(400, {"errorMessages": [str(e)]})
+                if result is None:
+                    return self._send(400, {"errorMessages": ["The value in field 'project' does not exist."]})
+                return self._send(200, result)
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json;charset=UTF-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline Jira stand-in for sync testing")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--projects", type=int, default=5)
+    parser.add_argument("--epics", type=int, default=100, help="Epics per project")
+    parser.add_argument("--children", type=int, default=0, help="Child issues per epic")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra random seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 500")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    args = parser.parse_args()
+
+    fake = FakeJiraServer(
+        FakeJiraData(args.projects, args.epics, args.children), port=args.port, latency=args.latency, jitter=args.jitter,
+        throttle_rate=args.throttle_rate, error_rate=args.error_rate, retry_after=args.retry_after,
+    )
+    print(f"🚀 Fake Jira serving {args.projects} projects x {args.epics} epics at {fake.url}")
+    print("💡 Point the app at it with:")
+    print(f"   JIRA_SERVER={fake.url}  JIRA_USERNAME=load@example.com  JIRA_API_TOKEN=fake")
+    print(f"   Projects: {', '.join(list(fake.data.projects)[:5])}{' ...' if args.projects > 5 else ''}")
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped")
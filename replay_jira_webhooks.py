@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Jira webhook replayer for Risk Tracker
+Sends recorded (or sample) Jira issue events to the local webhook endpoint,
+signed the way Jira Cloud signs them, so webhook sync can be tested offline
+"""
+
+import json
+import os
+import sys
+import time
+import requests
+from dotenv import load_dotenv
+
+from app.jira_webhooks import sign_webhook
+
+load_dotenv()
+
+DEFAULT_URL = "http://localhost:8000/api/jira/webhook"
+
+def load_events(path):
+    """Load events from a JSON array or a JSON-lines file"""
+    with open(path, encoding='utf-8') as f:
+        content = f.read().strip()
+    if content.startswith('['):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+def replay_events(events, url=DEFAULT_URL, secret=None, delay=0.0):
+    """POST each event to the webhook endpoint, returning the number accepted"""
+    secret = secret or os.getenv("JIRA_WEBHOOK_SECRET")
+    if not secret:
+        print("❌ JIRA_WEBHOOK_SECRET is not set. Add it to your .env file.")
+        return 0
+
+    accepted = 0
+    for i, event in enumerate(events, 1):
+        body = json.dumps(event).encode('utf-8')
+        headers = {"Content-Type": "application/json", "X-Hub-Signature": sign_webhook(body, secret)}
+        key = (event.get('issue') or {}).get('key', '?')
+        try:
+            response = requests.post(url, data=body, headers=headers, timeout=10)
+        except requests.exceptions.ConnectionError:
+            print(f"❌ Could not reach {url}")
+            print("💡 Start the server with: python run.py")
+            return accepted
+
+        if response.status_code == 202 and response.json().get('accepted'):
+            accepted += 1
+            print(f"✅ [{i}/{len(events)}] {event.get('webhookEvent')} {key}")
+        else:
+            print(f"⚠️  [{i}/{len(events)}] {event.get('webhookEvent')} {key} - {response.status_code} {response.text}")
+        if delay:
+            time.sleep(delay)
+
+    print(f"\n📊 {accepted} of {len(events)} events accepted")
+    return accepted
+
+def create_sample_events(path, project_key="DEMO"):
+    """Write a burst of sample events: create, two quick edits and a delete"""
+    now = int(time.time() * 1000)
+
+    def issue(key, summary, status, duedate):
+        return {
+            "key": key,
+            "fields": {
+                "summary": summary,
+                "description": None,
+                "duedate": duedate,
+                "status": {"name": status},
+                "issuetype": {"name": "Epic"},
+                "project": {"key": project_key},
+            },
+        }
+
+    events = [
+        {"webhookEvent": "jira:issue_created", "timestamp": now,
+         "issue": issue(f"{project_key}-1", "Sample webhook epic", "To Do", "2030-03-31")},
+        {"webhookEvent": "jira:issue_updated", "timestamp": now + 1,
+         "issue": issue(f"{project_key}-1", "Sample webhook epic", "In Progress", "2030-03-31")},
+        {"webhookEvent": "jira:issue_updated", "timestamp": now + 2,
+         "issue": issue(f"{project_key}-1", "Sample webhook epic", "In Progress", "2030-06-30")},
+        {"webhookEvent": "jira:issue_created", "timestamp": now + 3,
+         "issue": issue(f"{project_key}-2", "Short-lived epic", "To Do", None)},
+        {"webhookEvent": "jira:issue_deleted", "timestamp": now + 4,
+         "issue": issue(f"{project_key}-2", "Short-lived epic", "To Do", None)},
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(events, f, indent=2)
+
+    print(f"✅ Wrote {len(events)} sample events to {path}")
+    print(f"💡 Events only apply to projects already imported with Jira key '{project_key}'.")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        print("🚀 Risk Tracker Jira Webhook Replayer")
+        print("=" * 40)
+        print("Usage:")
+        print("  python replay_jira_webhooks.py sample [file] [project_key]  # Write sample events")
+        print("  python replay_jira_webhooks.py <file> [url]                 # Replay events")
+        print()
+        print(f"Default URL: {DEFAULT_URL}")
+        print("Events are signed with JIRA_WEBHOOK_SECRET from your .env file.")
+
+    elif sys.argv[1] == "sample":
+        path = sys.argv[2] if len(sys.argv) > 2 else "jira_webhook_events.json"
+        project_key = sys.argv[3] if len(sys.argv) > 3 else "DEMO"
+        create_sample_events(path, project_key)
+
+    else:
+        url = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_URL
+        events = load_events(sys.argv[1])
+        ok = replay_events(events, url)
+        sys.exit(0 if ok == len(events) else 1)
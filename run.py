@@ -15,6 +15,8 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
     debug = os.getenv("DEBUG", "True").lower() == "true"
+    # Live update streams never finish on their own; cut them off on shutdown and let browsers reconnect
+    graceful_shutdown_seconds = int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "5"))
     
     print("🚀 Starting Risk Tracker Application...")
     print(f"📍 Server: http://{host}:{port}")
@@ -28,5 +30,6 @@ if __name__ == "__main__":
         host=host,
         port=port,
         reload=debug,
-        log_level="info" if debug else "warning"
+        log_level="info" if debug else "warning",
+        timeout_graceful_shutdown=graceful_shutdown_seconds
     ) 
\ No newline at end of file
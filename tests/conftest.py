@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+
+# --- Shared database fixtures ---
+# Every test gets its own in-memory database with all tables (and the triggers create_all adds).
+# StaticPool keeps one connection, so every session, thread and request sees the same database.
+
+@pytest.fixture
+def make_engine():
+    """Creates fresh databases, for tests that need a second one (e.g. an import target)."""
+    engines = []
+
+    def make():
+        engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+@pytest.fixture
+def engine(make_engine):
+    return make_engine()
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
@@ -126,4 +126,19 @@ def test_create_and_get_epic():
     assert response.status_code == 200
     fetched_epic = response.json()
     assert fetched_epic["title"] == epic_data["title"]
-    assert fetched_epic["project"]["id"] == project_id 
\ No newline at end of file
+    assert fetched_epic["project"]["id"] == project_id
+
+def test_update_epic_ignores_jira_rollup_fields():
+    """
+    Tests that the child issue rollup, which only Jira sync writes, cannot be set through the API.
+    """
+    epic_id = client.post("/api/epics/", json={"title": "Rollup Epic"}).json()["id"]
+    response = client.put(
+        f"/api/epics/{epic_id}",
+        json={"title": "Renamed Epic", "child_issues_done": 99, "child_issues_total": 100},
+    )
+    assert response.status_code == 200, response.text
+    updated_epic = response.json()
+    assert updated_epic["title"] == "Renamed Epic"
+    assert updated_epic["child_issues_done"] is None
+    assert updated_epic["child_issues_total"] is None
@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app import archive, crud, models, schemas
+from app.main import app, get_db
+
+client = TestClient(app)
+
+NOW = datetime(2026, 6, 15)
+LONG_AGO = datetime(2024, 1, 10)
+
+def add_epic(db, title, status, project_id=None, risks=0, jira_epic_key=None, touched=LONG_AGO):
+    epic = crud.create_epic(db, schemas.EpicCreate(title=title, status=status, project_id=project_id,
+                                                   jira_epic_key=jira_epic_key))
+    for n in range(risks):
+        risk = crud.create_risk(db, schemas.RiskCreate(description=f"{title} risk {n}"), epic_id=epic.id)
+        crud.create_risk_update(db, schemas.RiskUpdateCreate(update_text="Raised"), risk_id=risk.id)
+    db.execute(update(models.Epic).where(models.Epic.id == epic.id).values(updated_at=touched))
+    db.commit()
+    return epic.id
+
+def live_ids(db, model):
+    return sorted(row[0] for row in db.query(model.id))
+
+def test_archive_and_restore_round_trip(db):
+    project = crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+    launched = add_epic(db, "Checkout", "Launched", project.id, risks=2)
+    cancelled = add_epic(db, "Wallet", "Cancelled", project.id)
+    recent = add_epic(db, "Search", "Launched", project.id, touched=datetime(2026, 1, 5))
+    open_epic = add_epic(db, "Payments", "In Progress", project.id)
+    launched_risks = [risk.id for risk in crud.get_epic(db, launched).risks]
+    db.expire_all()
+
+    moved = archive.archive_closed_epics(db, now=NOW, months=12, batch_epics=1)
+    assert moved == {"epics": 2, "risks": 2, "risk_updates": 2}
+    assert live_ids(db, models.Epic) == [recent, open_epic]
+    assert live_ids(db, models.ArchivedEpic) == [launched, cancelled]
+    stored = db.get(models.ArchivedEpic, launched)
+    assert (stored.risk_count, stored.open_risk_count, stored.project.name) == (2, 2, "Platform")
+    assert [len(risk.updates) for risk in stored.risks] == [1, 1]
+    db.expire_all()
+    assert db.get(models.Project, project.id).epic_count == 2
+    # Nothing left to move
+    assert archive.archive_closed_epics(db, now=NOW, months=12)["epics"] == 0
+
+    restored = archive.restore_epic(db, launched, now=NOW)
+    assert [risk.id for risk in restored.risks] == launched_risks
+    assert (restored.risk_count, restored.open_risk_count, restored.updated_at) == (2, 2, NOW)
+    assert all(risk.last_update_at is not None and len(risk.updates) == 1 for risk in restored.risks)
+    assert live_ids(db, models.ArchivedEpic) == [cancelled] and db.query(models.ArchivedRisk).count() == 0
+    # Edited "now", so the next run leaves it alone
+    assert archive.archive_closed_epics(db, now=NOW, months=12)["epics"] == 0
+    assert archive.restore_epic(db, launched) is None
+
+def test_archived_ids_are_never_reused_and_sync_skips_archived_keys(db):
+    project = crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+    archived = add_epic(db, "Checkout", "Launched", project.id, jira_epic_key="PLAT-1")
+    live = add_epic(db, "Search", "Launched", project.id, jira_epic_key="PLAT-2", touched=NOW)
+    archive.archive_closed_epics(db, now=NOW, months=12)
+    # With the highest live id gone too, only AUTOINCREMENT keeps the archived id free
+    crud.delete_epic(db, live)
+    assert crud.create_epic(db, schemas.EpicCreate(title="Wallet")).id == live + 1
+
+    imported, updated, unchanged = crud.bulk_upsert_epics(db, [
+        {"jira_epic_key": "PLAT-1", "title": "Checkout", "status": "Launched"},
+        {"jira_epic_key": "PLAT-3", "title": "Wallet", "status": "Planning"},
+    ])
+    assert (imported, updated, unchanged) == (1, 0, 1)
+    assert crud.get_epic_by_jira_key(db, "PLAT-1") is None
+    assert archive.restore_epic(db, archived).jira_epic_key == "PLAT-1"
+
+    # An id taken by an explicit insert
+    archive.archive_closed_epics(db, now=datetime(2030, 1, 1), months=12)
+    db.add(models.Epic(id=archived, title="Squatter", status="Planning"))
+    db.commit()
+    with pytest.raises(archive.ArchiveError):
+        archive.restore_epic(db, archived)
+    assert db.get(models.ArchivedEpic, archived) is not None
+
+def test_api_includes_archived_rows_on_request(session_factory, db):
+    project = crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+    old = add_epic(db, "Checkout", "Launched", project.id, risks=1)
+    live = add_epic(db, "Search", "In Progress", project.id, risks=1)
+    archive.archive_closed_epics(db, now=NOW, months=12)
+    archived_risk = db.query(models.ArchivedRisk).one().id
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        assert [epic["id"] for epic in client.get("/api/epics").json()] == [live]
+        epics = client.get("/api/epics", params={"archived": "true"}).json()
+        assert [(epic["id"], epic["archived"]) for epic in epics] == [(live, False), (old, True)]
+        assert epics[1]["project"]["name"] == "Platform" and len(epics[1]["risks"]) == 1
+        assert len(client.get(f"/api/projects/{project.id}/epics", params={"archived": "true"}).json()) == 2
+        assert client.get(f"/api/epics/{old}").status_code == 404
+        assert client.get(f"/api/epics/{old}", params={"archived": "true"}).json()["archived"] is True
+        assert client.get(f"/api/risks/{archived_risk}", params={"archived": "true"}).json()["updates"][0]["update_text"] == "Raised"
+        assert len(client.get("/api/risks", params={"archived": "true"}).json()) == 2
+
+        response = client.post(f"/api/epics/{old}/restore")
+        assert response.status_code == 200 and response.json()["archived"] is False
+        assert client.get(f"/api/epics/{old}").json()["risk_count"] == 1
+        assert client.post(f"/api/epics/{old}/restore").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+
+def test_archive_tables_keep_every_live_column():
+    for live, archived in archive.TIERS:
+        assert {column.name for column in live.columns} <= {column.name for column in archived.columns}
@@ -0,0 +1,144 @@
+import gzip
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import backup
+
+def make_database(path, rows=2000):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE epics (id INTEGER PRIMARY KEY, title TEXT)")
+    conn.executemany("INSERT INTO epics (title) VALUES (?)", [(f"Epic {n} " + "x" * 200,) for n in range(rows)])
+    conn.commit()
+    conn.close()
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM epics").fetchone()[0]
+    finally:
+        conn.close()
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "risk_tracker.db")
+    make_database(path)
+    return path
+
+def test_backup_is_compressed_verified_and_restorable(database, tmp_path):
+    backup_dir = str(tmp_path / "backups")
+    result = backup.create_backup(database, backup_dir)
+
+    assert result["path"].endswith(".db.gz")
+    assert result["backup_bytes"] < result["database_bytes"]
+    assert os.listdir(backup_dir) == [os.path.basename(result["path"])]
+    backup.verify_backup(result["path"])
+
+    restored = str(tmp_path / "restored.db")
+    backup.restore_backup(result["path"], restored)
+    assert count_rows(restored) == 2000
+
+def test_backups_in_the_same_second_do_not_overwrite_each_other(database, tmp_path, monkeypatch):
+    backup_dir = str(tmp_path / "backups")
+    first = backup.create_backup(database, backup_dir)
+    second = backup.create_backup(database, backup_dir)
+    assert first["path"] != second["path"]
+    assert len(backup.list_backups(backup_dir)) == 2
+
+    # A repeated timestamp (the clock went back) is refused rather than replacing a backup
+    monkeypatch.setattr(backup, "backup_filename", lambda prefix, compress: os.path.basename(first["path"]))
+    with pytest.raises(backup.BackupError, match="already exists"):
+        backup.create_backup(database, backup_dir)
+    backup.verify_backup(first["path"])
+
+def test_backup_includes_uncheckpointed_wal_pages(tmp_path):
+    database = str(tmp_path / "wal.db")
+    make_database(database, rows=10)
+    writer = sqlite3.connect(database)
+    writer.execute("PRAGMA journal_mode=WAL")
+    writer.execute("PRAGMA wal_autocheckpoint=0")
+    writer.execute("INSERT INTO epics (title) VALUES ('only in the WAL')")
+    writer.commit()
+
+    result = backup.create_backup(database, str(tmp_path / "backups"), compress=False)
+    writer.close()
+    assert count_rows(result["path"]) == 11
+
+@pytest.mark.parametrize("journal_mode", ["wal", "delete"])
+def test_writers_are_not_blocked_while_backing_up(database, tmp_path, journal_mode):
+    conn = sqlite3.connect(database)
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    conn.close()
+    finished = threading.Event()
+    write_times = []
+
+    def write():
+        conn = sqlite3.connect(database, timeout=5)
+        while not finished.is_set():
+            started = time.monotonic()
+            conn.execute("INSERT INTO epics (title) VALUES ('written during backup')")
+            conn.commit()
+            write_times.append(time.monotonic() - started)
+            time.sleep(0.005)
+        conn.close()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        # Small steps with a pause between them, like a busy production database
+        result = backup.create_backup(database, str(tmp_path / "backups"), pages=8, pause=0.002)
+    finally:
+        finished.set()
+        writer.join()
+
+    assert write_times
+    assert max(write_times) < 1
+    backup.verify_backup(result["path"])
+    # Nothing but the finished backup is left behind
+    assert os.listdir(tmp_path / "backups") == [os.path.basename(result["path"])]
+
+def test_verify_detects_a_damaged_backup(database, tmp_path):
+    result = backup.create_backup(database, str(tmp_path / "backups"))
+    with gzip.open(result["path"], "rb") as f:
+        data = bytearray(f.read())
+    # Overwrite the header of a page in the middle of the table
+    data[4096 * 3: 4096 * 3 + 64] = b"\xff" * 64
+    with gzip.open(result["path"], "wb") as f:
+        f.write(bytes(data))
+
+    with pytest.raises(backup.BackupError):
+        backup.verify_backup(result["path"])
+
+    truncated = str(tmp_path / "backups" / "truncated.db.gz")
+    with open(result["path"], "rb") as source, open(truncated, "wb") as target:
+        target.write(source.read()[:100])
+    with pytest.raises(backup.BackupError):
+        backup.verify_backup(truncated)
+
+def test_prune_keeps_newest_and_recent_backups(tmp_path):
+    backup_dir = tmp_path / "backups"
+    backup_dir.mkdir()
+    now = datetime(2030, 1, 31, 12, 0)
+    for days_old in range(10):
+        path = backup_dir / backup.backup_filename(now=now - timedelta(days=days_old))
+        path.write_bytes(b"")
+        mtime = (now - timedelta(days=days_old)).timestamp()
+        os.utime(path, (mtime, mtime))
+    (backup_dir / "risk_tracker_pre_restore_20200101_000000.db.gz").write_bytes(b"")
+
+    deleted = backup.prune_backups(str(backup_dir), keep=3, max_age_days=5, now=now)
+
+    assert len(deleted) == 4
+    remaining = backup.list_backups(str(backup_dir), backup.BACKUP_PREFIX)
+    assert len(remaining) == 6
+    # Copies taken before a restore or migration are never pruned
+    assert (backup_dir / "risk_tracker_pre_restore_20200101_000000.db.gz").exists()
+
+def test_non_sqlite_databases_are_rejected():
+    with pytest.raises(backup.BackupError):
+        backup.sqlite_path_from_url("postgresql://localhost/risk_tracker")
+    assert backup.sqlite_path_from_url("sqlite:///./risk_tracker.db") == "./risk_tracker.db"
@@ -0,0 +1,81 @@
+import csv
+
+import pytest
+from sqlalchemy import event
+
+from app import bulk_import, models
+
+def write_csv(path, fieldnames, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+@pytest.fixture
+def db(db):
+    db.add(models.Epic(title="Existing epic", jira_epic_key="PLAT-1"))
+    db.commit()
+    return db
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_epics_and_risks_are_imported_in_batches(db, tmp_path, workers):
+    epics = write_csv(tmp_path / "epics.csv", ["title", "description", "target_launch_date", "status", "jira_epic_key"], [
+        {"title": f"Epic {n}", "description": "", "target_launch_date": "2030-01-15", "status": "",
+         "jira_epic_key": f"NEW-{n}"} for n in range(25)
+    ])
+    risks = write_csv(tmp_path / "risks.csv", ["epic_title", "epic_jira_key", "description", "mitigation_plan", "status"], [
+        {"epic_title": f"Epic {n % 25}", "epic_jira_key": "", "description": f"Risk {n}", "mitigation_plan": "",
+         "status": "Mitigating"} for n in range(100)
+    ] + [{"epic_title": "", "epic_jira_key": "PLAT-1", "description": "Keyed risk", "mitigation_plan": "", "status": ""}])
+
+    statements = []
+    event.listen(db.bind, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    index = bulk_import.EpicIndex(db)
+    epic_result = bulk_import.import_epics_csv(db, epics, chunk_rows=10, workers=workers, index=index)
+    risk_result = bulk_import.import_risks_csv(db, risks, chunk_rows=40, workers=workers, index=index)
+
+    assert epic_result["imported"] == 25 and epic_result["rejected"] == 0
+    assert risk_result["imported"] == 101 and risk_result["reject_file"] is None
+    # One index query, then one insert per chunk: 3 epic chunks and 3 risk chunks
+    assert len([s for s in statements if s.startswith("INSERT")]) == 6
+    assert len([s for s in statements if s.startswith("SELECT")]) == 1
+
+    epic = db.query(models.Epic).filter(models.Epic.jira_epic_key == "NEW-3").one()
+    assert epic.status == "Planned"
+    assert str(epic.target_launch_date) == "2030-01-15"
+    assert sorted(risk.description for risk in epic.risks) == ["Risk 28", "Risk 3", "Risk 53", "Risk 78"]
+    assert db.query(models.Risk).filter(models.Risk.description == "Keyed risk").one().epic.title == "Existing epic"
+
+def test_bad_rows_go_to_the_reject_file(db, tmp_path):
+    epics = write_csv(tmp_path / "epics.csv", ["title", "target_launch_date", "jira_epic_key"], [
+        {"title": "Good", "target_launch_date": "2030-01-15", "jira_epic_key": ""},
+        {"title": "Bad date", "target_launch_date": "soon", "jira_epic_key": ""},
+        {"title": "", "target_launch_date": "", "jira_epic_key": ""},
+        {"title": "Duplicate key", "target_launch_date": "", "jira_epic_key": "PLAT-1"},
+    ])
+    risks = write_csv(tmp_path / "risks.csv", ["epic_title", "description"], [
+        {"epic_title": "Good", "description": "Fine"},
+        {"epic_title": "Missing epic", "description": "Orphan"},
+        {"epic_title": "", "description": "No epic"},
+        {"epic_title": "Good", "description": ""},
+    ])
+
+    epic_result = bulk_import.import_epics_csv(db, epics)
+    risk_result = bulk_import.import_risks_csv(db, risks)
+
+    assert (epic_result["imported"], epic_result["rejected"]) == (1, 3)
+    assert (risk_result["imported"], risk_result["rejected"]) == (1, 3)
+    epic_rejects = read_csv(epic_result["reject_file"])
+    assert [(row["line"], row["title"]) for row in epic_rejects] == [("3", "Bad date"), ("4", ""), ("5", "Duplicate key")]
+    assert "target_launch_date" in epic_rejects[0]["error"]
+    assert epic_rejects[1]["error"].startswith("title")
+    assert "already exists" in epic_rejects[2]["error"]
+    risk_errors = {row["description"]: row["error"] for row in read_csv(risk_result["reject_file"])}
+    assert risk_errors["Orphan"] == "Epic not found: Missing epic"
+    assert "required" in risk_errors["No epic"]
+    assert risk_errors[""].startswith("description")
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, update
+
+from app import changes, crud, models, schemas
+from app.main import app, get_db
+
+client = TestClient(app)
+
+def ops(feed):
+    return [(change["entity"], change["entity_id"], change["op"]) for change in feed["changes"]]
+
+def test_every_write_path_is_recorded(db):
+    project = crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout", project_id=project.id))
+    risk = crud.create_risk(db, schemas.RiskCreate(description="Vendor delay"), epic_id=epic.id)
+    crud.create_risk_update(db, schemas.RiskUpdateCreate(update_text="Escalated"), risk_id=risk.id)
+    # Core bulk writes bypass the ORM but not the triggers
+    db.execute(insert(models.Epic), [{"title": "Bulk epic"}])
+    crud.update_epic(db, epic.id, schemas.EpicUpdate(status="At Risk"))
+    # Touching only updated_at is not a change
+    db.execute(update(models.Epic).where(models.Epic.id == epic.id).values(updated_at=datetime(2031, 1, 1)))
+    db.commit()
+    crud.delete_risk(db, risk.id)
+
+    feed = changes.get_changes(db)
+    assert ops(feed) == [
+        ("projects", 1, "insert"), ("epics", 1, "insert"), ("risks", 1, "insert"), ("risk_updates", 1, "insert"),
+        ("epics", 2, "insert"), ("epics", 1, "update"), ("risk_updates", 1, "delete"), ("risks", 1, "delete"),
+    ]
+    cursors = [change["cursor"] for change in feed["changes"]]
+    assert cursors == sorted(cursors) and feed["next_cursor"] == cursors[-1] and not feed["has_more"]
+    # Rows carry their current state and their project/epic scope
+    assert feed["changes"][1]["data"]["status"] == "At Risk"
+    assert feed["changes"][3]["data"] is None
+    assert (feed["changes"][3]["project_id"], feed["changes"][3]["epic_id"]) == (project.id, epic.id)
+
+    scoped = changes.get_changes(db, project_id=project.id)
+    assert ("epics", 2, "insert") not in ops(scoped)
+
+def test_paging_by_cursor(db):
+    for n in range(5):
+        crud.create_epic(db, schemas.EpicCreate(title=f"Epic {n}"))
+    first = changes.get_changes(db, limit=3)
+    second = changes.get_changes(db, since=first["next_cursor"], limit=3)
+    assert first["has_more"] and not second["has_more"]
+    assert [c["entity_id"] for c in first["changes"] + second["changes"]] == [1, 2, 3, 4, 5]
+    assert changes.get_changes(db, since=second["next_cursor"]) == {
+        "changes": [], "next_cursor": second["next_cursor"], "has_more": False,
+    }
+
+def test_compaction_keeps_latest_entry_per_row(db):
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout"))
+    doomed = crud.create_epic(db, schemas.EpicCreate(title="Doomed"))
+    for status in ("In Progress", "At Risk", "Launched"):
+        crud.update_epic(db, epic.id, schemas.EpicUpdate(status=status))
+    crud.delete_epic(db, doomed.id)
+    stale_cursor = changes.get_changes(db, limit=1)["next_cursor"]
+
+    result = changes.compact_change_log(db, now=datetime.utcnow() + timedelta(hours=25))
+    assert result == {"collapsed": 4, "tombstones_removed": 0, "horizon": 0}
+    assert ops(changes.get_changes(db)) == [("epics", 1, "update"), ("epics", 2, "delete")]
+    # Old cursors still see every row that changed after them
+    assert len(changes.get_changes(db, since=stale_cursor)["changes"]) == 2
+
+    result = changes.compact_change_log(db, now=datetime.utcnow() + timedelta(days=31))
+    assert result["tombstones_removed"] == 1
+    with pytest.raises(changes.CursorExpiredError):
+        changes.get_changes(db, since=stale_cursor)
+    # Cursor 0 is a full resync and is always valid
+    assert ops(changes.get_changes(db)) == [("epics", 1, "update")]
+
+def test_changes_endpoint(session_factory, db):
+    crud.create_epic(db, schemas.EpicCreate(title="Checkout"))
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        response = client.get("/api/changes", params={"since": 0, "limit": 10})
+        assert response.status_code == 200
+        [change] = response.json()["changes"]
+        assert change["data"]["title"] == "Checkout"
+        db.add(models.ChangeLogCompaction(horizon=50))
+        db.commit()
+        assert client.get("/api/changes", params={"since": 10}).status_code == 410
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,70 @@
+from datetime import date, datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import columnar, models
+
+@pytest.fixture
+def db(db):
+    session = db
+    project = models.Project(name="Platform", jira_project_key="PLAT")
+    session.add(project)
+    session.flush()
+    for n in range(30):
+        epic = models.Epic(title=f"Epic {n}", project_id=project.id, status=["Planned", "In Progress"][n % 2],
+                           target_launch_date=date(2030, 1, 1 + n % 28), created_at=datetime(2029, 6, 1, 12, 30))
+        session.add(epic)
+        session.flush()
+        risk = models.Risk(epic_id=epic.id, description=f"Risk {n}", status="Open", date_added=date(2029, 7, 1))
+        session.add(risk)
+        session.flush()
+        session.add(models.RiskUpdate(risk_id=risk.id, update_text=f"Update {n}", date_added=date(2029, 7, 2)))
+    session.commit()
+    return session
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_export_round_trips_all_tables(db, make_engine, tmp_path, file_format):
+    summary = columnar.export_tables(db, str(tmp_path), file_format, batch_rows=7)
+    assert {table: result["rows"] for table, result in summary.items()} == {
+        "projects": 1, "epics": 30, "risks": 30, "risk_updates": 30,
+    }
+
+    target = sessionmaker(autocommit=False, autoflush=False, bind=make_engine())()
+    loaded = columnar.import_tables(target, str(tmp_path), file_format, batch_rows=7)
+    assert loaded == {"projects": 1, "epics": 30, "risks": 30, "risk_updates": 30}
+    epic = target.get(models.Epic, 12)
+    assert (epic.title, epic.status, epic.target_launch_date) == ("Epic 11", "In Progress", date(2030, 1, 12))
+    assert epic.created_at.replace(tzinfo=None) == datetime(2029, 6, 1, 12, 30)
+    assert epic.risks[0].updates[0].update_text == "Update 11"
+
+def test_parquet_types_and_batches(db, tmp_path):
+    columnar.export_tables(db, str(tmp_path), batch_rows=7)
+    epics = pq.ParquetFile(columnar.export_path(str(tmp_path), "epics"))
+    schema = epics.schema_arrow
+
+    assert schema.field("target_launch_date").type == pa.date32()
+    assert schema.field("created_at").type == pa.timestamp("us", tz="UTC")
+    assert pa.types.is_dictionary(schema.field("status").type)
+    assert sorted(epics.read(columns=["status"]).column("status").chunk(0).dictionary.to_pylist()) == [
+        "In Progress", "Planned",
+    ]
+    # Written batch by batch rather than as one table
+    assert sum(epics.metadata.row_group(i).num_rows for i in range(epics.num_row_groups)) == 30
+    assert epics.num_row_groups == 5
+
+def test_import_refuses_to_mix_with_existing_rows(db, tmp_path):
+    columnar.export_tables(db, str(tmp_path))
+    with pytest.raises(columnar.ColumnarImportError, match="already contain data"):
+        columnar.import_tables(db, str(tmp_path))
+
+    db.add(models.Epic(title="Added after export"))
+    db.commit()
+    assert columnar.import_tables(db, str(tmp_path), replace=True)["epics"] == 30
+    assert db.query(models.Epic).filter(models.Epic.title == "Added after export").count() == 0
+
+def test_import_needs_every_file(session_factory, tmp_path):
+    with pytest.raises(columnar.ColumnarImportError, match="Missing export files"):
+        columnar.import_tables(session_factory(), str(tmp_path))
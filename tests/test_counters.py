@@ -0,0 +1,132 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert, text
+
+from app import counters, crud, models, schemas
+from app.main import app, get_db
+
+client = TestClient(app)
+
+def epic_counts(db, epic_id):
+    epic = db.get(models.Epic, epic_id)
+    db.refresh(epic)
+    return epic.risk_count, epic.open_risk_count
+
+def test_counters_follow_every_write_path(db):
+    platform = crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+    mobile = crud.create_project(db, schemas.ProjectCreate(name="Mobile"))
+    checkout = crud.create_epic(db, schemas.EpicCreate(title="Checkout", project_id=platform.id))
+    search = crud.create_epic(db, schemas.EpicCreate(title="Search", project_id=platform.id))
+    first = crud.create_risk(db, schemas.RiskCreate(description="Vendor delay"), epic_id=checkout.id)
+    second = crud.create_risk(db, schemas.RiskCreate(description="Capacity", status="Mitigating"), epic_id=checkout.id)
+    # Core bulk inserts, as the importers write, go through the same triggers
+    db.execute(insert(models.Risk), [{"epic_id": search.id, "description": "Legacy", "status": "Closed"}])
+    db.commit()
+    assert epic_counts(db, checkout.id) == (2, 2) and epic_counts(db, search.id) == (1, 0)
+
+    crud.update_risk(db, first.id, schemas.RiskUpdate(status="Mitigated"))
+    assert epic_counts(db, checkout.id) == (2, 1)
+    db.query(models.Risk).filter(models.Risk.id == second.id).update({"epic_id": search.id})
+    db.commit()
+    assert epic_counts(db, checkout.id) == (1, 0) and epic_counts(db, search.id) == (2, 1)
+    crud.delete_risk(db, second.id)
+    assert epic_counts(db, search.id) == (1, 0)
+
+    crud.update_epic(db, search.id, schemas.EpicUpdate(project_id=mobile.id))
+    crud.create_epic(db, schemas.EpicCreate(title="Wallet", project_id=mobile.id))
+    crud.delete_epic(db, checkout.id)
+    db.expire_all()
+    assert (db.get(models.Project, platform.id).epic_count, db.get(models.Project, mobile.id).epic_count) == (0, 2)
+
+    risk = crud.create_risk(db, schemas.RiskCreate(description="Store review"), epic_id=search.id)
+    earlier = crud.create_risk_update(db, schemas.RiskUpdateCreate(update_text="Submitted"), risk_id=risk.id)
+    later = models.RiskUpdate(risk_id=risk.id, update_text="Escalated", created_at=datetime(2030, 1, 1))
+    db.add(later)
+    db.commit()
+    db.refresh(risk)
+    assert risk.last_update_at == datetime(2030, 1, 1)
+    db.delete(later)
+    db.commit()
+    db.refresh(risk)
+    assert risk.last_update_at == earlier.created_at
+    assert all(result["mismatched"] == 0 for result in counters.verify_counters(db).values())
+
+def test_verify_reports_and_repairs_drift(db):
+    project = crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout", project_id=project.id))
+    risk = crud.create_risk(db, schemas.RiskCreate(description="Vendor delay"), epic_id=epic.id)
+    crud.create_risk_update(db, schemas.RiskUpdateCreate(update_text="Called vendor"), risk_id=risk.id)
+    # Writes made with the triggers missing, e.g. a restore from an old dump
+    db.execute(text("UPDATE epics SET risk_count = 7, open_risk_count = 0"))
+    db.execute(text("UPDATE projects SET epic_count = 0"))
+    db.execute(text("UPDATE risks SET last_update_at = NULL"))
+    db.commit()
+
+    report = counters.verify_counters(db)
+    assert {table: result["mismatched"] for table, result in report.items()} == {"epics": 1, "projects": 1, "risks": 1}
+    assert report["epics"]["sample"] == [{"id": epic.id, "stored_risk_count": 7, "risk_count": 1,
+                                          "stored_open_risk_count": 0, "open_risk_count": 1}]
+    counters.verify_counters(db, repair=True)
+    assert all(result["mismatched"] == 0 for result in counters.verify_counters(db).values())
+    assert epic_counts(db, epic.id) == (1, 1)
+
+def test_list_endpoints_sort_and_filter_on_counters(session_factory, db):
+    small = crud.create_project(db, schemas.ProjectCreate(name="Small"))
+    large = crud.create_project(db, schemas.ProjectCreate(name="Large"))
+    calm = crud.create_epic(db, schemas.EpicCreate(title="Calm", project_id=small.id))
+    busy = crud.create_epic(db, schemas.EpicCreate(title="Busy", project_id=large.id))
+    crud.create_epic(db, schemas.EpicCreate(title="Idle", project_id=large.id))
+    crud.create_risk(db, schemas.RiskCreate(description="Closed", status="Closed"), epic_id=calm.id)
+    quiet = crud.create_risk(db, schemas.RiskCreate(description="Quiet"), epic_id=busy.id)
+    noisy = crud.create_risk(db, schemas.RiskCreate(description="Noisy"), epic_id=busy.id)
+    db.add(models.RiskUpdate(risk_id=noisy.id, update_text="Escalated", created_at=datetime(2025, 3, 2)))
+    db.commit()
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        epics = client.get("/api/epics", params={"sort": "open_risk_count", "min_open_risks": 1}).json()
+        assert [(epic["title"], epic["risk_count"], epic["open_risk_count"]) for epic in epics] == [("Busy", 2, 2)]
+        assert [epic["title"] for epic in client.get("/api/epics", params={"sort": "risk_count"}).json()] == \
+            ["Busy", "Calm", "Idle"]
+        assert [project["epic_count"] for project in client.get("/api/projects", params={"sort": "epic_count"}).json()] == [2, 1]
+
+        risks = client.get("/api/risks", params={"epic_id": busy.id, "sort": "last_update_at"}).json()
+        assert [risk["id"] for risk in risks] == [noisy.id, quiet.id]
+        assert risks[0]["last_update_at"] == "2025-03-02T00:00:00" and "updates" not in risks[0]
+        stale = client.get("/api/risks", params={"status": "Open", "updated_before": "2025-03-05T00:00:00"}).json()
+        assert {risk["id"] for risk in stale} == {noisy.id, quiet.id}
+        assert client.get("/api/risks", params={"updated_since": "2025-03-05T00:00:00"}).json() == []
+        assert client.get("/api/epics", params={"min_open_risks": -1}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
+
+def test_project_page_counts_risks_without_loading_them(session_factory, db):
+    project = crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout", project_id=project.id))
+    for n in range(3):
+        crud.create_risk(db, schemas.RiskCreate(description=f"Risk {n}"), epic_id=epic.id)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        response = client.get(f"/projects/{project.id}")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200 and "<strong>Risks:</strong><br> 3" in response.text
+    assert not [sql for sql in statements if "FROM risks" in sql]
@@ -0,0 +1,114 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, email_service, models, scheduler
+
+TODAY = date(2030, 3, 1)
+NOW = datetime.now(timezone.utc)
+
+class FakeTransport:
+    """Stands in for SMTPTransport; every instance is one SMTP session."""
+    instances = []
+
+    def __init__(self, settings):
+        self.sent = []
+        self.closed = False
+        FakeTransport.instances.append(self)
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def close(self):
+        self.closed = True
+
+@pytest.fixture
+def session_factory(session_factory, monkeypatch):
+    monkeypatch.setattr(scheduler, "SessionLocal", session_factory)
+    monkeypatch.setattr(email_service, "_settings", email_service.EmailSettings(
+        smtp_username="bot", smtp_password="secret", manager_email="manager@example.com",
+    ))
+    monkeypatch.setattr(email_service, "SMTPTransport", FakeTransport)
+    FakeTransport.instances = []
+
+    db = session_factory()
+    platform = models.Project(name="Platform", jira_project_key="PLAT")
+    mobile = models.Project(name="Mobile")
+    db.add_all([platform, mobile])
+    db.flush()
+
+    def epic(title, days, project, status="In Progress"):
+        db_epic = models.Epic(title=title, project_id=project.id, status=status,
+                              target_launch_date=TODAY + timedelta(days=days))
+        db.add(db_epic)
+        db.flush()
+        return db_epic
+
+    due = epic("Due soon", 3, platform)
+    epic("Due later", 60, platform)
+    epic("Already launched", 2, platform, status="Launched")
+    mobile_epic = epic("Mobile release", 10, mobile)
+
+    def risk(db_epic, description, days_since_update=None, status="Open", created_days_ago=30):
+        db_risk = models.Risk(epic_id=db_epic.id, description=description, status=status,
+                              created_at=NOW - timedelta(days=created_days_ago))
+        db.add(db_risk)
+        db.flush()
+        if days_since_update is not None:
+            db.add(models.RiskUpdate(risk_id=db_risk.id, update_text="Checked",
+                                     created_at=NOW - timedelta(days=days_since_update)))
+
+    risk(due, "Never updated")
+    risk(due, "Recently updated", days_since_update=1)
+    risk(due, "Updated long ago", days_since_update=40)
+    risk(due, "Closed and quiet", status="Closed")
+    risk(due, "Brand new", created_days_ago=0)
+    risk(mobile_epic, "Mobile quiet risk", days_since_update=20)
+    db.commit()
+    db.close()
+    return session_factory
+
+def test_digest_queries_select_only_candidates(session_factory):
+    db = session_factory()
+    deadlines = crud.get_upcoming_deadlines(db, TODAY, TODAY + timedelta(days=14))
+    stale = crud.get_stale_risks(db, NOW - timedelta(days=14))
+    db.close()
+
+    assert [(row.title, row.open_risks) for row in deadlines] == [("Due soon", 4), ("Mobile release", 1)]
+    assert [row.description for row in stale] == ["Updated long ago", "Never updated", "Mobile quiet risk"]
+    assert stale[0].epic_title == "Due soon"
+
+def test_digest_queries_do_not_load_relationships(session_factory):
+    db = session_factory()
+    statements = []
+    event.listen(db.bind, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    crud.get_upcoming_deadlines(db, TODAY, TODAY + timedelta(days=14))
+    crud.get_stale_risks(db, NOW - timedelta(days=14))
+    db.close()
+    assert len(statements) == 2
+
+def test_digest_is_grouped_per_recipient_and_sent_over_one_session(session_factory, monkeypatch):
+    monkeypatch.setattr(scheduler, "DIGEST_RECIPIENTS", "PLAT=lead@example.com,pm@example.com")
+
+    summary = scheduler.send_digest(today=TODAY)
+
+    assert summary == {"recipients": 3, "failed": 0, "deadlines": 2, "stale_risks": 3}
+    [transport] = FakeTransport.instances
+    assert transport.closed
+    by_recipient = {message["To"]: message.get_payload(decode=True).decode() for message in transport.sent}
+    assert set(by_recipient) == {"lead@example.com", "pm@example.com", "manager@example.com"}
+    assert "Due soon" in by_recipient["lead@example.com"]
+    assert "Mobile release" not in by_recipient["lead@example.com"]
+    assert "Mobile quiet risk" in by_recipient["manager@example.com"]
+    assert "Due soon" not in by_recipient["manager@example.com"]
+
+def test_digest_is_skipped_without_mail_settings(session_factory, monkeypatch):
+    monkeypatch.setattr(email_service, "_settings", email_service.EmailSettings())
+    assert scheduler.send_digest(today=TODAY) is None
+    assert FakeTransport.instances == []
+
+def test_parse_digest_recipients():
+    assert scheduler.parse_digest_recipients(" PLAT = a@x.com, b@x.com ;Mobile=c@x.com;;broken") == {
+        "PLAT": ["a@x.com", "b@x.com"], "Mobile": ["c@x.com"],
+    }
@@ -0,0 +1,160 @@
+import asyncio
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from app import email_service
+
+# --- Local SMTP stand-in ---
+
+class RecordingHandler:
+    """Accepts every message, optionally answering the first few with a transient 451."""
+
+    def __init__(self):
+        self.messages = []
+        self.transient_failures = 0
+        self.rejected_recipients = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rejected_recipients:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.transient_failures:
+            self.transient_failures -= 1
+            return "451 Try again later"
+        self.messages.append(envelope.content.decode())
+        return "250 OK"
+
+class SMTPStandIn:
+    def __init__(self):
+        self.handler = RecordingHandler()
+        self.logins = 0
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.controller = Controller(
+            self.handler, hostname="127.0.0.1", port=self.port,
+            authenticator=self._authenticate, auth_require_tls=False,
+        )
+
+    def _authenticate(self, server, session, envelope, mechanism, auth_data):
+        self.logins += 1
+        return AuthResult(success=auth_data.password == b"secret")
+
+@pytest.fixture
+def smtp_server():
+    server = SMTPStandIn()
+    server.controller.start()
+    yield server
+    server.controller.stop()
+
+@pytest.fixture
+def settings(smtp_server):
+    return email_service.EmailSettings(
+        smtp_server="127.0.0.1", smtp_port=smtp_server.port, smtp_username="bot", smtp_password="secret",
+        manager_email="manager@example.com", start_tls=False, max_connections=2, backoff_base=0.01,
+    )
+
+def make_message(n):
+    message = email_service.MIMEText(f"Body {n}")
+    message["From"] = "noreply@example.com"
+    message["To"] = "manager@example.com"
+    message["Subject"] = f"Message {n}"
+    return message
+
+def test_connection_is_reused_across_messages(smtp_server, settings):
+    transport = email_service.SMTPTransport(settings)
+
+    async def run():
+        for n in range(5):
+            await transport.send(make_message(n))
+        await transport.close()
+
+    asyncio.run(run())
+
+    assert len(smtp_server.handler.messages) == 5
+    assert smtp_server.logins == 1
+    assert transport.metrics()["connections_opened"] == 1
+
+def test_concurrent_sends_are_bounded(smtp_server, settings):
+    transport = email_service.SMTPTransport(settings)
+
+    async def run():
+        await asyncio.gather(*(transport.send(make_message(n)) for n in range(10)))
+        await transport.close()
+
+    asyncio.run(run())
+
+    assert len(smtp_server.handler.messages) == 10
+    assert transport.metrics()["connections_opened"] <= settings.max_connections
+
+def test_dropped_and_stale_connections_are_replaced(smtp_server, settings):
+    now = [0.0]
+    transport = email_service.SMTPTransport(settings, clock=lambda: now[0])
+
+    async def run():
+        await transport.send(make_message(1))
+        # The server went away while the connection sat idle
+        transport._idle[0][0].close()
+        await transport.send(make_message(2))
+        # Long idle: health-checked with NOOP and reused
+        now[0] += settings.healthcheck_idle_seconds + 1
+        await transport.send(make_message(3))
+        await transport.close()
+
+    asyncio.run(run())
+
+    assert len(smtp_server.handler.messages) == 3
+    assert transport.metrics()["connections_opened"] == 2
+
+def test_transient_failures_are_retried_with_backoff(smtp_server, settings):
+    smtp_server.handler.transient_failures = 2
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    transport = email_service.SMTPTransport(settings, sleep=sleep)
+
+    async def run():
+        await transport.send(make_message(1))
+        await transport.close()
+
+    asyncio.run(run())
+
+    assert len(smtp_server.handler.messages) == 1
+    assert len(sleeps) == 2
+    assert transport.metrics()["retries_total"] == 2
+
+def test_retries_can_be_turned_off_per_send(smtp_server, settings):
+    smtp_server.handler.transient_failures = 1
+    transport = email_service.SMTPTransport(settings)
+
+    async def run():
+        with pytest.raises(email_service.aiosmtplib.SMTPResponseException):
+            await transport.send(make_message(1), max_retries=0)
+        await transport.send(make_message(2), max_retries=0)
+        await transport.close()
+
+    asyncio.run(run())
+    assert len(smtp_server.handler.messages) == 1
+    assert transport.metrics()["retries_total"] == 0
+
+def test_permanent_failures_are_not_retried(smtp_server, settings):
+    smtp_server.handler.rejected_recipients.add("manager@example.com")
+    transport = email_service.SMTPTransport(settings)
+
+    async def run():
+        with pytest.raises(email_service.aiosmtplib.SMTPRecipientsRefused):
+            await transport.send(make_message(1))
+        await transport.close()
+
+    asyncio.run(run())
+    assert transport.metrics()["retries_total"] == 0
+    # The connection itself is fine and goes back to the pool
+    assert transport.metrics()["connections_opened"] == 1
@@ -0,0 +1,86 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+
+from app import crud, models, reference_data, schemas
+from app.main import app, get_db
+
+client = TestClient(app)
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: executed.append(sql))
+    return executed
+
+def add_risks(db, epic, count):
+    for n in range(count):
+        risk = crud.create_risk(db, schemas.RiskCreate(description=f"Risk {n}"), epic_id=epic.id)
+        for text in ("Raised", "Escalated"):
+            crud.create_risk_update(db, schemas.RiskUpdateCreate(update_text=text), risk_id=risk.id)
+
+def test_epic_page_loads_in_a_fixed_number_of_queries(session_factory, db, statements, monkeypatch):
+    project = crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+    small = crud.create_epic(db, schemas.EpicCreate(title="Small", project_id=project.id))
+    large = crud.create_epic(db, schemas.EpicCreate(title="Large", project_id=project.id))
+    add_risks(db, small, 1)
+    add_risks(db, large, 5)
+    monkeypatch.setattr(reference_data, "project_choices", reference_data.ProjectChoicesCache())
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def page_queries(epic_id):
+        statements.clear()
+        response = client.get(f"/epics/{epic_id}")
+        assert response.status_code == 200
+        return [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")], response.text
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        page_queries(small.id)
+        small_queries, _ = page_queries(small.id)
+        large_queries, html = page_queries(large.id)
+    finally:
+        app.dependency_overrides.clear()
+    # Epic with project, risks, updates, and the cache's version check
+    assert len(small_queries) == len(large_queries) == 4
+    assert html.count("Updates (2)") == 5 and "Platform" in html
+
+def test_loader_returns_the_whole_tree(db, statements):
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout"))
+    epic_id = epic.id
+    add_risks(db, epic, 3)
+    db.expunge_all()
+    statements.clear()
+
+    loaded = crud.get_epic_detail(db, epic_id)
+    db.expunge_all()
+    # Detached, so any lazy load left would raise
+    assert [len(risk.updates) for risk in loaded.risks] == [2, 2, 2] and loaded.project is None
+    assert len(statements) == 3
+    assert crud.get_epic_detail(db, 999) is None
+
+def test_project_choices_reload_only_after_project_writes(db, statements):
+    cache = reference_data.ProjectChoicesCache()
+    crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+    assert cache.get(db) == [(1, "Platform")]
+
+    crud.create_epic(db, schemas.EpicCreate(title="Checkout", project_id=1))
+    statements.clear()
+    assert cache.get(db) == [(1, "Platform")]
+    # Only the version check
+    assert len(statements) == 1
+
+    crud.update_project(db, 1, schemas.ProjectUpdate(name="Core Platform"))
+    assert cache.get(db) == [(1, "Core Platform")]
+    # Writes that bypass crud are seen too
+    db.execute(insert(models.Project), [{"name": "Imported"}])
+    db.commit()
+    assert [choice.name for choice in cache.get(db)] == ["Core Platform", "Imported"]
+    crud.delete_project(db, 2)
+    assert cache.get(db) == [(1, "Core Platform")]
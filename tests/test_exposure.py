@@ -0,0 +1,84 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app import crud, exposure, models, schemas
+from app.main import app, get_db
+
+client = TestClient(app)
+
+def scores(db):
+    return {row.epic_id: row.score for row in db.query(models.EpicExposure)}
+
+def test_compute_scores_ranks_each_input():
+    nan = np.nan
+    result = exposure.compute_scores(
+        epic_ids=np.array([1, 2, 3, 4, 5]),
+        statuses=np.array(["Planned", "Blocked", "Planned", "Planned", "Launched"], dtype=object),
+        days_to_launch=np.array([nan, nan, -3, 200, -3]),
+        closed=np.array([False, False, False, False, True]),
+        risk_epic_ids=np.array([1, 1, 4, 5]),
+        risk_age_days=np.array([10.0, 30.0, 200.0, 10.0]),
+        risk_idle_days=np.array([40.0, 2.0, 90.0, 1.0]),
+    )
+    assert result["open_risks"].tolist() == [2, 0, 0, 1, 1]
+    assert result["mean_risk_age_days"][0] == 20 and np.isnan(result["mean_risk_age_days"][1])
+    # The most recent update counts
+    assert result["days_since_update"][0] == 2
+    score = result["score"]
+    # Status alone (Blocked), then status plus an overdue launch; closed epics score nothing
+    assert score[1] == 15 and score[2] == 21.5 and score[4] == 0
+    # A risk that old and stale outweighs a launch that far off
+    assert score[3] > score[2] and score.max() <= 100
+
+def test_refresh_rescores_only_touched_epics(db):
+    quiet = crud.create_epic(db, schemas.EpicCreate(title="Quiet"))
+    busy = crud.create_epic(db, schemas.EpicCreate(title="Busy", target_launch_date=date.today() + timedelta(days=5)))
+    now = datetime.utcnow()
+
+    assert exposure.refresh(db, now=now) == {"epics_scored": 2, "full": True}
+    assert exposure.refresh(db, now=now) == {"epics_scored": 0, "full": False}
+    before = scores(db)
+
+    risk = crud.create_risk(db, schemas.RiskCreate(description="Vendor delay"), epic_id=busy.id)
+    crud.create_risk_update(db, schemas.RiskUpdateCreate(update_text="Escalated"), risk_id=risk.id)
+    assert exposure.refresh(db, now=now) == {"epics_scored": 1, "full": False}
+    after = scores(db)
+    assert after[quiet.id] == before[quiet.id] and after[busy.id] > before[busy.id]
+
+    crud.delete_epic(db, busy.id)
+    exposure.refresh(db, now=now)
+    assert set(scores(db)) == {quiet.id}
+    # Ages and deadlines move overnight, so a new day rescores everything
+    assert exposure.refresh(db, now=now + timedelta(days=1)) == {"epics_scored": 1, "full": True}
+
+def test_epics_sorted_by_exposure(session_factory, db):
+    calm = crud.create_epic(db, schemas.EpicCreate(title="Calm"))
+    hot = crud.create_epic(db, schemas.EpicCreate(title="Hot", status="Blocked",
+                                                  target_launch_date=date.today() - timedelta(days=1)))
+    for n in range(3):
+        crud.create_risk(db, schemas.RiskCreate(description=f"Risk {n}"), epic_id=hot.id)
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        # Unscored until the refresh runs; the request itself writes nothing
+        epics = client.get("/api/epics", params={"sort": "exposure"}).json()
+        assert [(epic["id"], epic["exposure_score"]) for epic in epics] == [(calm.id, None), (hot.id, None)]
+        assert db.query(models.EpicExposure).count() == 0
+
+        exposure.refresh(db)
+        epics = client.get("/api/epics", params={"sort": "exposure"}).json()
+        assert [epic["id"] for epic in epics] == [hot.id, calm.id]
+        assert epics[0]["exposure_score"] > epics[1]["exposure_score"] > 0
+        assert client.get("/api/epics").json()[0]["exposure_score"] is None
+        assert client.get("/api/epics", params={"sort": "title"}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app import crud, jira_service, models
+from fake_jira_server import FakeJiraData, FakeJiraServer
+
+@pytest.fixture
+def fake_jira(monkeypatch):
+    fake = FakeJiraServer(FakeJiraData(projects=2, epics_per_project=250, children_per_epic=3)).start()
+    # The default client rate limit would make the test wait rather than exercise the sync
+    monkeypatch.setitem(jira_service._throttles, fake.url,
+                        jira_service.JiraRequestThrottle(fake.url, rate=1000, burst=1000))
+    monkeypatch.setenv("JIRA_SERVER", fake.url)
+    monkeypatch.setenv("JIRA_USERNAME", "load@example.com")
+    monkeypatch.setenv("JIRA_API_TOKEN", "fake")
+    yield fake
+    jira_service.jira_client_manager.invalidate()
+    fake.stop()
+
+def test_import_pages_through_fake_jira(db, fake_jira):
+    result = jira_service.import_epics_from_jira(db, "LOAD1")
+
+    assert result["project_name"] == "Load Test Project 1"
+    assert result["imported"] == result["total_found"] == 250
+    assert db.query(models.Epic).count() == 250
+    epic = crud.get_epic_by_jira_key(db, "LOAD1-250")
+    assert epic.title == "Epic 250 of LOAD1"
+    assert epic.child_issues_total == 3
+    assert 0 <= epic.child_issues_done <= 3
+
+    changed = fake_jira.data.touch(0.1)
+    result = jira_service.import_epics_from_jira(db, "LOAD1")
+    assert result["imported"] == 0
+    assert result["updated"] <= changed
+    assert result["updated"] + result["unchanged"] == 250
+
+def test_unknown_project_is_not_found(db, fake_jira):
+    with pytest.raises(ValueError):
+        jira_service.import_epics_from_jira(db, "NOPE")
+
+def test_updated_filter_and_paging():
+    data = FakeJiraData(projects=1, epics_per_project=30)
+    assert data.search('project = "LOAD1" AND updated >= "2999-01-01"', 0, 50)["total"] == 0
+
+    changed = data.touch(0.1)
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    recent = data.search(f'project = "LOAD1" AND updated >= "{today}"', 0, 50)
+    assert recent["total"] == changed == 3
+    page = data.search('project = "LOAD1" AND issuetype = Epic', 20, 50, fields=["summary"])
+    assert len(page["issues"]) == 10
+    assert set(page["issues"][0]["fields"]) == {"summary"}
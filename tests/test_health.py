@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import health
+from app.main import app
+
+client = TestClient(app)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def counting(result=None, error=None, delay=0):
+    def check():
+        check.calls += 1
+        if delay:
+            time.sleep(delay)
+        if error:
+            raise error
+        return result
+    check.calls = 0
+    return check
+
+def test_critical_and_optional_failures():
+    checker = health.HealthChecker({
+        "database": (counting({"schema_version": 3}), True),
+        "jira": (counting(error=ConnectionRefusedError("refused")), False),
+        "smtp": (counting(error=health.CheckSkipped("SMTP_USERNAME is not set")), False),
+    })
+    report = asyncio.run(checker.report())
+    assert (report["status"], report["ready"]) == ("degraded", True)
+    assert report["checks"]["database"]["schema_version"] == 3
+    assert report["checks"]["jira"] == {"critical": False, "status": "fail", "error": "refused",
+                                        "latency_ms": report["checks"]["jira"]["latency_ms"]}
+    assert report["checks"]["smtp"]["status"] == "skipped"
+
+    checker = health.HealthChecker({"database": (counting(error=RuntimeError("locked")), True)})
+    report = asyncio.run(checker.report())
+    assert (report["status"], report["ready"]) == ("fail", False)
+
+def test_slow_check_times_out():
+    checker = health.HealthChecker({"smtp": (counting(delay=0.5), False)}, timeout_seconds=0.05)
+    report = asyncio.run(checker.report())
+    assert report["checks"]["smtp"]["status"] == "fail"
+    assert "Timed out" in report["checks"]["smtp"]["error"]
+
+def test_reports_are_cached_and_shared():
+    clock = FakeClock()
+    check = counting({}, delay=0.05)
+    checker = health.HealthChecker({"database": (check, True)}, cache_seconds=5, clock=clock)
+
+    async def burst():
+        return await asyncio.gather(*(checker.report() for _ in range(20)))
+
+    reports = asyncio.run(burst())
+    assert check.calls == 1 and all(report is reports[0] for report in reports)
+    clock.now = 4
+    asyncio.run(checker.report())
+    assert check.calls == 1
+    clock.now = 6
+    asyncio.run(checker.report())
+    assert check.calls == 2
+
+def test_database_check_reads_no_tables(session_factory):
+    details = health.check_database(session_factory)
+    assert details["schema_version"] is None and details["latest_schema_version"] >= 1
+
+def test_endpoints(monkeypatch):
+    assert client.get("/healthz").json()["status"] == "ok"
+    monkeypatch.setattr(health, "health_checker", health.HealthChecker({"database": (counting({}), True)}))
+    assert client.get("/readyz").status_code == 200
+    monkeypatch.setattr(health, "health_checker", health.HealthChecker({"scheduler": (counting(error=RuntimeError("stopped")), True)}))
+    response = client.get("/readyz")
+    assert response.status_code == 503 and response.json()["checks"]["scheduler"]["error"] == "stopped"
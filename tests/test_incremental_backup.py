@@ -0,0 +1,101 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import incremental_backup
+from app.backup import BackupError
+
+START = datetime(2030, 1, 1, 9, 0)
+
+def titles(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT title FROM epics ORDER BY id")]
+    finally:
+        conn.close()
+
+def execute(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "risk_tracker.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE epics (id INTEGER PRIMARY KEY, title TEXT, body TEXT)")
+    conn.executemany("INSERT INTO epics (title, body) VALUES (?, ?)", [(f"Epic {n}", "x" * 500) for n in range(2000)])
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def chain_dir(tmp_path):
+    return str(tmp_path / "incremental")
+
+def test_deltas_store_only_changed_pages(database, chain_dir):
+    base = incremental_backup.create_incremental_backup(database, chain_dir, now=START)
+    execute(database, "UPDATE epics SET title = 'Renamed' WHERE id = 1000")
+    delta = incremental_backup.create_incremental_backup(database, chain_dir, now=START + timedelta(hours=1))
+    unchanged = incremental_backup.create_incremental_backup(database, chain_dir, now=START + timedelta(hours=2))
+
+    assert base["kind"] == "base"
+    assert base["pages_written"] == base["page_count"]
+    assert delta["kind"] == "delta"
+    # The changed leaf page and the header page
+    assert delta["pages_written"] <= 3
+    assert delta["bytes"] < base["bytes"] / 10
+    assert unchanged["pages_written"] == 0
+
+def test_restore_to_any_point_in_time(database, chain_dir, tmp_path):
+    snapshots = []
+    for hour in range(4):
+        if hour:
+            execute(database, "UPDATE epics SET title = ? WHERE id = ?", (f"Changed at {hour}", hour * 100))
+            execute(database, "INSERT INTO epics (title, body) VALUES (?, ?)", (f"New at {hour}", "y" * 4000))
+        if hour == 3:
+            execute(database, "DELETE FROM epics WHERE id > 1500")
+            execute(database, "VACUUM")
+        incremental_backup.create_incremental_backup(database, chain_dir, now=START + timedelta(hours=hour))
+        snapshots.append(titles(database))
+
+    for hour, expected in enumerate(snapshots):
+        output = str(tmp_path / f"restored_{hour}.db")
+        # Any time after a backup restores that backup
+        entry = incremental_backup.reconstruct(START + timedelta(hours=hour, minutes=30), output, chain_dir)
+        assert entry["created_at"] == (START + timedelta(hours=hour)).isoformat()
+        assert titles(output) == expected
+
+    with pytest.raises(BackupError):
+        incremental_backup.reconstruct(START - timedelta(minutes=1), str(tmp_path / "too_early.db"), chain_dir)
+
+def test_restore_at_replaces_the_live_database(database, chain_dir):
+    incremental_backup.create_incremental_backup(database, chain_dir, now=START)
+    execute(database, "DELETE FROM epics")
+
+    incremental_backup.restore_at(START + timedelta(minutes=5), database, chain_dir)
+    assert len(titles(database)) == 2000
+    assert not os.path.exists(os.path.join(chain_dir, ".restore.db"))
+
+def test_new_chain_after_full_every_and_pruning(database, chain_dir):
+    for hour in range(7):
+        execute(database, "UPDATE epics SET title = ? WHERE id = 1", (f"Hour {hour}",))
+        incremental_backup.create_incremental_backup(database, chain_dir, full_every=2, now=START + timedelta(hours=hour))
+
+    kinds = [entry["kind"] for entry in incremental_backup.list_restore_points(chain_dir)]
+    assert kinds == ["base", "delta", "delta", "base", "delta", "delta", "base"]
+
+    deleted = incremental_backup.prune_chains(chain_dir, keep_chains=2)
+    assert len(deleted) == 3
+    points = incremental_backup.list_restore_points(chain_dir)
+    assert [entry["kind"] for entry in points] == ["base", "delta", "delta", "base"]
+    assert all(os.path.exists(os.path.join(chain_dir, entry["file"])) for entry in points)
+
+def test_lost_digests_fall_back_to_a_full_base(database, chain_dir):
+    incremental_backup.create_incremental_backup(database, chain_dir, now=START)
+    os.remove(os.path.join(chain_dir, incremental_backup.HASHES_NAME))
+    entry = incremental_backup.create_incremental_backup(database, chain_dir, now=START + timedelta(hours=1))
+    assert entry["kind"] == "base"
@@ -0,0 +1,337 @@
+import pytest
+import requests
+from sqlalchemy import event
+
+from app import crud, jira_service, models, schemas
+
+# --- Fake Jira client ---
+# Records how often the manager connects and health-checks, without any network access.
+
+class FakeJira:
+    instances = []
+
+    def __init__(self, server, basic_auth, timeout=None, max_retries=3):
+        self.server = server
+        self.basic_auth = basic_auth
+        self.server_info_calls = 0
+        self.closed = False
+        self.healthy = True
+        self._session = FakeSession()
+        FakeJira.instances.append(self)
+
+    def server_info(self):
+        self.server_info_calls += 1
+        if not self.healthy:
+            raise ConnectionError("Jira went away")
+        return {"deploymentType": "Server"}
+
+    def close(self):
+        self.closed = True
+
+class FakeSession:
+    def __init__(self):
+        self.adapters = {}
+
+    def mount(self, prefix, adapter):
+        self.adapters[prefix] = adapter
+
+@pytest.fixture
+def manager(monkeypatch):
+    FakeJira.instances = []
+    monkeypatch.setattr(jira_service, "JIRA", FakeJira)
+    monkeypatch.setenv("JIRA_SERVER", "https://jira.example.com")
+    monkeypatch.setenv("JIRA_USERNAME", "bot@example.com")
+    monkeypatch.setenv("JIRA_API_TOKEN", "token-1")
+    return jira_service.JiraClientManager(idle_check_seconds=60)
+
+def test_client_is_reused_between_calls(manager):
+    first = manager.get_client()
+    second = manager.get_client()
+
+    assert first is second
+    assert len(FakeJira.instances) == 1
+    # No extra health check round trip while the client is in active use
+    assert first.server_info_calls == 0
+    assert "https://" in first._session.adapters
+
+def test_idle_client_is_health_checked_and_rebuilt(manager):
+    client = manager.get_client()
+    client.healthy = False
+    manager._last_used -= 120  # Pretend the client has been idle for two minutes
+
+    rebuilt = manager.get_client()
+
+    assert client.server_info_calls == 1
+    assert client.closed
+    assert rebuilt is not client
+
+def test_client_is_rebuilt_when_credentials_change(manager, monkeypatch):
+    client = manager.get_client()
+    monkeypatch.setenv("JIRA_API_TOKEN", "token-2")
+
+    rebuilt = manager.get_client()
+
+    assert rebuilt is not client
+    assert rebuilt.basic_auth == ("bot@example.com", "token-2")
+
+def test_missing_credentials_return_none(manager, monkeypatch):
+    monkeypatch.delenv("JIRA_API_TOKEN")
+    assert manager.get_client() is None
+
+def test_invalidate_forces_reconnect(manager):
+    client = manager.get_client()
+    manager.invalidate()
+
+    assert client.closed
+    assert manager.get_client() is not client
+
+def test_open_circuit_is_raised_when_no_client_is_cached(manager, monkeypatch, db):
+    throttle = jira_service.JiraRequestThrottle("https://jira.example.com", failure_threshold=1)
+    throttle._record_failure()
+    monkeypatch.setattr(jira_service, "_throttles", {"https://jira.example.com": throttle})
+    monkeypatch.setattr(jira_service, "jira_client_manager", manager)
+
+    with pytest.raises(jira_service.JiraCircuitOpenError):
+        manager.get_client()
+    # Not the generic "Could not connect" error, so the scheduled sync stops early
+    with pytest.raises(jira_service.JiraCircuitOpenError):
+        jira_service.import_epics_from_jira(db, "PLAT")
+    assert FakeJira.instances == []
+
+# --- Batched import ---
+
+EPIC_LINK = "customfield_10008"
+
+class FakeSearchJira:
+    """Serves pages of raw epics (and their child issues) the way Jira Server's search endpoint does."""
+    deploymentType = "Server"
+    server_url = "https://jira.example.com"
+
+    def __init__(self, issues, children=(), epic_link=True):
+        self.issues = issues
+        self.children = list(children)
+        self.epic_link = epic_link
+        self.search_calls = 0
+        self.child_search_calls = 0
+
+    def fields(self):
+        fields = [{"id": "summary", "name": "Summary"}, {"id": "parent", "name": "Parent"}]
+        if self.epic_link:
+            fields.append({"id": EPIC_LINK, "name": "Epic Link"})
+        return fields
+
+    def search_issues(self, jql, startAt=0, maxResults=50, fields=None, json_result=False):
+        if jql.startswith('"Epic Link" in'):
+            self.child_search_calls += 1
+            keys = jql[jql.index("(") + 1:jql.index(")")].split(", ")
+            issues = [child for child in self.children if child["fields"][EPIC_LINK] in keys]
+        else:
+            self.search_calls += 1
+            issues = self.issues
+        page = issues[startAt:startAt + maxResults]
+        return {"startAt": startAt, "maxResults": maxResults, "total": len(issues), "issues": page}
+
+def make_issue(key, summary, status="In Progress", duedate="2030-01-15"):
+    return {"key": key, "fields": {"summary": summary, "description": None, "duedate": duedate, "status": {"name": status}}}
+
+def make_child(key, parent, category="indeterminate"):
+    # On Jira Server an epic's stories point to it through the Epic Link field, not `parent`
+    status = {"name": "Whatever", "statusCategory": {"key": category}}
+    return {"key": key, "fields": {"status": status, EPIC_LINK: parent}}
+
+@pytest.fixture(autouse=True)
+def epic_link_fields(monkeypatch):
+    # Every fake Jira has the same URL, so don't let one test's field lookup leak into the next
+    monkeypatch.setattr(jira_service, "_epic_link_fields", {})
+
+def test_import_upserts_each_page_in_one_transaction(db, monkeypatch):
+    project = crud.create_project(db, schemas.ProjectCreate(name="Platform", jira_project_key="PLAT"))
+    crud.create_epic(db, schemas.EpicCreate(title="Old title", jira_epic_key="PLAT-1", project_id=project.id))
+
+    fake = FakeSearchJira([make_issue(f"PLAT-{i}", f"Epic {i}") for i in range(1, 6)])
+    monkeypatch.setattr(jira_service, "get_jira_client", lambda: fake)
+    monkeypatch.setattr(jira_service, "JIRA_PAGE_SIZE", 2)
+
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(session))
+
+    result = jira_service.import_epics_from_jira(db, "PLAT")
+
+    assert result == {"project_name": "Platform", "imported": 4, "updated": 1, "unchanged": 0, "total_found": 5}
+    assert fake.search_calls == 3
+    assert fake.child_search_calls == 3  # One child rollup query per page, not per epic
+    assert len(commits) == 3  # One transaction per page
+
+    epic = crud.get_epic_by_jira_key(db, "PLAT-1")
+    assert epic.title == "Epic 1"
+    assert epic.status == "In Progress"
+    assert str(epic.target_launch_date) == "2030-01-15"
+    assert db.query(models.Epic).count() == 5
+
+def test_reimport_skips_unchanged_epics(db, monkeypatch):
+    crud.create_project(db, schemas.ProjectCreate(name="Platform", jira_project_key="PLAT"))
+    issues = [make_issue("PLAT-1", "Epic 1"), make_issue("PLAT-2", "Epic 2")]
+    monkeypatch.setattr(jira_service, "get_jira_client", lambda: FakeSearchJira(issues))
+    jira_service.import_epics_from_jira(db, "PLAT")
+    untouched_at = crud.get_epic_by_jira_key(db, "PLAT-1").updated_at
+
+    issues[1] = make_issue("PLAT-2", "Epic 2", status="Done")
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    result = jira_service.import_epics_from_jira(db, "PLAT")
+
+    assert result["imported"] == 0
+    assert result["updated"] == 1
+    assert result["unchanged"] == 1
+    assert sum(statement.startswith("UPDATE epics") for statement in statements) == 1
+    assert crud.get_epic_by_jira_key(db, "PLAT-2").status == "Launched"
+    assert crud.get_epic_by_jira_key(db, "PLAT-1").updated_at == untouched_at
+
+def test_import_rolls_up_child_issue_progress(db, monkeypatch):
+    crud.create_project(db, schemas.ProjectCreate(name="Platform", jira_project_key="PLAT"))
+    epics = [make_issue(f"PLAT-{i}", f"Epic {i}") for i in range(1, 5)]
+    children = [
+        make_child("PLAT-10", "PLAT-1", "done"),
+        make_child("PLAT-11", "PLAT-1", "done"),
+        make_child("PLAT-12", "PLAT-1"),
+        make_child("PLAT-13", "PLAT-3", "done"),
+    ]
+    fake = FakeSearchJira(epics, children)
+    monkeypatch.setattr(jira_service, "get_jira_client", lambda: fake)
+    monkeypatch.setattr(jira_service, "JIRA_PAGE_SIZE", 2)
+    monkeypatch.setattr(jira_service, "JIRA_CHILD_ROLLUP_BATCH_SIZE", 2)
+
+    jira_service.import_epics_from_jira(db, "PLAT")
+
+    progress = {epic.jira_epic_key: (epic.child_issues_done, epic.child_issues_total)
+                for epic in db.query(models.Epic)}
+    assert progress == {"PLAT-1": (2, 3), "PLAT-2": (0, 0), "PLAT-3": (1, 1), "PLAT-4": (0, 0)}
+    assert fake.child_search_calls == 3  # Two pages for PLAT-1/PLAT-2's three children, one for PLAT-3/PLAT-4
+
+    # A child moving to done updates only its epic
+    fake.children[2] = make_child("PLAT-12", "PLAT-1", "done")
+    result = jira_service.import_epics_from_jira(db, "PLAT")
+    assert result["updated"] == 1
+    assert crud.get_epic_by_jira_key(db, "PLAT-1").child_issues_done == 3
+
+def test_rollup_is_skipped_without_an_epic_link_field(db, monkeypatch):
+    crud.create_project(db, schemas.ProjectCreate(name="Platform", jira_project_key="PLAT"))
+    fake = FakeSearchJira([make_issue("PLAT-1", "Epic 1")], [make_child("PLAT-10", "PLAT-1")], epic_link=False)
+    monkeypatch.setattr(jira_service, "get_jira_client", lambda: fake)
+
+    jira_service.import_epics_from_jira(db, "PLAT")
+
+    epic = crud.get_epic_by_jira_key(db, "PLAT-1")
+    assert (epic.child_issues_done, epic.child_issues_total) == (None, None)
+    assert fake.child_search_calls == 0
+
+# --- Request throttling ---
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+def throttled(retry_after=None):
+    headers = {"Retry-After": retry_after} if retry_after else {}
+    return jira_service.JIRAError("Too many requests", status_code=429, response=FakeResponse(headers))
+
+@pytest.fixture
+def throttle():
+    # A fake clock that only advances when the throttle sleeps
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    throttle = jira_service.JiraRequestThrottle(
+        "https://jira.example.com", rate=10, burst=10, max_retries=3,
+        failure_threshold=2, reset_seconds=30, sleep=sleep, clock=lambda: now[0],
+    )
+    throttle.sleeps = sleeps
+    return throttle
+
+def test_throttled_request_is_retried_after_retry_after(throttle):
+    responses = [throttled(retry_after="7"), "ok"]
+
+    def request():
+        result = responses.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert throttle.call(request) == "ok"
+    assert 7 <= throttle.sleeps[0] <= 8
+    metrics = throttle.metrics()
+    assert metrics["throttled_total"] == 1
+    assert metrics["retries_total"] == 1
+    assert metrics["throttle_seconds_total"] >= 7
+    assert metrics["rate_limit_per_second"] < 10
+
+def test_circuit_opens_after_repeated_failures(throttle):
+    def request():
+        raise throttled()
+
+    for _ in range(2):
+        with pytest.raises(jira_service.JIRAError):
+            throttle.call(request)
+
+    assert throttle.metrics()["circuit_state"] == "open"
+    with pytest.raises(jira_service.JiraCircuitOpenError):
+        throttle.call(lambda: "never called")
+
+def test_half_open_circuit_lets_one_trial_through(throttle):
+    def request():
+        raise requests.exceptions.ReadTimeout("Read timed out")
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            throttle.call(request)
+    assert throttle.metrics()["circuit_state"] == "open"
+
+    throttle._sleep(30)
+    rejected = []
+
+    def trial():
+        # Another caller arriving while the trial is in flight
+        with pytest.raises(jira_service.JiraCircuitOpenError):
+            throttle.call(lambda: "never called")
+        rejected.append(True)
+        raise requests.exceptions.ConnectionError("Connection refused")
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        throttle.call(trial)
+    assert rejected == [True]
+    # The failed trial opens the circuit again
+    assert throttle.metrics()["circuit_state"] == "open"
+
+    throttle._sleep(30)
+    assert throttle.call(lambda: "ok") == "ok"
+    assert throttle.metrics()["circuit_state"] == "closed"
+
+def test_client_errors_are_not_retried(throttle):
+    def request():
+        raise jira_service.JIRAError("Not found", status_code=404)
+
+    with pytest.raises(jira_service.JIRAError):
+        throttle.call(request)
+
+    assert throttle.sleeps == []
+    assert throttle.metrics()["circuit_state"] == "closed"
+
+def test_token_refill_tolerates_float_rounding():
+    now = [1000.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    throttle = jira_service.JiraRequestThrottle(
+        "https://jira.example.com", rate=10, burst=10, sleep=sleep, clock=lambda: now[0],
+    )
+    # A refill that rounds to just under one token must not spin on sub-ulp waits
+    throttle._tokens = 0.9999999999999998
+
+    assert throttle.call(lambda: "ok") == "ok"
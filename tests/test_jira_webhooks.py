@@ -0,0 +1,120 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud, jira_webhooks, models, schemas
+from app.main import app
+
+client = TestClient(app)
+
+SECRET = "s3cret"
+
+def make_event(webhook_event, key, summary="Epic", status="In Progress", timestamp=1, issuetype="Epic", project="PLAT"):
+    return {
+        "webhookEvent": webhook_event,
+        "timestamp": timestamp,
+        "issue": {"key": key, "fields": {
+            "summary": summary, "description": None, "duedate": "2030-01-15", "status": {"name": status},
+            "issuetype": {"name": issuetype}, "project": {"key": project},
+        }},
+    }
+
+@pytest.fixture
+def session_factory(session_factory):
+    db = session_factory()
+    crud.create_project(db, schemas.ProjectCreate(name="Platform", jira_project_key="PLAT"))
+    db.close()
+    return session_factory
+
+@pytest.fixture
+def processor(session_factory, monkeypatch):
+    # A long debounce window so tests decide when to flush
+    processor = jira_webhooks.JiraWebhookProcessor(debounce_seconds=60, session_factory=session_factory)
+    monkeypatch.setattr(jira_webhooks, "webhook_processor", processor)
+    yield processor
+    processor.flush()
+
+def test_signature_and_token_are_verified():
+    body = b'{"webhookEvent": "jira:issue_updated"}'
+
+    jira_webhooks.verify_webhook(body, signature=jira_webhooks.sign_webhook(body, SECRET), secret=SECRET)
+    jira_webhooks.verify_webhook(body, token=SECRET, secret=SECRET)
+    with pytest.raises(jira_webhooks.WebhookAuthError):
+        jira_webhooks.verify_webhook(body, signature=jira_webhooks.sign_webhook(body, "other"), secret=SECRET)
+    with pytest.raises(jira_webhooks.WebhookAuthError):
+        jira_webhooks.verify_webhook(body, secret=SECRET)
+    with pytest.raises(jira_webhooks.WebhookAuthError):
+        jira_webhooks.verify_webhook(body, token="", secret="")
+
+def test_burst_for_one_issue_is_applied_once(processor, session_factory):
+    processor.submit(make_event("jira:issue_created", "PLAT-1", summary="Draft", status="To Do", timestamp=1))
+    processor.submit(make_event("jira:issue_updated", "PLAT-1", summary="Final", status="Done", timestamp=3))
+    # Delivered late: older than the pending event, so it must not win
+    processor.submit(make_event("jira:issue_updated", "PLAT-1", summary="Stale", timestamp=2))
+
+    assert processor.flush() == (1, 0)
+
+    db = session_factory()
+    epic = crud.get_epic_by_jira_key(db, "PLAT-1")
+    assert epic.title == "Final"
+    assert epic.status == "Launched"
+    assert db.query(models.Epic).count() == 1
+    assert processor.metrics()["coalesced_total"] == 2
+
+def test_delete_and_untracked_events(processor, session_factory):
+    db = session_factory()
+    project = crud.get_project_by_jira_key(db, "PLAT")
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Doomed", jira_epic_key="PLAT-9", project_id=project.id))
+    crud.create_risk(db, schemas.RiskCreate(description="Goes with it"), epic_id=epic.id)
+
+    assert processor.submit(make_event("jira:issue_deleted", "PLAT-9"))
+    assert not processor.submit(make_event("jira:issue_updated", "PLAT-10", issuetype="Story"))
+    assert processor.submit(make_event("jira:issue_created", "OTHER-1", project="OTHER"))
+
+    assert processor.flush() == (0, 1)
+    db.expire_all()
+    assert db.query(models.Epic).count() == 0
+    assert db.query(models.Risk).count() == 0
+
+def test_failed_flush_keeps_events_and_retries_with_backoff(processor, session_factory, monkeypatch):
+    processor.submit(make_event("jira:issue_created", "PLAT-1", summary="Old", timestamp=1))
+    processor.submit(make_event("jira:issue_created", "PLAT-2", summary="Other", timestamp=1))
+    upsert = crud.bulk_upsert_epics
+
+    def fail_once(db, epics):
+        monkeypatch.setattr(crud, "bulk_upsert_epics", upsert)
+        # Arrives while the flush is failing, and must win over the requeued event
+        processor.submit(make_event("jira:issue_updated", "PLAT-1", summary="New", timestamp=2))
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(crud, "bulk_upsert_epics", fail_once)
+    with pytest.raises(RuntimeError):
+        processor.flush()
+    assert processor.metrics()["pending"] == 2 and processor.metrics()["failed_flushes_total"] == 1
+    assert processor._timer.interval == 120
+
+    assert processor.flush() == (2, 0)
+    db = session_factory()
+    assert sorted(epic.title for epic in db.query(models.Epic)) == ["New", "Other"]
+    assert processor._failures == 0
+
+def test_webhook_endpoint_requires_secret(processor, monkeypatch):
+    monkeypatch.setenv("JIRA_WEBHOOK_SECRET", SECRET)
+    body = json.dumps(make_event("jira:issue_updated", "PLAT-1")).encode()
+
+    assert client.post("/api/jira/webhook", content=body).status_code == 401
+    bad = {"X-Hub-Signature": jira_webhooks.sign_webhook(body, "wrong")}
+    assert client.post("/api/jira/webhook", content=body, headers=bad).status_code == 401
+
+    good = {"X-Hub-Signature": jira_webhooks.sign_webhook(body, SECRET)}
+    response = client.post("/api/jira/webhook", content=body, headers=good)
+    assert response.status_code == 202
+    assert response.json() == {"accepted": True}
+    assert client.post(f"/api/jira/webhook?secret={SECRET}", content=body).status_code == 202
+    assert processor.metrics()["pending"] == 1
+
+def test_webhook_endpoint_is_disabled_without_secret(processor, monkeypatch):
+    monkeypatch.delenv("JIRA_WEBHOOK_SECRET", raising=False)
+    response = client.post("/api/jira/webhook?secret=", content=b"{}")
+    assert response.status_code == 401
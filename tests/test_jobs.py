@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import jobs
+from app.main import app
+
+client = TestClient(app)
+
+@pytest.fixture
+def job_manager(monkeypatch):
+    manager = jobs.JobManager(max_workers=2)
+    monkeypatch.setattr(jobs, "job_manager", manager)
+    return manager
+
+def test_concurrent_submissions_share_one_run(job_manager):
+    release = threading.Event()
+    runs = []
+
+    def run(job):
+        runs.append(job.id)
+        job.report_progress({"processed": 1})
+        release.wait(5)
+        return {"imported": 1}
+
+    first, created_first = job_manager.submit("jira_import", "PLAT", run)
+    second, created_second = job_manager.submit("jira_import", "PLAT", run)
+
+    assert created_first and not created_second
+    assert first is second
+
+    release.set()
+    assert first.wait(5) == {"imported": 1}
+    assert runs == [first.id]
+    assert first.status == "succeeded"
+
+    # Once finished, a new submission starts a fresh run
+    third, created_third = job_manager.submit("jira_import", "PLAT", lambda job: None)
+    assert created_third and third is not first
+    third.wait(5)
+
+def test_failed_job_reports_error(job_manager):
+    def run(job):
+        raise ValueError("Jira project with key 'NOPE' not found.")
+
+    job, _ = job_manager.submit("jira_import", "NOPE", run)
+
+    with pytest.raises(ValueError):
+        job.wait(5)
+    assert job.status == "failed"
+    assert "not found" in job.error
+    assert job.error_kind == "error"
+
+@pytest.mark.parametrize("error, kind", [
+    (ValueError("Jira project with key 'NOPE' not found."), "not_found"),
+    (ConnectionError("Could not connect to Jira. Check credentials and server URL."), "unavailable"),
+    (jobs.jira_service.JiraCircuitOpenError("Jira is unavailable"), "unavailable"),
+    (IOError("Error fetching project from Jira: boom"), "error"),
+])
+def test_failed_import_keeps_the_kind_of_error(job_manager, monkeypatch, error, kind):
+    def fake_import(db, jira_project_key, progress=None):
+        raise error
+
+    monkeypatch.setattr(jobs.jira_service, "import_epics_from_jira", fake_import)
+    monkeypatch.setattr(jobs, "SessionLocal", lambda: FakeSession())
+
+    job, _ = jobs.submit_jira_import("NOPE")
+    with pytest.raises(type(error)):
+        job.wait(5)
+    assert client.get(f"/api/jobs/{job.id}").json()["error_kind"] == kind
+
+def test_import_endpoint_returns_job_to_poll(job_manager, monkeypatch):
+    release = threading.Event()
+
+    def fake_import(db, jira_project_key, progress=None):
+        release.wait(5)
+        return {"project_name": "Platform", "imported": 2, "updated": 0, "unchanged": 0, "total_found": 2}
+
+    monkeypatch.setattr(jobs.jira_service, "import_epics_from_jira", fake_import)
+    monkeypatch.setattr(jobs, "SessionLocal", lambda: FakeSession())
+
+    response = client.post("/api/jira/import/PLAT")
+    assert response.status_code == 202, response.text
+    job = response.json()
+    assert job["status"] in ("queued", "running")
+
+    # A second click while the first import runs joins the same job, whatever the key's case
+    duplicate = client.post("/api/jira/import/plat").json()
+    assert duplicate["id"] == job["id"]
+    assert duplicate["created"] is False
+    assert duplicate["key"] == "PLAT"
+
+    release.set()
+    job_manager.get(job["id"]).wait(5)
+    polled = client.get(f"/api/jobs/{job['id']}").json()
+    assert polled["status"] == "succeeded"
+    assert polled["result"]["imported"] == 2
+
+def test_unknown_job_returns_404():
+    assert client.get("/api/jobs/does-not-exist").status_code == 404
+
+class FakeSession:
+    def close(self):
+        pass
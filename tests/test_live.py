@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+from app import crud, live, schemas
+
+@pytest.fixture
+def broadcaster(session_factory):
+    return live.ChangeBroadcaster(session_factory=session_factory, poll_seconds=60, queue_size=4)
+
+def drain(subscription):
+    frames = []
+    while not subscription.queue.empty():
+        frames.append(subscription.queue.get_nowait())
+    return frames
+
+def events(frames):
+    return [json.loads(frame.split(b"data: ", 1)[1]) for frame in frames if frame.startswith(b"id: ")]
+
+async def collect(stream, count):
+    return [await stream.__anext__() for _ in range(count)]
+
+def test_changes_reach_subscribers_of_their_scope(broadcaster, db):
+    async def scenario():
+        await broadcaster.start()
+        try:
+            project = crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+            epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout", project_id=project.id))
+            other = crud.create_epic(db, schemas.EpicCreate(title="Search"))
+            subscriptions = {
+                "epic": broadcaster.subscribe(epic_id=epic.id),
+                "other_epic": broadcaster.subscribe(epic_id=other.id),
+                "project": broadcaster.subscribe(project_id=project.id),
+                "all": broadcaster.subscribe(),
+            }
+            assert await broadcaster.poll_once() == 3
+            crud.create_risk(db, schemas.RiskCreate(description="Vendor delay"), epic_id=epic.id)
+            assert await broadcaster.poll_once() == 1
+            return {name: events(drain(subscription)) for name, subscription in subscriptions.items()}
+        finally:
+            await broadcaster.stop()
+
+    received = asyncio.run(scenario())
+    assert [e["entity"] for e in received["epic"]] == ["epics", "risks"]
+    assert received["epic"][1]["data"]["description"] == "Vendor delay"
+    assert [e["entity"] for e in received["other_epic"]] == ["epics"]
+    assert [e["entity"] for e in received["project"]] == ["projects", "epics", "risks"]
+    assert [e["entity"] for e in received["all"]] == ["projects", "epics", "epics", "risks"]
+
+def test_reconnect_replays_missed_changes_once(broadcaster, db):
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout"))
+    first = crud.create_risk(db, schemas.RiskCreate(description="First"), epic_id=epic.id)
+
+    async def scenario():
+        await broadcaster.start()
+        stream = broadcaster.stream(epic_id=epic.id, last_event_id=1)
+        frames = await collect(stream, 2)
+        # Logged while the stream was replaying, and published on the next poll as well
+        crud.create_risk(db, schemas.RiskCreate(description="Second"), epic_id=epic.id)
+        broadcaster.cursor = 1
+        await broadcaster.poll_once()
+        frames += await collect(stream, 1)
+        await broadcaster.stop()
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
+        return frames
+
+    frames = asyncio.run(scenario())
+    assert frames[0].startswith(b"retry:")
+    assert [e["data"]["description"] for e in events(frames)] == [first.description, "Second"]
+    assert broadcaster.connections == 0
+
+def test_slow_clients_are_told_to_resync(broadcaster, db):
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout"))
+
+    async def scenario():
+        await broadcaster.start()
+        stream = broadcaster.stream(epic_id=epic.id)
+        await stream.__anext__()
+        for n in range(6):
+            crud.create_risk(db, schemas.RiskCreate(description=f"Risk {n}"), epic_id=epic.id)
+        await broadcaster.poll_once()
+        frame = await stream.__anext__()
+        await broadcaster.stop()
+        return frame
+
+    assert asyncio.run(scenario()) == live.RESYNC
+    assert broadcaster.connections == 0
+
+def test_idle_broadcaster_does_not_read_changes(broadcaster, db):
+    async def scenario():
+        await broadcaster.start()
+        crud.create_epic(db, schemas.EpicCreate(title="Checkout"))
+        read = await broadcaster.poll_once()
+        await broadcaster.stop()
+        return read
+
+    assert asyncio.run(scenario()) == 0
+    assert broadcaster.cursor == 1 and broadcaster.published == 0
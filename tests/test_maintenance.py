@@ -0,0 +1,90 @@
+import os
+import sqlite3
+
+import pytest
+
+from app import maintenance
+
+def make_database(path, auto_vacuum="INCREMENTAL", rows=3000):
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA auto_vacuum = {auto_vacuum}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE epics (id INTEGER PRIMARY KEY, status TEXT, title TEXT)")
+    conn.execute("CREATE INDEX ix_epics_status ON epics (status)")
+    conn.executemany("INSERT INTO epics (status, title) VALUES (?, ?)",
+                     [("Launched" if n % 2 else "Planning", f"Epic {n} " + "x" * 500) for n in range(rows)])
+    conn.commit()
+    # What delete_project leaves behind: most of the file on the freelist
+    conn.execute("DELETE FROM epics WHERE id > 100")
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+def test_maintenance_checks_analyzes_and_shrinks_the_file(tmp_path):
+    path = str(tmp_path / "risk_tracker.db")
+    make_database(path)
+
+    report = maintenance.run_maintenance(path, vacuum_pages=100, pause=0)
+    before, after, vacuum = report["before"], report["after"], report["vacuum"]
+    assert report["quick_check"] == "ok"
+    assert before["free_pages"] > 200 and after["free_pages"] == 0
+    # ANALYZE takes a page or two for sqlite_stat1 first
+    assert vacuum["complete"] and vacuum["pages_freed"] > before["free_pages"] - 5
+    assert vacuum["steps"] == -(-vacuum["pages_freed"] // 100)
+    assert after["file_bytes"] < before["file_bytes"] / 4
+    assert set(report["seconds"]) == {"quick_check", "analyze", "vacuum", "total"}
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_stat1 WHERE idx = 'ix_epics_status'").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM epics").fetchone()[0] == 100
+    finally:
+        conn.close()
+
+def test_vacuum_is_bounded_and_defers_to_other_writers(tmp_path, monkeypatch):
+    path = str(tmp_path / "risk_tracker.db")
+    make_database(path)
+    conn = maintenance.connect(path)
+    writer = sqlite3.connect(path, isolation_level=None)
+    try:
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        result = maintenance.incremental_vacuum(conn, pages=10, pause=0, max_seconds=0)
+        assert result == {"pages_freed": 0, "steps": 0, "deferred": 0, "complete": False}
+
+        steps = []
+        def write_between_steps(seconds):
+            steps.append(seconds)
+            if len(steps) <= 2:
+                writer.execute("INSERT INTO epics (status, title) VALUES ('Planning', 'New')")
+
+        monkeypatch.setattr(maintenance.time, "sleep", write_between_steps)
+        result = maintenance.incremental_vacuum(conn, pages=50, pause=0.01, max_seconds=30)
+        # The step after each outside commit was put off
+        assert result["deferred"] == 2 and result["complete"]
+        assert result["pages_freed"] <= free_pages
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    finally:
+        writer.close()
+        conn.close()
+
+def test_non_incremental_database_is_reported_then_converted(tmp_path):
+    path = str(tmp_path / "risk_tracker.db")
+    make_database(path, auto_vacuum="NONE")
+
+    report = maintenance.run_maintenance(path, pause=0)
+    assert report["after"]["auto_vacuum"] == "none" and report["after"]["free_pages"] > 0
+    assert report["vacuum"]["steps"] == 0
+
+    result = maintenance.enable_incremental_vacuum(path)
+    assert result["after"]["auto_vacuum"] == "incremental" and result["after"]["free_pages"] == 0
+    assert os.path.getsize(path) < result["before"]["file_bytes"] / 4
+
+@pytest.mark.parametrize("problems, vacuumed", [(["ok"], True), (["row 7 missing from index ix_epics_status"], False)])
+def test_failed_quick_check_skips_the_vacuum(tmp_path, monkeypatch, problems, vacuumed):
+    path = str(tmp_path / "risk_tracker.db")
+    make_database(path, rows=300)
+    monkeypatch.setattr(maintenance, "quick_check", lambda conn: problems)
+
+    report = maintenance.run_maintenance(path, pause=0)
+    assert (report["vacuum"] is not None) == vacuumed
+    assert report["quick_check"] == ("ok" if vacuumed else problems)
@@ -0,0 +1,149 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import migrations
+from app.database import Base
+
+LEGACY_SCHEMA = """
+CREATE TABLE epics (
+    id INTEGER PRIMARY KEY, title VARCHAR(255) NOT NULL, description TEXT,
+    target_launch_date DATE, actual_launch_date DATE, status VARCHAR(50) NOT NULL,
+    created_at DATETIME, updated_at DATETIME
+);
+CREATE TABLE risks (
+    id INTEGER PRIMARY KEY, epic_id INTEGER NOT NULL REFERENCES epics(id), description TEXT NOT NULL,
+    mitigation_plan TEXT, date_added DATE NOT NULL, status VARCHAR(50) NOT NULL,
+    created_at DATETIME, updated_at DATETIME
+);
+CREATE TABLE risk_updates (
+    id INTEGER PRIMARY KEY, risk_id INTEGER NOT NULL REFERENCES risks(id), update_text TEXT NOT NULL,
+    date_added DATE NOT NULL, created_at DATETIME
+);
+"""
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """A database from before projects existed, after the current app has started on it once."""
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany("INSERT INTO epics (title, status) VALUES (?, 'Planned')", [(f"Epic {n}",) for n in range(25)])
+    conn.commit()
+    conn.close()
+    # create_all adds the new tables and the change log triggers, but leaves epics as it is
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{path}"))
+    return path
+
+def epic_columns(conn):
+    return {row[1] for row in conn.execute("PRAGMA table_info(epics)")}
+
+def test_upgrades_legacy_database_in_chunks(legacy_db):
+    conn = migrations.connect(legacy_db)
+    applied = migrations.migrate(conn, chunk_rows=10, pause_seconds=0)
+
+    assert applied == [1, 2, 3, 4, 5]
+    assert migrations.current_version(conn) == 5
+    assert {"project_id", "jira_epic_key", "child_issues_done", "child_issues_total"} <= epic_columns(conn)
+    general = conn.execute("SELECT id FROM projects WHERE name = 'General'").fetchone()[0]
+    assert conn.execute("SELECT COUNT(*) FROM epics WHERE project_id = ?", (general,)).fetchone()[0] == 25
+    assert conn.execute("SELECT last_key, rows_updated, completed_at IS NOT NULL FROM migration_backfills "
+                        "WHERE version = 1").fetchall() == [(25, 25, 1)]
+    # The change log triggers work against the migrated schema
+    conn.execute("UPDATE epics SET status = 'At Risk' WHERE id = 1")
+    assert conn.execute("SELECT project_id FROM change_log WHERE entity = 'epics' AND op = 'update'").fetchone() == (general,)
+    assert migrations.migrate(conn) == []
+
+def test_interrupted_backfill_resumes(legacy_db, monkeypatch):
+    conn = migrations.connect(legacy_db)
+    calls = []
+
+    def stop_after_two_chunks(seconds):
+        calls.append(seconds)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(migrations.time, "sleep", stop_after_two_chunks)
+    with pytest.raises(KeyboardInterrupt):
+        migrations.migrate(conn, chunk_rows=10, pause_seconds=1)
+    assert migrations.applied_versions(conn) == {1: "backfilling", 2: "applied", 3: "applied", 4: "backfilling",
+                                                 5: "applied"}
+    assert conn.execute("SELECT COUNT(*) FROM epics WHERE project_id IS NULL").fetchone()[0] == 5
+
+    monkeypatch.setattr(migrations.time, "sleep", lambda seconds: None)
+    assert migrations.migrate(conn, chunk_rows=10, pause_seconds=1) == [1, 4]
+    assert conn.execute("SELECT COUNT(*) FROM epics WHERE project_id IS NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT rows_updated FROM migration_backfills WHERE version = 1").fetchone()[0] == 25
+
+def test_dry_run_changes_nothing(legacy_db):
+    conn = migrations.connect(legacy_db)
+    before = conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+    lines = []
+    assert migrations.migrate(conn, dry_run=True, log=lines.append) == []
+    assert conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == before
+    assert migrations.current_version(conn) == 0
+    assert any("ALTER TABLE epics ADD COLUMN project_id" in line for line in lines)
+    assert any("assign_general_project" in line for line in lines)
+
+def test_rollback(legacy_db):
+    conn = migrations.connect(legacy_db)
+    migrations.migrate(conn, pause_seconds=0)
+
+    assert migrations.rollback(conn, 1) == [5, 4, 3, 2]
+    assert migrations.current_version(conn) == 1
+    assert not {"child_issues_total", "risk_count"} & epic_columns(conn)
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'ix_risks_status'").fetchone()
+    conn.execute("UPDATE epics SET status = 'Launched' WHERE id = 2")
+    with pytest.raises(migrations.MigrationError):
+        migrations.rollback(conn, 0)
+    # Rolled back migrations can be applied again
+    assert migrations.migrate(conn) == [2, 3, 4, 5]
+
+def test_new_database_is_recorded_without_changes(tmp_path):
+    path = str(tmp_path / "new.db")
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{path}"))
+    conn = migrations.connect(path)
+    conn.execute("INSERT INTO epics (title, status) VALUES ('Unassigned', 'Planned')")
+
+    assert migrations.migrate(conn) == [1, 2, 3, 4, 5]
+    assert conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0] == 0
+    assert conn.execute("SELECT project_id FROM epics").fetchone() == (None,)
+    assert migrations.current_version(conn) == 5
+
+def test_counters_are_backfilled_and_then_maintained(legacy_db):
+    conn = migrations.connect(legacy_db)
+    migrations.migrate(conn, target=3, pause_seconds=0)
+    conn.executemany("INSERT INTO risks (epic_id, description, date_added, status) VALUES (?, 'Risk', '2025-03-01', ?)",
+                     [(1, "Open"), (1, "Closed"), (2, "Mitigating")])
+    conn.execute("INSERT INTO risk_updates (risk_id, update_text, date_added, created_at) "
+                 "VALUES (1, 'Escalated', '2025-03-02', '2025-03-02 09:00:00')")
+    assert migrations.migrate(conn, target=4, chunk_rows=10, pause_seconds=0) == [4]
+
+    counts = lambda: conn.execute("SELECT id, risk_count, open_risk_count FROM epics WHERE id <= 2 ORDER BY id").fetchall()
+    assert counts() == [(1, 2, 1), (2, 1, 1)]
+    assert conn.execute("SELECT epic_count FROM projects WHERE name = 'General'").fetchone() == (25,)
+    assert conn.execute("SELECT last_update_at FROM risks WHERE id = 1").fetchone() == ("2025-03-02 09:00:00",)
+    conn.execute("UPDATE risks SET status = 'Closed' WHERE id = 3")
+    assert counts() == [(1, 2, 1), (2, 1, 0)]
+
+def test_ids_are_never_reused_after_the_autoincrement_rebuild(legacy_db):
+    conn = migrations.connect(legacy_db)
+    migrations.migrate(conn, target=4, pause_seconds=0)
+    conn.execute("INSERT INTO risks (epic_id, description, date_added, status) VALUES (1, 'Risk', '2025-03-01', 'Open')")
+    # Epic 30 was archived, epic 25 deleted: both ids were up for reuse
+    conn.execute("INSERT INTO archived_epics (id, title, status, risk_count, open_risk_count) VALUES (30, 'Archived', 'Launched', 0, 0)")
+    conn.execute("DELETE FROM epics WHERE id = 25")
+    indexes = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'risks' ORDER BY name").fetchall()
+
+    assert migrations.migrate(conn, pause_seconds=0) == [5]
+    for table in ("epics", "risks", "risk_updates"):
+        assert "AUTOINCREMENT" in migrations._table_sql(conn, table)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'risks' ORDER BY name").fetchall() == indexes
+    assert conn.execute("SELECT COUNT(*), MAX(risk_count) FROM epics").fetchone() == (24, 1)
+    assert conn.execute("INSERT INTO epics (title, status) VALUES ('New', 'Planned')").lastrowid == 31
+    # The change log and counter triggers were put back
+    conn.execute("INSERT INTO risks (epic_id, description, date_added, status) VALUES (31, 'Risk', '2025-03-01', 'Open')")
+    assert conn.execute("SELECT risk_count FROM epics WHERE id = 31").fetchone() == (1,)
+    assert conn.execute("SELECT COUNT(*) FROM change_log WHERE entity = 'epics' AND entity_id = 31").fetchone() == (1,)
+    assert migrations.rollback(conn, 4) == [5] and migrations.migrate(conn) == [5]
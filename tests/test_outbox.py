@@ -0,0 +1,179 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import aiosmtplib
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud, email_service, models, outbox, schemas
+from app.main import app, get_db
+
+client = TestClient(app)
+
+SETTINGS = email_service.EmailSettings(
+    smtp_username="bot", smtp_password="secret", manager_email="manager@example.com",
+)
+
+class FakeTransport:
+    """Records sent messages; `failures` maps a subject to errors raised on successive sends."""
+
+    def __init__(self):
+        self.sent = []
+        self.failures = {}
+        self.max_retries = []
+
+    async def send(self, message, max_retries=None):
+        self.max_retries.append(max_retries)
+        errors = self.failures.get(message["Subject"])
+        if errors:
+            raise errors.pop(0)
+        self.sent.append(message)
+
+@pytest.fixture
+def epic(session_factory, monkeypatch):
+    monkeypatch.setattr(email_service, "_settings", SETTINGS)
+    db = session_factory()
+    db_epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout revamp"))
+    crud.create_risk(db, schemas.RiskCreate(description="Vendor delay", status="Open"), epic_id=db_epic.id)
+    db.refresh(db_epic)
+    yield db_epic
+    db.close()
+
+@pytest.fixture
+def transport():
+    return FakeTransport()
+
+@pytest.fixture
+def drainer(session_factory, transport):
+    return outbox.OutboxDrainer(
+        session_factory=session_factory, transport_factory=lambda: transport,
+        batch_size=10, max_attempts=3, retry_base_seconds=0,
+    )
+
+def enqueue(session_factory, epic, reason="Scope grew"):
+    db = session_factory()
+    try:
+        epic = crud.get_epic(db, epic.id)
+        return outbox.enqueue_date_change_request(db, epic, reason, "2030-06-30").id
+    finally:
+        db.close()
+
+def load(session_factory, message_id):
+    db = session_factory()
+    try:
+        return crud.get_outbox_message(db, message_id)
+    finally:
+        db.close()
+
+def test_request_is_queued_and_returns_immediately(session_factory, epic, transport):
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        response = client.post(f"/api/epics/{epic.id}/request-date-change", data={"reason": "Scope grew"})
+        assert response.status_code == 202
+        assert response.json()["status"] == "pending"
+        message_id = response.json()["outbox_id"]
+
+        [state] = client.get(f"/api/epics/{epic.id}/date-change-requests").json()
+        assert state["id"] == message_id
+        assert state["recipient"] == "manager@example.com"
+        assert "body" not in state
+        assert client.get("/api/outbox/999").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+    # Nothing was sent inline
+    assert transport.sent == []
+
+def test_drainer_sends_pending_messages(session_factory, epic, drainer, transport):
+    ids = [enqueue(session_factory, epic, reason=f"Reason {n}") for n in range(3)]
+
+    assert asyncio.run(drainer.drain_once()) == 3
+    assert asyncio.run(drainer.drain_once()) == 0
+
+    assert len(transport.sent) == 3
+    # The transport's own retry loop is off; the outbox schedules retries
+    assert transport.max_retries == [0, 0, 0]
+    assert transport.sent[0]["Subject"] == "Date Change Request for Epic: Checkout revamp"
+    assert "Vendor delay" in transport.sent[0].get_payload(0).get_payload(decode=True).decode()
+    for message_id in ids:
+        message = load(session_factory, message_id)
+        assert message.status == "sent"
+        assert message.attempts == 1
+        assert message.sent_at is not None
+
+def test_deleting_the_epic_keeps_its_queued_messages(session_factory, epic, drainer, transport):
+    message_id = enqueue(session_factory, epic)
+    db = session_factory()
+    assert crud.delete_epic(db, epic.id)
+    db.close()
+
+    message = load(session_factory, message_id)
+    assert (message.epic_id, message.status) == (None, "pending")
+    assert asyncio.run(drainer.drain_once()) == 1
+
+def test_transient_failure_is_retried_later(session_factory, epic, drainer, transport):
+    message_id = enqueue(session_factory, epic)
+    subject = "Date Change Request for Epic: Checkout revamp"
+    transport.failures[subject] = [aiosmtplib.SMTPServerDisconnected("gone")]
+    drainer.retry_base_seconds = 3600
+
+    asyncio.run(drainer.drain_once())
+    message = load(session_factory, message_id)
+    assert message.status == "pending"
+    assert message.attempts == 1
+    assert "gone" in message.last_error
+    # Not due yet
+    assert asyncio.run(drainer.drain_once()) == 0
+
+    db = session_factory()
+    db.query(models.EmailOutbox).update({"next_attempt_at": datetime.now(timezone.utc) - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+
+    asyncio.run(drainer.drain_once())
+    message = load(session_factory, message_id)
+    assert message.status == "sent"
+    assert message.attempts == 2
+    assert message.last_error is None
+
+def test_messages_are_dead_lettered(session_factory, epic, drainer, transport):
+    subject = "Date Change Request for Epic: Checkout revamp"
+    rejected = enqueue(session_factory, epic)
+    transport.failures[subject] = [aiosmtplib.SMTPRecipientsRefused([])]
+    asyncio.run(drainer.drain_once())
+    assert load(session_factory, rejected).status == "dead"
+
+    flaky = enqueue(session_factory, epic)
+    transport.failures[subject] = [aiosmtplib.SMTPServerDisconnected("gone")] * drainer.max_attempts
+    for _ in range(drainer.max_attempts):
+        asyncio.run(drainer.drain_once())
+    message = load(session_factory, flaky)
+    assert message.status == "dead"
+    assert message.attempts == drainer.max_attempts
+    assert transport.sent == []
+    assert drainer.metrics()["dead_total"] == 2
+
+def test_interrupted_sends_are_requeued_on_start(session_factory, epic, drainer, transport):
+    message_id = enqueue(session_factory, epic)
+    db = session_factory()
+    # Claimed, then the process died before recording the result
+    crud.claim_outbox_batch(db, 10)
+    db.close()
+
+    async def run():
+        drainer.start()
+        for _ in range(100):
+            if transport.sent:
+                break
+            await asyncio.sleep(0.01)
+        await drainer.stop()
+
+    asyncio.run(run())
+    assert len(transport.sent) == 1
+    assert load(session_factory, message_id).status == "sent"
@@ -0,0 +1,70 @@
+from datetime import date
+
+from fastapi.testclient import TestClient
+
+from app import crud, schemas, trends
+from app.main import app, get_db
+
+client = TestClient(app)
+
+def test_snapshots_record_counts_per_project_and_portfolio(db):
+    project = crud.create_project(db, schemas.ProjectCreate(name="Platform"))
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout", project_id=project.id))
+    loose = crud.create_epic(db, schemas.EpicCreate(title="Loose"))
+    first = crud.create_risk(db, schemas.RiskCreate(description="Vendor delay"), epic_id=epic.id)
+    crud.create_risk(db, schemas.RiskCreate(description="Capacity"), epic_id=loose.id)
+
+    assert trends.take_snapshot(db, day=date(2025, 3, 3))["date_changes"] == 2
+    # Append-only: a second run on the same day changes nothing
+    assert trends.take_snapshot(db, day=date(2025, 3, 3)) is None
+    crud.update_risk(db, first.id, schemas.RiskUpdate(status="Mitigated"))
+    trends.take_snapshot(db, day=date(2025, 3, 4))
+
+    open_risks = lambda **kw: [p["count"] for p in trends.get_trend(
+        db, "risks", statuses=["Open"], start=date(2025, 3, 1), end=date(2025, 3, 31), **kw)]
+    assert open_risks() == [2, 1]
+    assert open_risks(project_id=project.id) == [1, 0]
+    assert [p["count"] for p in trends.get_trend(db, "epics", start=date(2025, 3, 1), end=date(2025, 3, 31))] == [2, 2]
+
+def test_weekly_and_monthly_points_use_the_last_snapshot(db):
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout"))
+    # Mon 3 March to Tue 11 March 2025, adding a risk each day
+    for day in range(3, 12):
+        crud.create_risk(db, schemas.RiskCreate(description=f"Risk {day}"), epic_id=epic.id)
+        trends.take_snapshot(db, day=date(2025, 3, day))
+
+    weekly = trends.get_trend(db, "risks", start=date(2025, 3, 1), end=date(2025, 3, 31), interval="week")
+    assert [(p["date"], p["as_of"], p["count"]) for p in weekly] == [
+        (date(2025, 3, 3), date(2025, 3, 9), 7), (date(2025, 3, 10), date(2025, 3, 11), 9),
+    ]
+    monthly = trends.get_trend(db, "risks", start=date(2025, 1, 1), end=date(2025, 12, 31), interval="month")
+    assert [(p["date"], p["count"]) for p in monthly] == [(date(2025, 3, 1), 9)]
+
+def test_target_date_changes(session_factory, db):
+    epic = crud.create_epic(db, schemas.EpicCreate(title="Checkout", target_launch_date=date(2025, 6, 1)))
+    trends.take_snapshot(db, day=date(2025, 3, 3))
+    crud.update_epic(db, epic.id, schemas.EpicUpdate(target_launch_date=date(2025, 6, 20)))
+    trends.take_snapshot(db, day=date(2025, 3, 4))
+    trends.take_snapshot(db, day=date(2025, 3, 5))
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        changes = client.get("/api/trends/date-changes", params={"start": "2025-03-01", "end": "2025-03-31"}).json()
+        assert changes == [{"epic_id": epic.id, "project_id": None, "day": "2025-03-04", "previous_date": "2025-06-01",
+                            "target_launch_date": "2025-06-20", "slip_days": 19}]
+        # The baseline row before the range still provides the previous date
+        assert len(client.get("/api/trends/date-changes", params={"start": "2025-03-04", "epic_id": epic.id,
+                                                                  "end": "2025-03-31"}).json()) == 1
+        trend = client.get("/api/trends", params={"entity": "epics", "start": "2025-03-01", "end": "2025-03-31",
+                                                  "interval": "month"}).json()
+        assert trend["points"] == [{"date": "2025-03-01", "as_of": "2025-03-05", "count": 1}]
+        assert client.get("/api/trends", params={"interval": "year"}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()